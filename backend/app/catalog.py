@@ -0,0 +1,697 @@
+#!/usr/bin/env python3
+"""
+内存目录快照引擎
+启动时把活跃工具、各语言翻译、标签、分类一次性加载到进程内，
+/api/tools、/api/tools/{id}、/api/categories、/api/tags 直接从内存应答；
+通过 Postgres LISTEN/NOTIFY 增量更新，定时比较数据库目录版本、有变化时全量刷新兜底。
+"""
+
+import os
+import json
+import time
+import asyncio
+import heapq
+import asyncpg
+from datetime import datetime, timezone
+from typing import Optional, List, Dict, Any, Set, Tuple
+
+from pagination import SORT_COLUMNS
+from conditional import CatalogVersionSource
+
+# NOTIFY 通道名, 与 sql/001_catalog_notify.sql 保持一致
+CATALOG_CHANNEL = 'catalog_changes'
+
+# 以工具为粒度的表, 变更时只需局部修补该工具
+TOOL_SCOPED_TABLES = {'tools', 'tool_translations', 'tool_tags', 'tool_features'}
+
+# 列表/详情响应实际用到的 tools 列
+TOOL_COLUMNS = (
+    'id', 'slug', 'url', 'page_screenshot', 'pricing_type', 'rating', 'view_count',
+    'featured', 'trial_available', 'created_at', 'updated_at', 'category_id', 'status'
+)
+
+TRANSLATION_COLUMNS = (
+    'name', 'title', 'description', 'long_description',
+    'use_cases', 'target_audience', 'subcategory'
+)
+
+_MIN_DATETIME = datetime.min
+
+
+def _created_at(tool: Dict) -> datetime:
+    """统一转换为UTC的naive时间, 便于比较"""
+    created_at = tool.get('created_at') or _MIN_DATETIME
+    if getattr(created_at, 'tzinfo', None) is not None:
+        created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return created_at
+
+
+def _sort_key(tool: Dict) -> Tuple:
+    """与SQL一致的默认排序: featured, rating, view_count, created_at, id 均降序"""
+    return (
+        bool(tool.get('featured')),
+        float(tool.get('rating') or 0),
+        tool.get('view_count') or 0,
+        _created_at(tool),
+        tool.get('id') or 0,
+    )
+
+
+# 首页等场景的其他排序, 均降序, 与 main.TOP_ORDER_CLAUSES 一致
+TOP_SORT_KEYS = {
+    'created_at': lambda tool: (_created_at(tool), tool.get('id') or 0),
+    'view_count': lambda tool: (tool.get('view_count') or 0, _created_at(tool), tool.get('id') or 0),
+}
+
+
+class CatalogSnapshot:
+    """不可变的目录快照, 更新时整体替换引用, 读者永远看不到半成品"""
+
+    __slots__ = (
+        'tools', 'translations', 'categories', 'category_translations',
+        'tags', 'tag_translations', 'tool_tags', 'features',
+        'identifiers', 'order', 'category_counts', 'tag_usage', 'version', 'loaded_at',
+        'db_version', 'db_updated_at'
+    )
+
+    def __init__(self):
+        self.tools: Dict[int, Dict] = {}                         # tool_id -> tools 行
+        self.translations: Dict[str, Dict[int, Dict]] = {}       # lang -> tool_id -> 翻译
+        self.categories: Dict[int, Dict] = {}                    # category_id -> {key, sort_order}
+        self.category_translations: Dict[str, Dict[int, Dict]] = {}
+        self.tags: Dict[int, str] = {}                           # tag_id -> tag_key
+        self.tag_translations: Dict[str, Dict[int, str]] = {}    # lang -> tag_id -> tag_name
+        self.tool_tags: Dict[int, List[Tuple[int, str]]] = {}    # tool_id -> [(tag_id, tag_type)]
+        self.features: Dict[Tuple[int, str], List[str]] = {}     # (tool_id, lang) -> 功能列表
+        self.identifiers: Dict[str, int] = {}                    # slug / id文本 -> tool_id
+        self.order: List[int] = []                               # 活跃工具按默认排序
+        self.category_counts: Dict[int, int] = {}                # category_id -> 活跃工具数
+        self.tag_usage: Dict[Tuple[int, str], int] = {}          # (tag_id, tag_type) -> 使用次数
+        self.version = 0
+        self.loaded_at = 0.0
+        # 加载前读取的数据库目录版本 (见 conditional.CatalogVersionSource), 快照数据不早于该版本
+        self.db_version: Optional[str] = None
+        self.db_updated_at: Optional[datetime] = None
+
+    def copy(self) -> 'CatalogSnapshot':
+        """浅拷贝顶层容器, 用于生成修补后的新快照"""
+        snap = CatalogSnapshot()
+        snap.tools = dict(self.tools)
+        snap.translations = {lang: dict(m) for lang, m in self.translations.items()}
+        snap.categories = self.categories
+        snap.category_translations = self.category_translations
+        snap.tags = self.tags
+        snap.tag_translations = self.tag_translations
+        snap.tool_tags = dict(self.tool_tags)
+        snap.features = dict(self.features)
+        snap.identifiers = dict(self.identifiers)
+        snap.order = list(self.order)
+        snap.category_counts = self.category_counts
+        snap.tag_usage = self.tag_usage
+        snap.version = self.version
+        snap.loaded_at = self.loaded_at
+        snap.db_version = self.db_version
+        snap.db_updated_at = self.db_updated_at
+        return snap
+
+    def _index_identifiers(self, tool_id: int, tool: Dict):
+        self.identifiers[str(tool_id)] = tool_id
+        if tool.get('slug'):
+            self.identifiers[tool['slug']] = tool_id
+
+    def rebuild_indexes(self):
+        """重建标识符索引、默认排序和分类/标签统计 (每个快照算一次, 请求直接读取)"""
+        self.identifiers = {}
+        for tool_id, tool in self.tools.items():
+            self._index_identifiers(tool_id, tool)
+        active = [tool for tool in self.tools.values() if tool.get('status') == 'active']
+        active.sort(key=_sort_key, reverse=True)
+        self.order = [tool['id'] for tool in active]
+
+        self.category_counts = {}
+        for tool in active:
+            category_id = tool.get('category_id')
+            self.category_counts[category_id] = self.category_counts.get(category_id, 0) + 1
+        self.tag_usage = {}
+        for tool_tags in self.tool_tags.values():
+            for key in tool_tags:
+                self.tag_usage[key] = self.tag_usage.get(key, 0) + 1
+
+    def update_indexes(self, base: 'CatalogSnapshot', changed: Set[int]):
+        """局部修补后只调整变更工具的索引: 从默认排序中移除后二分插入, 统计按差值增减
+        self 由 base.copy() 得到, 未变更工具的行与 base 相同
+        """
+        category_counts = dict(base.category_counts)
+        tag_usage = dict(base.tag_usage)
+        for tool_id in changed:
+            old = base.tools.get(tool_id)
+            if old is not None:
+                if self.identifiers.get(str(tool_id)) == tool_id:
+                    del self.identifiers[str(tool_id)]
+                if old.get('slug') and self.identifiers.get(old['slug']) == tool_id:
+                    del self.identifiers[old['slug']]
+                if old.get('status') == 'active':
+                    category_id = old.get('category_id')
+                    category_counts[category_id] = category_counts.get(category_id, 0) - 1
+                    if not category_counts[category_id]:
+                        del category_counts[category_id]
+            for key in base.tool_tags.get(tool_id, ()):
+                tag_usage[key] = tag_usage.get(key, 0) - 1
+                if not tag_usage[key]:
+                    del tag_usage[key]
+
+        order = [tool_id for tool_id in base.order if tool_id not in changed]
+        for tool_id in changed:
+            tool = self.tools.get(tool_id)
+            if tool is not None:
+                self._index_identifiers(tool_id, tool)
+                if tool.get('status') == 'active':
+                    category_id = tool.get('category_id')
+                    category_counts[category_id] = category_counts.get(category_id, 0) + 1
+                    order.insert(_insert_position(order, self.tools, _sort_key(tool)), tool_id)
+            for key in self.tool_tags.get(tool_id, ()):
+                tag_usage[key] = tag_usage.get(key, 0) + 1
+
+        self.order = order
+        self.category_counts = category_counts
+        self.tag_usage = tag_usage
+
+
+def _insert_position(order: List[int], tools: Dict[int, Dict], key: Tuple) -> int:
+    """order 按排序键降序, 返回 key 应插入的位置 (排序键含 id, 不会相等)"""
+    lo, hi = 0, len(order)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if _sort_key(tools[order[mid]]) > key:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+async def _load_tool_rows(conn, tool_ids: Optional[List[int]] = None) -> List:
+    columns = ', '.join(f"t.{col}" for col in TOOL_COLUMNS)
+    if tool_ids is None:
+        return await conn.fetch(f"SELECT {columns} FROM tools t")
+    return await conn.fetch(f"SELECT {columns} FROM tools t WHERE t.id = ANY($1)", tool_ids)
+
+
+async def _load_translation_rows(conn, tool_ids: Optional[List[int]] = None) -> List:
+    columns = ', '.join(TRANSLATION_COLUMNS)
+    query = f"SELECT tool_id, language_code, {columns} FROM tool_translations"
+    if tool_ids is None:
+        return await conn.fetch(query)
+    return await conn.fetch(query + " WHERE tool_id = ANY($1)", tool_ids)
+
+
+async def _load_tool_tag_rows(conn, tool_ids: Optional[List[int]] = None) -> List:
+    query = "SELECT tool_id, tag_id, tag_type FROM tool_tags"
+    if tool_ids is None:
+        return await conn.fetch(query)
+    return await conn.fetch(query + " WHERE tool_id = ANY($1)", tool_ids)
+
+
+async def _load_feature_rows(conn, tool_ids: Optional[List[int]] = None) -> List:
+    query = "SELECT tool_id, language_code, feature_text FROM tool_features"
+    if tool_ids is not None:
+        query += " WHERE tool_id = ANY($1)"
+    query += " ORDER BY tool_id, language_code, sort_order"
+    if tool_ids is None:
+        return await conn.fetch(query)
+    return await conn.fetch(query, tool_ids)
+
+
+def _apply_tool_rows(snap: CatalogSnapshot, tool_rows, translation_rows, tag_rows, feature_rows):
+    for row in tool_rows:
+        snap.tools[row['id']] = dict(row)
+    for row in translation_rows:
+        lang_map = snap.translations.setdefault(row['language_code'], {})
+        lang_map[row['tool_id']] = {col: row[col] for col in TRANSLATION_COLUMNS}
+    for row in tag_rows:
+        snap.tool_tags.setdefault(row['tool_id'], []).append((row['tag_id'], row['tag_type']))
+    for row in feature_rows:
+        snap.features.setdefault((row['tool_id'], row['language_code']), []).append(row['feature_text'])
+
+
+async def load_snapshot(conn) -> CatalogSnapshot:
+    """从数据库全量加载目录快照"""
+    snap = CatalogSnapshot()
+
+    _apply_tool_rows(
+        snap,
+        await _load_tool_rows(conn),
+        await _load_translation_rows(conn),
+        await _load_tool_tag_rows(conn),
+        await _load_feature_rows(conn),
+    )
+
+    for row in await conn.fetch("SELECT id, category_key, sort_order FROM categories"):
+        snap.categories[row['id']] = {'key': row['category_key'], 'sort_order': row['sort_order']}
+    for row in await conn.fetch(
+        "SELECT category_id, language_code, category_name, category_description FROM category_translations"
+    ):
+        snap.category_translations.setdefault(row['language_code'], {})[row['category_id']] = {
+            'category_name': row['category_name'],
+            'category_description': row['category_description'],
+        }
+    for row in await conn.fetch("SELECT id, tag_key FROM tags"):
+        snap.tags[row['id']] = row['tag_key']
+    for row in await conn.fetch("SELECT tag_id, language_code, tag_name FROM tag_translations"):
+        snap.tag_translations.setdefault(row['language_code'], {})[row['tag_id']] = row['tag_name']
+
+    snap.rebuild_indexes()
+    snap.loaded_at = time.time()
+    return snap
+
+
+async def patch_snapshot(conn, base: CatalogSnapshot, tool_ids: List[int]) -> CatalogSnapshot:
+    """只重新加载指定工具, 基于旧快照生成新快照; 索引只调整变更的工具, 不整体重排"""
+    snap = base.copy()
+    wanted = set(tool_ids)
+
+    for tool_id in wanted:
+        snap.tools.pop(tool_id, None)
+        snap.tool_tags.pop(tool_id, None)
+        for lang_map in snap.translations.values():
+            lang_map.pop(tool_id, None)
+    for key in [key for key in snap.features if key[0] in wanted]:
+        del snap.features[key]
+
+    ids = list(wanted)
+    _apply_tool_rows(
+        snap,
+        await _load_tool_rows(conn, ids),
+        await _load_translation_rows(conn, ids),
+        await _load_tool_tag_rows(conn, ids),
+        await _load_feature_rows(conn, ids),
+    )
+
+    snap.update_indexes(base, wanted)
+    snap.loaded_at = time.time()
+    return snap
+
+
+def category_rows(snap, language: str) -> List[Dict]:
+    """分类列表及活跃工具数; snap 需有 categories / category_translations / category_counts"""
+    counts = snap.category_counts
+    translations = snap.category_translations.get(language, {})
+    rows = []
+    for category_id, category in snap.categories.items():
+        translation = translations.get(category_id, {})
+        rows.append({
+            'category_key': category['key'],
+            'category_name': translation.get('category_name'),
+            'category_description': translation.get('category_description'),
+            'tool_count': counts.get(category_id, 0),
+            'sort_order': category.get('sort_order'),
+        })
+    # NULL sort_order 在 Postgres 升序中排在最后
+    rows.sort(key=lambda r: (r['sort_order'] is None, r['sort_order'] or 0, -r['tool_count']))
+    return rows
+
+
+def tag_rows(
+    snap,
+    language: str,
+    type: Optional[str] = None,
+    search: Optional[str] = None,
+    limit: int = 100,
+    popular: bool = False,
+) -> List[Dict]:
+    """与 /api/tags 两种模式的SQL语义一致; snap 需有 tags / tag_translations / tag_usage"""
+    names = snap.tag_translations.get(language, {})
+
+    usage = snap.tag_usage
+    needle = search.lower() if search else None
+    type_filter = type if type in ('general', 'industry') else None
+    rows = []
+
+    if popular:
+        for (tag_id, tag_type), count in usage.items():
+            if tag_id not in names or tag_id not in snap.tags:
+                continue
+            if type_filter and tag_type != type_filter:
+                continue
+            if needle and needle not in (names[tag_id] or '').lower():
+                continue
+            rows.append({'tag_key': snap.tags[tag_id], 'tag_name': names[tag_id],
+                         'tag_type': tag_type, 'usage_count': count})
+        rows.sort(key=lambda r: (-r['usage_count'], r['tag_name'] or ''))
+    else:
+        types_by_tag: Dict[int, List[Tuple[str, int]]] = {}
+        for (tag_id, tag_type), count in usage.items():
+            types_by_tag.setdefault(tag_id, []).append((tag_type, count))
+        for tag_id, tag_name in names.items():
+            if tag_id not in snap.tags:
+                continue
+            if needle and needle not in (tag_name or '').lower():
+                continue
+            stats = types_by_tag.get(tag_id) or [(None, 0)]
+            for tag_type, count in stats:
+                if type_filter and tag_type != type_filter:
+                    continue
+                rows.append({'tag_key': snap.tags[tag_id], 'tag_name': tag_name,
+                             'tag_type': tag_type or 'general', 'usage_count': count})
+        rows.sort(key=lambda r: r['tag_name'] or '')
+
+    return rows[:limit]
+
+
+class CatalogEngine:
+    """目录引擎: 持有当前快照, 负责加载、监听变更和定时刷新"""
+
+    def __init__(self, database_url: Optional[str] = None, refresh_interval: Optional[float] = None,
+                 debounce: Optional[float] = None):
+        self.database_url = database_url or os.getenv('DATABASE_URL')
+        self.refresh_interval = refresh_interval if refresh_interval is not None else float(
+            os.getenv('CATALOG_REFRESH_INTERVAL', '300')
+        )
+        # 收到 NOTIFY 后等待多久再修补, 期间的通知合并为一次 (批量导入时只修补一次)
+        self.debounce = debounce if debounce is not None else float(os.getenv('CATALOG_NOTIFY_DEBOUNCE', '0.5'))
+        self.snapshot: Optional[CatalogSnapshot] = None
+        self._pool = None
+        self._listener: Optional[asyncpg.Connection] = None
+        self._pending_tools: set = set()
+        self._pending_full = False
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        self._listeners: List = []
+        self._versions = CatalogVersionSource(ttl=0)
+        self.skipped_refreshes = 0
+
+    @property
+    def ready(self) -> bool:
+        return self.snapshot is not None
+
+    @property
+    def version(self) -> int:
+        return self.snapshot.version if self.snapshot else 0
+
+    def add_listener(self, callback):
+        """注册快照更新回调 callback(tool_ids), tool_ids 为 None 表示全量刷新"""
+        self._listeners.append(callback)
+
+    def _publish(self, snap: CatalogSnapshot, tool_ids: Optional[List[int]]):
+        snap.version = (self.snapshot.version if self.snapshot else 0) + 1
+        self.snapshot = snap
+        for callback in self._listeners:
+            try:
+                callback(tool_ids)
+            except Exception as e:
+                print(f"✗ 目录更新回调失败: {e}")
+
+    async def start(self, pool):
+        """加载初始快照并启动监听/刷新任务"""
+        self._pool = pool
+        await self.reload()
+        await self._connect_listener()
+        self._tasks = [
+            asyncio.create_task(self._apply_loop()),
+            asyncio.create_task(self._refresh_loop()),
+        ]
+        print(f"✓ 目录引擎已加载 {len(self.snapshot.order)} 个活跃工具")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._tasks = []
+        if self._listener is not None:
+            try:
+                await self._listener.close()
+            except Exception:
+                pass
+            self._listener = None
+
+    async def reload(self):
+        """全量重新加载"""
+        async with self._pool.acquire() as conn:
+            # 先读版本再读数据: 加载期间的写入只会让快照比版本新, 下次比较时再刷新一次
+            db_version, db_updated_at = await self._versions.read(conn)
+            snap = await load_snapshot(conn)
+        snap.db_version, snap.db_updated_at = db_version, db_updated_at
+        self._publish(snap, None)
+
+    async def refresh(self) -> bool:
+        """数据库目录版本与当前快照不同时才全量重新加载, 返回是否重新加载"""
+        if self.snapshot is not None:
+            async with self._pool.acquire() as conn:
+                db_version, _ = await self._versions.read(conn)
+            if db_version == self.snapshot.db_version:
+                self.skipped_refreshes += 1
+                return False
+        await self.reload()
+        return True
+
+    async def patch(self, tool_ids: List[int]):
+        """局部修补指定工具"""
+        if not self.snapshot:
+            return await self.reload()
+        async with self._pool.acquire() as conn:
+            db_version, db_updated_at = await self._versions.read(conn)
+            snap = await patch_snapshot(conn, self.snapshot, tool_ids)
+        snap.db_version, snap.db_updated_at = db_version, db_updated_at
+        self._publish(snap, list(tool_ids))
+
+    async def _connect_listener(self):
+        if not self.database_url:
+            return
+        try:
+            self._listener = await asyncpg.connect(self.database_url)
+            await self._listener.add_listener(CATALOG_CHANNEL, self._on_notify)
+        except Exception as e:
+            self._listener = None
+            print(f"✗ 目录变更监听失败, 仅依赖定时刷新: {e}")
+
+    def _on_notify(self, connection, pid, channel, payload):
+        """NOTIFY 回调: 只记录待处理项, 由后台任务合并执行"""
+        try:
+            message = json.loads(payload)
+            table = message.get('table')
+            tool_id = message.get('id')
+        except (ValueError, AttributeError):
+            table, tool_id = None, None
+
+        if table in TOOL_SCOPED_TABLES and tool_id is not None:
+            self._pending_tools.add(int(tool_id))
+        else:
+            self._pending_full = True
+        self._wakeup.set()
+
+    async def _apply_loop(self):
+        while True:
+            await self._wakeup.wait()
+            # 合并短时间内的多条通知
+            await asyncio.sleep(self.debounce)
+            self._wakeup.clear()
+            full, tool_ids = self._pending_full, list(self._pending_tools)
+            self._pending_full = False
+            self._pending_tools.clear()
+            try:
+                if full:
+                    await self.reload()
+                elif tool_ids:
+                    await self.patch(tool_ids)
+            except Exception as e:
+                print(f"✗ 目录增量更新失败: {e}")
+
+    async def _refresh_loop(self):
+        """定时兜底: 监听正常时只在数据库版本变化时刷新; 监听断开期间可能漏掉通知, 重连后总是全量刷新"""
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                if self._listener is None or self._listener.is_closed():
+                    await self._connect_listener()
+                    await self.reload()
+                else:
+                    await self.refresh()
+            except Exception as e:
+                print(f"✗ 目录定时刷新失败: {e}")
+
+    # ---- 查询接口, 返回与SQL行结构一致的字典, 交给 format_tool_response 格式化 ----
+
+    def _tool_row(self, snap: CatalogSnapshot, tool_id: int, language: str) -> Dict:
+        tool = snap.tools[tool_id]
+        translation = snap.translations.get(language, {}).get(tool_id, {})
+        category = snap.categories.get(tool.get('category_id'))
+        category_translation = {}
+        if category:
+            category_translation = snap.category_translations.get(language, {}).get(tool['category_id'], {})
+        row = dict(tool)
+        row.update({col: translation.get(col) for col in TRANSLATION_COLUMNS})
+        row['category_key'] = category['key'] if category else None
+        row['category_name'] = category_translation.get('category_name')
+        row['category_description'] = category_translation.get('category_description')
+        return row
+
+    def filter_tool_ids(
+        self,
+        language: str,
+        category: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        featured: bool = False,
+        search: Optional[str] = None,
+        scores: Optional[Dict[int, float]] = None,
+        snap: Optional[CatalogSnapshot] = None,
+    ) -> List[int]:
+        """按筛选条件返回排好序的工具ID列表; scores 为搜索引擎的命中结果, 提供时替代子串匹配
+        可指定快照 (流式输出跨多次 await, 需始终读同一个快照)
+        """
+        snap = snap or self.snapshot
+        ids = snap.order
+
+        if category:
+            ids = [
+                tool_id for tool_id in ids
+                if snap.categories.get(snap.tools[tool_id].get('category_id'), {}).get('key') == category
+            ]
+        if tags:
+            wanted = set(tags)
+            ids = [
+                tool_id for tool_id in ids
+                if any(snap.tags.get(tag_id) in wanted for tag_id, _ in snap.tool_tags.get(tool_id, ()))
+            ]
+        if featured:
+            ids = [tool_id for tool_id in ids if snap.tools[tool_id].get('featured')]
+        if scores is not None:
+            ids = [tool_id for tool_id in ids if tool_id in scores]
+        elif search:
+            needle = search.lower()
+            translations = snap.translations.get(language, {})
+            matched = []
+            for tool_id in ids:
+                translation = translations.get(tool_id)
+                if not translation:
+                    continue
+                if any(needle in (translation.get(col) or '').lower() for col in ('name', 'title', 'description')):
+                    matched.append(tool_id)
+            ids = matched
+        return ids
+
+    def top_tool_ids(self, order_by: str, limit: int) -> List[int]:
+        """按 TOP_SORT_KEYS 中的排序取前 limit 个活跃工具"""
+        snap = self.snapshot
+        key = TOP_SORT_KEYS[order_by]
+        return heapq.nlargest(limit, snap.order, key=lambda tool_id: key(snap.tools[tool_id]))
+
+    def tool_rows(self, tool_ids: List[int], language: str, snap: Optional[CatalogSnapshot] = None) -> List[Dict]:
+        """组装列表行, 标签为 tag_key 列表; 可指定快照 (供后台线程使用)"""
+        snap = snap or self.snapshot
+        rows = []
+        for tool_id in tool_ids:
+            row = self._tool_row(snap, tool_id, language)
+            row['tags'] = [snap.tags[tag_id] for tag_id, _ in snap.tool_tags.get(tool_id, ()) if tag_id in snap.tags]
+            rows.append(row)
+        return rows
+
+    def list_tool_ids(
+        self,
+        language: str,
+        category: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        featured: bool = False,
+        search: Optional[str] = None,
+        page: int = 1,
+        limit: int = 12,
+        all: bool = False,
+        after: Optional[Tuple] = None,
+        keyset: bool = False,
+        scores: Optional[Dict[int, float]] = None,
+        by_relevance: bool = False,
+    ) -> Tuple[List[int], int]:
+        """返回 (当前页工具ID, 总数); 游标模式下多返回一个用于判断是否有下一页"""
+        ids = self.filter_tool_ids(language, category, tags, featured, search, scores)
+        if scores is not None and by_relevance:
+            # 稳定排序, 同分时保持默认排序
+            ids = sorted(ids, key=lambda tool_id: -scores[tool_id])
+        total = len(ids)
+        if keyset:
+            start = self._seek(ids, after) if after is not None else 0
+            ids = ids[start:start + limit + 1]
+        elif not all:
+            offset = (page - 1) * limit
+            ids = ids[offset:offset + limit]
+        return ids, total
+
+    def _seek(self, ids: List[int], after: Tuple) -> int:
+        """二分查找游标之后的第一个位置 (ids 按排序键降序)"""
+        tools = self.snapshot.tools
+        after_key = _sort_key(dict(zip(SORT_COLUMNS, after)))
+        lo, hi = 0, len(ids)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if _sort_key(tools[ids[mid]]) >= after_key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def resolve(self, tool_identifier: str, active_only: bool = True) -> Optional[int]:
+        snap = self.snapshot
+        tool_id = snap.identifiers.get(tool_identifier)
+        if tool_id is None:
+            return None
+        if active_only and snap.tools[tool_id].get('status') != 'active':
+            return None
+        return tool_id
+
+    def get_tool_detail(self, tool_identifier: str, language: str) -> Optional[Dict]:
+        """详情行, 标签按 general/industry 拆分为本地化名称"""
+        tool_id = self.resolve(tool_identifier)
+        if tool_id is None:
+            return None
+        snap = self.snapshot
+        row = self._tool_row(snap, tool_id, language)
+        tag_names = snap.tag_translations.get(language, {})
+        tool_tags = [
+            (tag_names[tag_id], tag_type)
+            for tag_id, tag_type in snap.tool_tags.get(tool_id, ())
+            if tag_id in tag_names
+        ]
+        row['tags'] = [name for name, tag_type in tool_tags if tag_type == 'general']
+        row['industry_tags'] = [name for name, tag_type in tool_tags if tag_type == 'industry']
+        row['key_features'] = list(snap.features.get((tool_id, language), []))
+        return row
+
+    def list_categories(self, language: str) -> List[Dict]:
+        return category_rows(self.snapshot, language)
+
+    def list_tags(
+        self,
+        language: str,
+        type: Optional[str] = None,
+        search: Optional[str] = None,
+        limit: int = 100,
+        popular: bool = False,
+    ) -> List[Dict]:
+        return tag_rows(self.snapshot, language, type, search, limit, popular)
+
+    def sort_row(self, tool_id: int) -> Dict:
+        """游标编码用的行 (含 SORT_COLUMNS)"""
+        return self.snapshot.tools[tool_id]
+
+    def data_version(self) -> Tuple[str, datetime]:
+        """当前快照对应的数据库目录版本和修改时间, 用于 ETag / Last-Modified 和响应缓存键
+        取自数据库而非进程内计数, 数据相同的快照在各 worker 之间、重新加载前后得到相同的标识
+        """
+        snap = self.snapshot
+        last_modified = snap.db_updated_at or datetime.fromtimestamp(snap.loaded_at, timezone.utc)
+        return f"m{snap.db_version}", last_modified
+
+    def stats(self) -> Dict[str, Any]:
+        snap = self.snapshot
+        if not snap:
+            return {"ready": False}
+        return {
+            "ready": True,
+            "version": snap.version,
+            "active_tools": len(snap.order),
+            "loaded_at": snap.loaded_at,
+            "db_version": snap.db_version,
+            "skipped_refreshes": self.skipped_refreshes,
+            "listening": self._listener is not None and not self._listener.is_closed(),
+        }
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+分类/标签使用统计
+读取 sql/005_catalog_stats.sql 创建的汇总表 category_stats / tag_stats (由触发器增量维护),
+/api/categories 和 /api/tags 不再对 tools / tool_tags 做全表分组, 开销只与返回行数有关
+
+全量重建:
+    python backend/app/catalog_stats.py rebuild
+    python backend/app/catalog_stats.py check    # 对比汇总表与实时分组结果
+"""
+
+import os
+import sys
+import asyncio
+from typing import List, Optional, Tuple
+
+CATEGORIES_STATS_QUERY = """
+    SELECT
+        c.category_key,
+        ct.category_name,
+        ct.category_description,
+        COALESCE(cs.active_tool_count, 0) as tool_count
+    FROM categories c
+    LEFT JOIN category_translations ct ON c.id = ct.category_id AND ct.language_code = $1
+    LEFT JOIN category_stats cs ON c.id = cs.category_id
+    ORDER BY c.sort_order, tool_count DESC
+"""
+
+# 汇总表与实时分组的差异, 用于 check
+_DRIFT_QUERY = """
+    WITH category_live AS (
+        SELECT category_id, COUNT(*) AS n FROM tools
+        WHERE status = 'active' AND category_id IS NOT NULL GROUP BY category_id
+    ), category_stored AS (
+        SELECT category_id, active_tool_count AS n FROM category_stats WHERE active_tool_count <> 0
+    ), tag_live AS (
+        SELECT tag_id, tag_type, COUNT(*) AS n FROM tool_tags
+        WHERE tag_id IS NOT NULL AND tag_type IS NOT NULL GROUP BY tag_id, tag_type
+    )
+    SELECT 'category' AS kind, COUNT(*) AS rows
+    FROM category_live l FULL JOIN category_stored s USING (category_id)
+    WHERE l.n IS DISTINCT FROM s.n
+    UNION ALL
+    SELECT 'tag', COUNT(*)
+    FROM tag_live l FULL JOIN tag_stats s USING (tag_id, tag_type)
+    WHERE l.n IS DISTINCT FROM s.usage_count
+"""
+
+
+def build_tags_stats_query(
+    language: str,
+    type: Optional[str],
+    search: Optional[str],
+    limit: int,
+    popular: bool,
+) -> Tuple[str, List]:
+    """与 /api/tags 原有两种模式语义一致的查询, 统计取自 tag_stats"""
+    params: List = [language]
+    where_conditions = []
+
+    if popular:
+        # 只包含有使用记录的标签, 按使用次数取前N个
+        query = """
+            SELECT
+                t.tag_key,
+                ttr.tag_name,
+                ts.tag_type,
+                ts.usage_count
+            FROM tag_stats ts
+            JOIN tags t ON t.id = ts.tag_id
+            JOIN tag_translations ttr ON t.id = ttr.tag_id AND ttr.language_code = $1
+        """
+        order_clause = "ts.usage_count DESC, ttr.tag_name ASC"
+    else:
+        # 所有标签 (包括未使用的), 按名称取前N个
+        query = """
+            SELECT
+                t.tag_key,
+                ttr.tag_name,
+                COALESCE(ts.tag_type, 'general') as tag_type,
+                COALESCE(ts.usage_count, 0) as usage_count
+            FROM tags t
+            JOIN tag_translations ttr ON t.id = ttr.tag_id AND ttr.language_code = $1
+            LEFT JOIN tag_stats ts ON t.id = ts.tag_id
+        """
+        order_clause = "ttr.tag_name ASC"
+
+    if type and type in ['general', 'industry']:
+        params.append(type)
+        where_conditions.append(f"ts.tag_type = ${len(params)}")
+
+    if search:
+        params.append(f"%{search}%")
+        where_conditions.append(f"ttr.tag_name ILIKE ${len(params)}")
+
+    if where_conditions:
+        query += " WHERE " + " AND ".join(where_conditions)
+    query += f" ORDER BY {order_clause} LIMIT {int(limit)}"
+    return query, params
+
+
+async def detect_stats(conn) -> bool:
+    """检查汇总表是否已由迁移创建"""
+    return bool(await conn.fetchval("""
+        SELECT to_regclass('category_stats') IS NOT NULL AND to_regclass('tag_stats') IS NOT NULL
+    """))
+
+
+async def rebuild_stats(conn):
+    await conn.execute("SELECT rebuild_catalog_stats()")
+
+
+async def check_stats(conn) -> dict:
+    return {row['kind']: row['rows'] for row in await conn.fetch(_DRIFT_QUERY)}
+
+
+async def _main(command: str):
+    import asyncpg
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    database_url = os.getenv('DATABASE_URL')
+    if not database_url:
+        raise SystemExit("DATABASE_URL环境变量未设置")
+
+    conn = await asyncpg.connect(database_url)
+    try:
+        if not await detect_stats(conn):
+            raise SystemExit("✗ 统计汇总表不存在, 请先执行 sql/005_catalog_stats.sql")
+        if command == 'rebuild':
+            await rebuild_stats(conn)
+            print("✓ 分类/标签统计已全量重建")
+        drift = await check_stats(conn)
+        print(f"✓ 与实时统计的差异行数: 分类 {drift.get('category', 0)}, 标签 {drift.get('tag', 0)}")
+    finally:
+        await conn.close()
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else ''
+    if command not in ('rebuild', 'check'):
+        raise SystemExit("用法: python catalog_stats.py rebuild|check")
+    asyncio.run(_main(command))
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+目录接口的条件请求支持 (ETag / If-None-Match / Last-Modified / If-Modified-Since)
+目录快照就绪时版本取自快照本身 (应答即由快照生成); 否则优先取 catalog_version 计数器
+(sql/004_catalog_version.sql), 未执行迁移时退回 tools 表的 max(updated_at) + 行数。
+版本在进程内缓存很短时间, 命中 If-None-Match 时直接返回 304, 不执行数据查询。
+本请求使用的版本同时绑定到上下文, 响应缓存以它作为键的一部分, 缓存的应答不会比 ETag 旧。
+"""
+
+import os
+import time
+import hashlib
+import contextvars
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional, Tuple
+
+VERSION_QUERY = "SELECT version, updated_at FROM catalog_version WHERE id"
+
+FALLBACK_VERSION_QUERY = "SELECT COUNT(*) AS version, MAX(updated_at) AS updated_at FROM tools"
+
+# 当前请求生成 ETag 所用的数据版本, 由条件请求中间件设置
+_data_version: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar('data_version', default=None)
+
+
+def bind_data_version(version: str) -> contextvars.Token:
+    return _data_version.set(version)
+
+
+def release_data_version(token: contextvars.Token):
+    _data_version.reset(token)
+
+
+def current_data_version() -> Optional[str]:
+    """本请求的数据版本, 不在条件请求范围内时为 None"""
+    return _data_version.get()
+
+
+class CatalogVersionSource:
+    """解析并短暂缓存当前目录版本 (version_token, last_modified)"""
+
+    def __init__(self, ttl: Optional[float] = None):
+        self.ttl = ttl if ttl is not None else float(os.getenv('ETAG_VERSION_TTL', '2'))
+        self._cached: Optional[Tuple[str, Optional[datetime]]] = None
+        self._expires_at = 0.0
+        self._use_counter: Optional[bool] = None
+
+    def invalidate(self, *_):
+        """目录变更时丢弃缓存的版本 (可直接作为目录引擎的更新回调)"""
+        self._expires_at = 0.0
+
+    async def read(self, conn) -> Tuple[str, Optional[datetime]]:
+        """直接读取当前版本, 不经过缓存"""
+        if self._use_counter is None:
+            self._use_counter = bool(await conn.fetchval("SELECT to_regclass('catalog_version') IS NOT NULL"))
+        if self._use_counter:
+            row = await conn.fetchrow(VERSION_QUERY)
+            if row is not None:
+                return f"v{row['version']}", row['updated_at']
+        row = await conn.fetchrow(FALLBACK_VERSION_QUERY)
+        updated_at = row['updated_at']
+        stamp = updated_at.isoformat() if updated_at else ''
+        return f"c{row['version']}-{stamp}", updated_at
+
+    async def get(self, pool) -> Tuple[str, Optional[datetime]]:
+        now = time.monotonic()
+        if self._cached is not None and now < self._expires_at:
+            return self._cached
+        async with pool.acquire() as conn:
+            self._cached = await self.read(conn)
+        self._expires_at = now + self.ttl
+        return self._cached
+
+
+def make_etag(version: str, path: str, query: str) -> str:
+    """强 ETag: 目录版本 + 路径 + 规范化查询参数"""
+    canonical_query = '&'.join(sorted(query.split('&'))) if query else ''
+    digest = hashlib.sha1(f"{version}|{path}|{canonical_query}".encode('utf-8')).hexdigest()[:20]
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match 使用弱比较: 忽略 W/ 前缀, 支持 * 和逗号分隔的多个值"""
+    if if_none_match.strip() == '*':
+        return True
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def format_http_date(value: datetime) -> str:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def not_modified_since(if_modified_since: str, last_modified: datetime) -> bool:
+    """Last-Modified 精度为秒, 不晚于 If-Modified-Since 即视为未修改"""
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since is None:
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    return last_modified.replace(microsecond=0) <= since
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+列表总数统计策略
+- window:   在数据查询中用 COUNT(*) OVER() 一并返回总数, 省去单独的COUNT往返
+- cached:   按规范化的筛选条件缓存精确总数, 目录变更时失效
+- estimate: approximate_total=true 时对宽泛查询使用查询规划器估算行数
+"""
+
+import os
+import json
+import time
+from collections import OrderedDict
+from typing import Optional, List, Tuple
+
+# 分页信息中 total_source 的取值
+TOTAL_WINDOW = 'window'
+TOTAL_COUNT_QUERY = 'count_query'
+TOTAL_CACHED = 'cached'
+TOTAL_ESTIMATE = 'estimate'
+TOTAL_MEMORY = 'memory'
+
+# 数据查询中携带总数的列名
+WINDOW_COUNT_COLUMN = '_total_count'
+
+
+def filter_key(language: str, category: Optional[str], tags: Optional[List[str]],
+               featured: bool, search: Optional[str]) -> Tuple:
+    """规范化筛选条件, 作为计数缓存键"""
+    return (
+        language,
+        category or None,
+        tuple(sorted(set(tags))) if tags else None,
+        bool(featured),
+        search.strip().lower() if search and search.strip() else None,
+    )
+
+
+class CountCache:
+    """带TTL和容量上限的精确总数缓存"""
+
+    def __init__(self, ttl: Optional[float] = None, max_entries: int = 2048):
+        self.ttl = ttl if ttl is not None else float(os.getenv('COUNT_CACHE_TTL', '300'))
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Tuple, Tuple[int, float]]' = OrderedDict()
+
+    def get(self, key: Tuple) -> Optional[int]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        total, expires_at = entry
+        if expires_at < time.monotonic():
+            self._entries.pop(key, None)
+            return None
+        self._entries.move_to_end(key)
+        return total
+
+    def set(self, key: Tuple, total: int):
+        self._entries[key] = (total, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self, *_):
+        """目录变更时整体失效 (可直接作为目录引擎的更新回调)"""
+        self._entries.clear()
+
+
+def is_broad_query(tags: Optional[List[str]], search: Optional[str]) -> bool:
+    """没有搜索和标签子查询的条件, 规划器的行数估算足够可靠"""
+    return not tags and not search
+
+
+async def estimate_total(conn, from_where_sql: str, params: List, min_rows: Optional[int] = None) -> Optional[int]:
+    """用 EXPLAIN 的估算行数作为总数; 估算值太小时返回 None 以便走精确计数"""
+    if min_rows is None:
+        min_rows = int(os.getenv('APPROX_TOTAL_MIN_ROWS', '1000'))
+    plan = await conn.fetchval(f"EXPLAIN (FORMAT JSON) SELECT 1 {from_where_sql}", *params)
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    rows = int(plan[0]['Plan']['Plan Rows'])
+    if rows < min_rows:
+        return None
+    return rows
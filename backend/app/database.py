@@ -0,0 +1,478 @@
+#!/usr/bin/env python3
+"""
+数据库连接池
+- 启动阶段创建并预热: 建立 DB_POOL_MIN_SIZE 个连接, 每个新连接在 init 钩子中用 prepare 预先准备热点语句,
+  冷启动的连接建立、语句解析和类型内省不落在用户请求上
+- 创建过程由锁保护, 并发的首次调用只会创建一个连接池
+- 池大小、语句缓存、空闲连接存活时间和各项超时由环境变量配置
+- 记录每次获取连接的等待时间 (含按需新建连接), 通过 stats() 暴露
+- 只通过公开接口 (create_pool / acquire / release / prepare / add_query_logger) 使用 asyncpg
+- 配置只读副本时由 DatabaseRouter 分流: 写入走主库, 读接口走复制延迟在阈值内的副本,
+  副本全部不可用或延迟过大时回退主库; 写入后的短时间内同一客户端 (cookie 标记) 的读也走主库
+
+    DB_POOL_MIN_SIZE / DB_POOL_MAX_SIZE              连接数下限/上限 (默认 1 / 10)
+    DB_STATEMENT_CACHE_SIZE                          每个连接缓存的预备语句数 (默认 100, 0 关闭)
+    DB_POOL_MAX_INACTIVE_LIFETIME                    空闲连接关闭前的秒数 (默认 300, 0 不关闭)
+    DB_POOL_MAX_QUERIES                              单个连接执行多少次查询后重建 (默认 50000)
+    DB_COMMAND_TIMEOUT / DB_CONNECT_TIMEOUT          语句/建连超时秒数 (默认 60 / 60)
+    DB_ACQUIRE_TIMEOUT                               获取连接的默认超时秒数 (默认不限)
+    DATABASE_REPLICA_URLS                            只读副本 DSN, 逗号分隔 (可与主库同一实例)
+    DB_REPLICA_MAX_LAG / DB_REPLICA_CHECK_INTERVAL   允许的复制延迟/检查间隔秒数 (默认 5 / 1)
+    DB_READ_YOUR_WRITES_SECONDS                      写入后读主库的时长 (默认 5, 0 关闭)
+"""
+
+import os
+import math
+import time
+import asyncio
+import itertools
+import contextvars
+import asyncpg
+from typing import Optional, Dict, List, Callable, Iterable
+
+# 获取连接等待时间的分桶上界 (秒)
+ACQUIRE_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# 副本回放延迟 (秒): 已回放完收到的全部 WAL 时为 0, 否则为距最后一次回放事务的时间; 非副本为 0
+REPLICA_LAG_QUERY = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END::float8
+"""
+
+# 标记客户端最近写入过的 cookie, 值为读主库截止的时间戳
+READ_YOUR_WRITES_COOKIE = 'db_primary_until'
+
+# 多台服务器之间允许的时钟偏差 (秒), cookie 截止时间超出 当前时间 + 窗口 + 偏差 视为伪造
+READ_YOUR_WRITES_CLOCK_SKEW = 1.0
+
+# 当前请求读主库的截止时间, 由中间件根据 cookie 设置
+_pinned_until: contextvars.ContextVar[float] = contextvars.ContextVar('db_pinned_until', default=0.0)
+
+
+def _env_float(name: str, default: Optional[float]) -> Optional[float]:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+class AcquireWaitStats:
+    """获取连接等待时间的累计直方图"""
+
+    def __init__(self, buckets=ACQUIRE_WAIT_BUCKETS):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.timeouts = 0
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.total_seconds += seconds
+        if seconds > self.max_seconds:
+            self.max_seconds = seconds
+        for index, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.bucket_counts[index] += 1
+                break
+
+    def stats(self) -> Dict:
+        return {
+            "count": self.count,
+            "timeouts": self.timeouts,
+            "avg_ms": round(self.total_seconds / self.count * 1000, 3) if self.count else 0.0,
+            "max_ms": round(self.max_seconds * 1000, 3),
+            # 累计分布: 等待时间 <= 上界的次数
+            "buckets": {
+                f"le_{bound * 1000:g}ms": sum(self.bucket_counts[:index + 1])
+                for index, bound in enumerate(self.buckets)
+            },
+        }
+
+
+class TimedPool:
+    """asyncpg 连接池的包装: 记录获取连接的等待时间, acquire 未指定超时时使用默认超时
+    应用中用到的连接池接口 (acquire / fetch* / execute / get_size 等) 都在这里转发
+    """
+
+    def __init__(self, pool: asyncpg.Pool, wait_stats: AcquireWaitStats, acquire_timeout: Optional[float] = None):
+        self.pool = pool
+        self.wait_stats = wait_stats
+        self.acquire_timeout = acquire_timeout
+
+    def acquire(self, *, timeout: Optional[float] = None) -> '_TimedAcquire':
+        """与 asyncpg 相同, 既可 async with 也可 await (之后需 release)"""
+        return _TimedAcquire(self, timeout)
+
+    async def _timed_acquire(self, timeout: Optional[float]) -> asyncpg.Connection:
+        started = time.perf_counter()
+        try:
+            connection = await self.pool.acquire(timeout=timeout if timeout is not None else self.acquire_timeout)
+        except asyncio.TimeoutError:
+            self.wait_stats.timeouts += 1
+            raise
+        self.wait_stats.observe(time.perf_counter() - started)
+        return connection
+
+    async def release(self, connection: asyncpg.Connection, *, timeout: Optional[float] = None):
+        await self.pool.release(connection, timeout=timeout)
+
+    async def execute(self, query: str, *args, timeout: Optional[float] = None) -> str:
+        async with self.acquire() as conn:
+            return await conn.execute(query, *args, timeout=timeout)
+
+    async def fetch(self, query: str, *args, timeout: Optional[float] = None) -> List:
+        async with self.acquire() as conn:
+            return await conn.fetch(query, *args, timeout=timeout)
+
+    async def fetchrow(self, query: str, *args, timeout: Optional[float] = None):
+        async with self.acquire() as conn:
+            return await conn.fetchrow(query, *args, timeout=timeout)
+
+    async def fetchval(self, query: str, *args, column: int = 0, timeout: Optional[float] = None):
+        async with self.acquire() as conn:
+            return await conn.fetchval(query, *args, column=column, timeout=timeout)
+
+    def get_size(self) -> int:
+        return self.pool.get_size()
+
+    def get_idle_size(self) -> int:
+        return self.pool.get_idle_size()
+
+    async def close(self):
+        await self.pool.close()
+
+    def terminate(self):
+        self.pool.terminate()
+
+
+class _TimedAcquire:
+    __slots__ = ('pool', 'timeout', 'connection')
+
+    def __init__(self, pool: TimedPool, timeout: Optional[float]):
+        self.pool = pool
+        self.timeout = timeout
+        self.connection: Optional[asyncpg.Connection] = None
+
+    def __await__(self):
+        return self.pool._timed_acquire(self.timeout).__await__()
+
+    async def __aenter__(self) -> asyncpg.Connection:
+        self.connection = await self.pool._timed_acquire(self.timeout)
+        return self.connection
+
+    async def __aexit__(self, *exc):
+        connection, self.connection = self.connection, None
+        await self.pool.release(connection)
+
+
+class Database:
+    """连接池的创建、预热和关闭, 由应用启动/关闭事件管理"""
+
+    def __init__(
+        self,
+        database_url: Optional[str] = None,
+        min_size: int = 1,
+        max_size: int = 10,
+        statement_cache_size: int = 100,
+        max_inactive_lifetime: float = 300.0,
+        max_queries: int = 50000,
+        command_timeout: Optional[float] = 60.0,
+        connect_timeout: float = 60.0,
+        acquire_timeout: Optional[float] = None,
+        name: str = 'primary',
+        query_log=None,
+    ):
+        self.database_url = database_url
+        self.name = name
+        self.min_size = min_size
+        self.max_size = max(max_size, min_size)
+        self.statement_cache_size = statement_cache_size
+        self.max_inactive_lifetime = max_inactive_lifetime
+        self.max_queries = max_queries
+        self.command_timeout = command_timeout
+        self.connect_timeout = connect_timeout
+        self.acquire_timeout = acquire_timeout
+        # query_log.QueryLog, 启用时在每个新连接上注册查询回调
+        self.query_log = query_log
+        self.pool: Optional[TimedPool] = None
+        self.wait_stats = AcquireWaitStats()
+        self._lock = asyncio.Lock()
+        # 返回需要预先准备的语句文本, 在每个新连接上调用
+        self._warm_statements: Optional[Callable[[], Iterable[str]]] = None
+        self.prepared_statements = 0
+        self.failed_statements = 0
+        self.connections_initialized = 0
+        self.warmup_seconds = 0.0
+
+    @classmethod
+    def from_env(cls, database_url: Optional[str] = None, name: str = 'primary', query_log=None) -> 'Database':
+        """连接池参数取自环境变量; 只读副本传入各自的 database_url, 共用同一组参数"""
+        return cls(
+            name=name,
+            query_log=query_log,
+            database_url=database_url or os.getenv('DATABASE_URL'),
+            min_size=int(os.getenv('DB_POOL_MIN_SIZE', '1')),
+            max_size=int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+            statement_cache_size=int(os.getenv('DB_STATEMENT_CACHE_SIZE', '100')),
+            max_inactive_lifetime=float(os.getenv('DB_POOL_MAX_INACTIVE_LIFETIME', '300')),
+            max_queries=int(os.getenv('DB_POOL_MAX_QUERIES', '50000')),
+            command_timeout=_env_float('DB_COMMAND_TIMEOUT', 60.0),
+            connect_timeout=float(os.getenv('DB_CONNECT_TIMEOUT', '60')),
+            acquire_timeout=_env_float('DB_ACQUIRE_TIMEOUT', None),
+        )
+
+    def set_warm_statements(self, statements: Callable[[], Iterable[str]]):
+        """注册热点语句; 需在连接池创建前调用"""
+        self._warm_statements = statements
+
+    async def _init_connection(self, conn):
+        """新连接的 init 钩子: 预先准备热点语句, 单条失败 (如可选迁移未执行) 不影响连接
+        prepare 完成服务端解析并内省结果/参数类型 (类型编解码器按连接缓存), 请求中首次执行时不再查询类型信息
+        """
+        self.connections_initialized += 1
+        if self.query_log is not None:
+            self.query_log.attach(conn, self)
+        if self._warm_statements is None or self.statement_cache_size <= 0:
+            return
+        for query in self._warm_statements():
+            try:
+                await conn.prepare(query)
+                self.prepared_statements += 1
+            except asyncpg.PostgresError:
+                self.failed_statements += 1
+
+    async def _create(self) -> TimedPool:
+        if not self.database_url:
+            raise ValueError("DATABASE_URL环境变量未设置")
+        started = time.perf_counter()
+        # 等待期间创建 min_size 个连接, 每个连接执行 init 钩子
+        pool = await asyncpg.create_pool(
+            self.database_url,
+            min_size=self.min_size,
+            max_size=self.max_size,
+            max_queries=self.max_queries,
+            max_inactive_connection_lifetime=self.max_inactive_lifetime,
+            init=self._init_connection,
+            statement_cache_size=self.statement_cache_size,
+            command_timeout=self.command_timeout,
+            timeout=self.connect_timeout,
+        )
+        self.warmup_seconds = time.perf_counter() - started
+        return TimedPool(pool, self.wait_stats, self.acquire_timeout)
+
+    async def get(self) -> TimedPool:
+        """返回连接池, 尚未创建时创建 (加锁, 并发调用只创建一次)"""
+        if self.pool is not None:
+            return self.pool
+        async with self._lock:
+            if self.pool is None:
+                self.pool = await self._create()
+                print(f"✓ 数据库连接池创建成功 [{self.name}] ({self.min_size}~{self.max_size} 个连接, "
+                      f"预热 {self.warmup_seconds * 1000:.0f}ms, 预备语句 {self.prepared_statements} 条)")
+        return self.pool
+
+    async def start(self) -> TimedPool:
+        return await self.get()
+
+    async def close(self):
+        async with self._lock:
+            if self.pool is not None:
+                await self.pool.close()
+                self.pool = None
+                print(f"✓ 数据库连接池已关闭 [{self.name}]")
+
+    def stats(self) -> Dict:
+        stats = {
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "statement_cache_size": self.statement_cache_size,
+            "connections_initialized": self.connections_initialized,
+            "prepared_statements": self.prepared_statements,
+            "failed_statements": self.failed_statements,
+            "warmup_ms": round(self.warmup_seconds * 1000, 1),
+            "acquire_wait": self.wait_stats.stats(),
+        }
+        if self.pool is not None:
+            stats["size"] = self.pool.get_size()
+            stats["idle"] = self.pool.get_idle_size()
+        return stats
+
+
+class Replica:
+    """一个只读副本的连接池及最近一次延迟检查结果"""
+
+    def __init__(self, database: Database):
+        self.database = database
+        self.lag: Optional[float] = None
+        self.healthy = False
+        self.error: Optional[str] = None
+        self.checked_at = 0.0
+
+    async def check(self, max_lag: float, timeout: float):
+        try:
+            pool = await self.database.get()
+            self.lag = await pool.fetchval(REPLICA_LAG_QUERY, timeout=timeout)
+            self.error = None
+            self.healthy = self.lag <= max_lag
+        except Exception as e:
+            self.error = str(e) or type(e).__name__
+            self.healthy = False
+        self.checked_at = time.time()
+
+    def stats(self) -> Dict:
+        return {
+            "name": self.database.name,
+            "healthy": self.healthy,
+            "lag_seconds": round(self.lag, 3) if self.lag is not None else None,
+            "error": self.error,
+            "pool": self.database.stats(),
+        }
+
+
+class DatabaseRouter:
+    """主库 + 只读副本的连接池路由; 未配置副本时读写都走主库"""
+
+    def __init__(
+        self,
+        primary: Database,
+        replicas: Optional[List[Database]] = None,
+        max_lag: float = 5.0,
+        check_interval: float = 1.0,
+        read_your_writes_seconds: float = 5.0,
+    ):
+        self.primary = primary
+        self.replicas = [Replica(database) for database in replicas or []]
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.read_your_writes_seconds = read_your_writes_seconds
+        self._round_robin = itertools.count()
+        self._checker: Optional[asyncio.Task] = None
+        self.reads = {"replica": 0, "primary": 0, "fallback": 0, "pinned": 0}
+        self.writes = 0
+
+    @classmethod
+    def from_env(cls, query_log=None) -> 'DatabaseRouter':
+        urls = [url.strip() for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+        return cls(
+            primary=Database.from_env(query_log=query_log),
+            replicas=[
+                Database.from_env(url, name=f'replica{index + 1}', query_log=query_log)
+                for index, url in enumerate(urls)
+            ],
+            max_lag=float(os.getenv('DB_REPLICA_MAX_LAG', '5')),
+            check_interval=float(os.getenv('DB_REPLICA_CHECK_INTERVAL', '1')),
+            read_your_writes_seconds=float(os.getenv('DB_READ_YOUR_WRITES_SECONDS', '5')),
+        )
+
+    def set_warm_statements(self, statements: Callable[[], Iterable[str]]):
+        self.primary.set_warm_statements(statements)
+        for replica in self.replicas:
+            replica.database.set_warm_statements(statements)
+
+    # ---- 路由 ----
+
+    async def writer(self) -> TimedPool:
+        """写入使用的主库连接池"""
+        self.writes += 1
+        return await self.primary.get()
+
+    async def reader(self) -> TimedPool:
+        """读接口使用的连接池: 轮询健康副本; 客户端刚写入过或没有可用副本时使用主库"""
+        if not self.replicas:
+            self.reads["primary"] += 1
+            return await self.primary.get()
+        if self.pinned():
+            self.reads["pinned"] += 1
+            return await self.primary.get()
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            self.reads["fallback"] += 1
+            return await self.primary.get()
+        self.reads["replica"] += 1
+        return await healthy[next(self._round_robin) % len(healthy)].database.get()
+
+    # ---- 读己之写 ----
+
+    def pinned(self) -> bool:
+        return _pinned_until.get() > time.time()
+
+    def pin_from_cookie(self, value: Optional[str]) -> Optional[contextvars.Token]:
+        """请求开始时调用: cookie 中的截止时间未到时, 本请求的读走主库
+        cookie 由客户端回传, 不可信: 非有限数或超出本服务能签发的最大截止时间 (当前时间 + 窗口) 的值忽略
+        """
+        if not value or not self.replicas or self.read_your_writes_seconds <= 0:
+            return None
+        try:
+            until = float(value)
+        except ValueError:
+            return None
+        now = time.time()
+        if not math.isfinite(until) or until <= now:
+            return None
+        if until > now + self.read_your_writes_seconds + READ_YOUR_WRITES_CLOCK_SKEW:
+            return None
+        return _pinned_until.set(until)
+
+    def release_pin(self, token: Optional[contextvars.Token]):
+        """请求结束时调用, 撤销 pin_from_cookie 的设置"""
+        if token is not None:
+            _pinned_until.reset(token)
+
+    def pin(self, response):
+        """写入成功后调用: 在响应上设置 cookie, 该客户端随后的读在窗口期内走主库"""
+        if not self.replicas or self.read_your_writes_seconds <= 0:
+            return
+        until = time.time() + self.read_your_writes_seconds
+        _pinned_until.set(until)
+        response.set_cookie(
+            READ_YOUR_WRITES_COOKIE, f"{until:.3f}",
+            max_age=math.ceil(self.read_your_writes_seconds), httponly=True, samesite='lax',
+        )
+
+    # ---- 生命周期 ----
+
+    async def check_replicas(self):
+        timeout = max(1.0, self.check_interval)
+        await asyncio.gather(*(replica.check(self.max_lag, timeout) for replica in self.replicas))
+
+    async def _check_loop(self):
+        while True:
+            await asyncio.sleep(max(0.1, self.check_interval))
+            await self.check_replicas()
+
+    async def start(self) -> TimedPool:
+        """创建并预热主库和副本连接池, 返回主库连接池; 副本不可用时不影响启动"""
+        pool = await self.primary.start()
+        if self.replicas:
+            await self.check_replicas()
+            for replica in self.replicas:
+                if replica.healthy:
+                    print(f"✓ 只读副本 {replica.database.name} 可用 (延迟 {replica.lag:.3f}s)")
+                else:
+                    print(f"✗ 只读副本 {replica.database.name} 不可用: {replica.error or f'延迟 {replica.lag:.3f}s'}")
+            self._checker = asyncio.create_task(self._check_loop())
+        return pool
+
+    async def close(self):
+        if self._checker is not None:
+            self._checker.cancel()
+            self._checker = None
+        for replica in self.replicas:
+            await replica.database.close()
+        await self.primary.close()
+
+    def databases(self) -> List[Database]:
+        """主库和各副本的连接池"""
+        return [self.primary] + [replica.database for replica in self.replicas]
+
+    def stats(self) -> Dict:
+        stats = self.primary.stats()
+        if self.replicas:
+            stats["replicas"] = [replica.stats() for replica in self.replicas]
+            stats["max_lag"] = self.max_lag
+            stats["reads"] = dict(self.reads)
+            stats["writes"] = self.writes
+        return stats
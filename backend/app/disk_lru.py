@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+按字节预算淘汰的磁盘缓存索引
+- 内存中按访问顺序记录 文件路径 -> 字节数, 命中时更新文件 mtime, 重启后按 mtime 恢复顺序
+- 总字节数超过预算时从最久未访问的文件开始删除 (连同伴随文件, 如元数据)
+多个进程共用目录时各自维护索引, 被其他进程删除的文件在下次访问时从索引中移除
+事件循环中使用 touch_async / add_async: 索引在循环内修改, 更新 mtime、统计大小和删除文件在线程池中执行
+正在发送的文件用 pin / unpin 固定, 固定期间不会被本进程淘汰
+"""
+
+import os
+import asyncio
+from collections import OrderedDict
+from itertools import islice
+from typing import Dict, List, Tuple
+
+
+def remove_files(paths: List[str]):
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _utime(path: str) -> bool:
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+class DiskLRU:
+    """磁盘缓存的 LRU 索引, 只负责记账和淘汰, 不负责写入"""
+
+    def __init__(self, cache_dir: str, max_bytes: int, companion_suffixes: Tuple[str, ...] = ()):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        # 伴随文件 (path + 后缀) 与主文件一起计入大小和淘汰
+        self.companion_suffixes = companion_suffixes
+        self._entries: 'OrderedDict[str, int]' = OrderedDict()  # 路径 -> 字节数, 最近访问的在末尾
+        self._pins: Dict[str, int] = {}  # 路径 -> 固定次数
+        self.total_bytes = 0
+        self.evictions = 0
+        self.loaded = False
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        return iter(list(self._entries))
+
+    def __contains__(self, path: str) -> bool:
+        return path in self._entries
+
+    def _size_with_companions(self, path: str, size: int) -> int:
+        for suffix in self.companion_suffixes:
+            try:
+                size += os.path.getsize(path + suffix)
+            except OSError:
+                pass
+        return size
+
+    def load(self):
+        """扫描缓存目录, 按修改时间恢复 LRU 顺序; 跳过临时文件和伴随文件"""
+        self.loaded = True
+        found = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith('.tmp') or name.endswith(self.companion_suffixes or ('\0',)):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                found.append((stat.st_mtime, path, self._size_with_companions(path, stat.st_size)))
+        found.sort()
+        for _, path, size in found:
+            self._entries[path] = size
+            self.total_bytes += size
+        remove_files(self.evict())
+
+    def touch(self, path: str) -> bool:
+        """记录一次访问; 文件不在索引中或已被删除时返回 False"""
+        if path not in self._entries:
+            return False
+        self._entries.move_to_end(path)
+        if not _utime(path):
+            # 被其他进程淘汰
+            self.discard(path)
+            return False
+        return True
+
+    async def touch_async(self, path: str) -> bool:
+        """touch 的事件循环版本, mtime 在线程池中更新"""
+        if path not in self._entries:
+            return False
+        self._entries.move_to_end(path)
+        if not await asyncio.get_running_loop().run_in_executor(None, _utime, path):
+            self.discard(path)
+            return False
+        return True
+
+    def add(self, path: str, size: int):
+        """登记新写入 (或覆盖) 的文件, 需要时淘汰旧文件"""
+        remove_files(self.record(path, self._size_with_companions(path, size)))
+
+    async def add_async(self, path: str, size: int):
+        """add 的事件循环版本, 伴随文件大小和淘汰删除在线程池中执行"""
+        loop = asyncio.get_running_loop()
+        size = await loop.run_in_executor(None, self._size_with_companions, path, size)
+        victims = self.record(path, size)
+        if victims:
+            await loop.run_in_executor(None, remove_files, victims)
+
+    def record(self, path: str, size: int) -> List[str]:
+        """只更新索引 (size 已含伴随文件), 返回被淘汰、需要删除的文件"""
+        if path in self._entries:
+            self.total_bytes -= self._entries.pop(path)
+        self._entries[path] = size
+        self.total_bytes += size
+        return self.evict()
+
+    def pin(self, path: str) -> bool:
+        """固定索引中的文件, 不在索引中时返回 False; 每次成功固定都需要对应一次 unpin"""
+        if path not in self._entries:
+            return False
+        self._pins[path] = self._pins.get(path, 0) + 1
+        return True
+
+    def unpin(self, path: str):
+        count = self._pins.get(path, 0) - 1
+        if count > 0:
+            self._pins[path] = count
+        else:
+            self._pins.pop(path, None)
+
+    def discard(self, path: str):
+        if path in self._entries:
+            self.total_bytes -= self._entries.pop(path)
+
+    def evict(self) -> List[str]:
+        """超出预算时从索引中移除最久未访问的文件, 返回需要删除的文件 (由调用方删除)"""
+        excess = self.total_bytes - self.max_bytes
+        if excess <= 0:
+            return []
+        evicted = []
+        # 最近登记/访问的一个始终保留
+        for path, size in islice(self._entries.items(), len(self._entries) - 1):
+            if excess <= 0:
+                break
+            if path in self._pins:
+                continue
+            evicted.append(path)
+            excess -= size
+        victims = []
+        for path in evicted:
+            self.total_bytes -= self._entries.pop(path)
+            self.evictions += 1
+            victims.append(path)
+            victims.extend(path + suffix for suffix in self.companion_suffixes)
+        return victims
+
+    def stats(self) -> Dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+        }
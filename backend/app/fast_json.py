@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+热点列表接口的快速序列化
+已经是纯字典/列表的响应直接编码为字节, 跳过 pydantic 模型校验和 jsonable_encoder;
+安装了 orjson 时使用 orjson, 否则退回标准库 json 的紧凑输出
+"""
+
+import os
+import json
+from decimal import Decimal
+from datetime import date, datetime
+from typing import Any, Dict, Optional
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # 可选依赖
+    orjson = None
+
+# FAST_JSON=true 时启用
+FAST_JSON_ENABLED = os.getenv('FAST_JSON', '').lower() in ('1', 'true', 'on')
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return str(value)
+    raise TypeError(f"无法序列化类型: {type(value).__name__}")
+
+
+def dumps(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value, default=_default)
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'), default=_default).encode('utf-8')
+
+
+class FastJSONResponse(Response):
+    """直接渲染为字节的 JSON 响应; 保留 data 供响应缓存提取失效标签"""
+
+    media_type = "application/json"
+
+    def __init__(self, content: Dict[str, Any], **kwargs):
+        self.data = content.get('data')
+        super().__init__(content, **kwargs)
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def envelope(data: Any, pagination: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """与 APIResponse 相同结构的响应字典"""
+    return {"data": data, "pagination": pagination}
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+截图目录清单
+启动时扫描截图目录, 为每个文件记录 大小 / mtime / sha256 / 按文件头识别的 MIME 类型:
+- /api/images 只按清单查找文件, 不在清单中的文件名直接 404, 不访问文件系统 (也杜绝了路径穿越)
+- ETag 取内容哈希, 文件名相同但内容变化时 ETag 随之变化;
+  截图URL带上 ?v=<哈希前缀>, 版本匹配时响应可以标记为 immutable 长期缓存
+- 按 IMAGE_MANIFEST_REFRESH 秒定时重新扫描 (只 stat, 大小和 mtime 未变的文件沿用原哈希)
+- 哈希持久化到 IMAGE_MANIFEST_PATH, 重启后无需重新读取全部图片
+"""
+
+import os
+import json
+import asyncio
+import hashlib
+import mimetypes
+from datetime import datetime, timezone
+from typing import Optional, Dict, Tuple
+
+from conditional import format_http_date
+
+DEFAULT_MANIFEST_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'lookaitools', 'image-manifest.json')
+
+# URL 中的版本号长度 (sha256 十六进制前缀)
+VERSION_LENGTH = 16
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+DEFAULT_CACHE_CONTROL = "public, max-age=3600"
+
+
+def sniff_media_type(head: bytes, name: str) -> Optional[str]:
+    """按文件头识别图片类型, 无法识别时按扩展名猜测; 非图片返回 None"""
+    if head.startswith(b'\xff\xd8\xff'):
+        return 'image/jpeg'
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'image/png'
+    if head.startswith((b'GIF87a', b'GIF89a')):
+        return 'image/gif'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    if head[4:12] in (b'ftypavif', b'ftypavis'):
+        return 'image/avif'
+    if head.startswith(b'BM'):
+        return 'image/bmp'
+    if b'<svg' in head[:512].lower():
+        return 'image/svg+xml'
+    guessed = mimetypes.guess_type(name)[0]
+    return guessed if guessed and guessed.startswith('image/') else None
+
+
+class ImageEntry:
+    """清单中的一个文件, 响应头在构建时算好"""
+
+    __slots__ = ('name', 'path', 'stat', 'digest', 'media_type', 'etag', 'version', 'modified', 'last_modified')
+
+    def __init__(self, name: str, path: str, stat: os.stat_result, digest: str, media_type: str):
+        self.name = name
+        self.path = path
+        self.stat = stat
+        self.digest = digest
+        self.media_type = media_type
+        self.etag = f'"{digest[:32]}"'
+        self.version = digest[:VERSION_LENGTH]
+        self.modified = datetime.fromtimestamp(int(stat.st_mtime), tz=timezone.utc)
+        self.last_modified = format_http_date(self.modified)
+
+
+def _hash_file(path: str) -> Tuple[str, bytes]:
+    digest = hashlib.sha256()
+    head = b''
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            if not head:
+                head = chunk[:512]
+            digest.update(chunk)
+    return digest.hexdigest(), head
+
+
+class ImageManifest:
+    """截图目录的 文件名 -> ImageEntry 映射, 刷新时整体替换"""
+
+    def __init__(self, directory: str, manifest_path: Optional[str] = DEFAULT_MANIFEST_PATH,
+                 refresh_interval: float = 60.0):
+        self.directory = directory
+        self.manifest_path = manifest_path
+        self.refresh_interval = refresh_interval
+        self.entries: Dict[str, ImageEntry] = {}
+        self.version = 0
+        self.hashed_files = 0
+        self._refresher: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_env(cls, image_base_url: str) -> Optional['ImageManifest']:
+        """远程图片地址 (@开头) 不需要清单"""
+        if image_base_url.startswith('@'):
+            return None
+        return cls(
+            directory=os.path.join(image_base_url, 'toolify'),
+            manifest_path=os.getenv('IMAGE_MANIFEST_PATH', DEFAULT_MANIFEST_PATH) or None,
+            refresh_interval=float(os.getenv('IMAGE_MANIFEST_REFRESH', '60')),
+        )
+
+    @property
+    def ready(self) -> bool:
+        return self.version > 0
+
+    def get(self, name: str) -> Optional[ImageEntry]:
+        return self.entries.get(name)
+
+    def url_version(self, name: Optional[str]) -> Optional[str]:
+        entry = self.entries.get(name) if name else None
+        return entry.version if entry is not None else None
+
+    # ---- 扫描 ----
+
+    def _load_persisted(self) -> Dict[str, Tuple[int, int, str, str]]:
+        """name -> (size, mtime_ns, digest, media_type)"""
+        if not self.manifest_path or not os.path.exists(self.manifest_path):
+            return {}
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get('directory') != self.directory:
+            return {}
+        return {name: tuple(values) for name, values in data.get('files', {}).items()}
+
+    def _persist(self, entries: Dict[str, ImageEntry]):
+        if not self.manifest_path:
+            return
+        files = {
+            name: [entry.stat.st_size, entry.stat.st_mtime_ns, entry.digest, entry.media_type]
+            for name, entry in entries.items()
+        }
+        os.makedirs(os.path.dirname(self.manifest_path) or '.', exist_ok=True)
+        temp_path = f"{self.manifest_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'directory': self.directory, 'files': files}, f)
+        os.replace(temp_path, self.manifest_path)
+
+    def scan(self) -> bool:
+        """重新扫描目录 (在线程池中执行), 返回清单是否有变化"""
+        previous = {
+            name: (entry.stat.st_size, entry.stat.st_mtime_ns, entry.digest, entry.media_type)
+            for name, entry in self.entries.items()
+        } or self._load_persisted()
+
+        entries: Dict[str, ImageEntry] = {}
+        changed = False
+        try:
+            listing = os.scandir(self.directory)
+        except FileNotFoundError:
+            listing = None
+        if listing is not None:
+            with listing:
+                for item in listing:
+                    if item.name.startswith('.') or not item.is_file():
+                        continue
+                    try:
+                        stat = item.stat()
+                        known = previous.get(item.name)
+                        if known is not None and known[0] == stat.st_size and known[1] == stat.st_mtime_ns:
+                            digest, media_type = known[2], known[3]
+                        else:
+                            digest, head = _hash_file(item.path)
+                            media_type = sniff_media_type(head, item.name)
+                            self.hashed_files += 1
+                            changed = True
+                    except OSError:
+                        continue
+                    if media_type is None:
+                        continue
+                    entries[item.name] = ImageEntry(item.name, item.path, stat, digest, media_type)
+
+        changed = changed or entries.keys() != self.entries.keys()
+        if changed:
+            try:
+                self._persist(entries)
+            except OSError as e:
+                print(f"✗ 图片清单保存失败: {e}")
+        self.entries = entries
+        self.version += 1
+        return changed
+
+    async def refresh(self) -> bool:
+        loop = asyncio.get_running_loop()
+        # 扫描和哈希是阻塞IO, 放到线程池
+        return await loop.run_in_executor(None, self.scan)
+
+    async def start(self, on_change=None):
+        """首次扫描并启动定时刷新; on_change 在清单变化后调用"""
+        await self.refresh()
+        print(f"✓ 图片清单已加载 ({len(self.entries)} 个文件, 新计算哈希 {self.hashed_files} 个)")
+        self._refresher = asyncio.create_task(self._refresh_loop(on_change))
+
+    async def _refresh_loop(self, on_change):
+        while True:
+            await asyncio.sleep(max(1.0, self.refresh_interval))
+            try:
+                if await self.refresh() and on_change is not None:
+                    on_change()
+            except Exception as e:
+                print(f"✗ 图片清单刷新失败: {e}")
+
+    def stop(self):
+        if self._refresher is not None:
+            self._refresher.cancel()
+
+    def stats(self) -> Dict:
+        return {
+            "ready": self.ready,
+            "files": len(self.entries),
+            "version": self.version,
+            "hashed_files": self.hashed_files,
+            "refresh_interval": self.refresh_interval,
+        }
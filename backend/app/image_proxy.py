@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+远程截图源站的读穿代理缓存
+IMAGE_PROXY=true 时 /api/images/{filename} 从源站 (IMAGE_PROXY_ORIGIN, 默认取 @ 开头的
+FRONTEND_IMAGE_BASE_URL) 拉取图片并缓存在本地磁盘, 截图URL也改为指向本接口:
+- httpx 连接池复用到源站的连接
+- 缓存按字节预算 LRU 淘汰; 每个文件旁边保存 .json 元数据 (类型、源站校验值、拉取时间)
+- IMAGE_PROXY_TTL 内直接返回; 过期但在 IMAGE_PROXY_STALE 窗口内先返回旧内容, 后台条件请求重新验证
+  (stale-while-revalidate); 超出窗口同步重新验证, 源站出错时仍返回旧内容
+- 同一文件的并发未命中只向源站发一次请求; 源站 404 在 IMAGE_PROXY_NEGATIVE_TTL 内直接返回 404,
+  这类记录最多保留 IMAGE_PROXY_NEGATIVE_MAX 个
+- 未缓存文件的源站请求按 IMAGE_PROXY_MISS_RATE (每秒, 突发 IMAGE_PROXY_MISS_BURST) 限速,
+  防止大量随机文件名穿透到源站; 超出时返回 503
+- 文件和元数据的写入、删除以及缓存淘汰和访问时间更新都在线程池中执行, 不阻塞事件循环
+
+本地调试可以用任意静态服务器充当源站, 例如:
+    python -m http.server 9000 --directory ./screenshots
+    IMAGE_PROXY=true IMAGE_PROXY_ORIGIN=http://127.0.0.1:9000/ uvicorn main:app
+"""
+
+import os
+import json
+import time
+import asyncio
+import hashlib
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional, Dict, List
+from urllib.parse import quote
+
+try:
+    import httpx
+except ImportError:  # 可选依赖, 只有代理模式需要
+    httpx = None
+
+from disk_lru import DiskLRU, remove_files
+from conditional import format_http_date
+from image_manifest import sniff_media_type
+
+DEFAULT_PROXY_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'lookaitools', 'proxy')
+
+META_SUFFIX = '.json'
+
+
+class ImageNotFound(Exception):
+    """源站没有该文件"""
+
+
+class OriginError(Exception):
+    """源站不可用或返回了无法缓存的响应"""
+
+
+class OriginThrottled(OriginError):
+    """未命中的源站请求超过限速"""
+
+
+class ProxyEntry:
+    """缓存中的一个文件, 字段与 ImageEntry 对应, 便于共用响应逻辑"""
+
+    __slots__ = ('name', 'path', 'media_type', 'digest', 'etag', 'origin_etag', 'origin_last_modified',
+                 'fetched_at', 'modified', 'last_modified', 'stat')
+
+    def __init__(self, name: str, path: str, meta: Dict):
+        self.name = name
+        self.path = path
+        self.media_type = meta['media_type']
+        self.digest = meta['digest']
+        self.etag = f'"{self.digest[:32]}"'
+        self.origin_etag: Optional[str] = meta.get('origin_etag')
+        self.origin_last_modified: Optional[str] = meta.get('origin_last_modified')
+        self.fetched_at = meta['fetched_at']
+        self.modified = _parse_http_date(self.origin_last_modified) or datetime.fromtimestamp(
+            int(self.fetched_at), tz=timezone.utc)
+        self.last_modified = format_http_date(self.modified)
+        self.stat = None  # 由 FileResponse 自行 stat
+
+    def meta(self) -> Dict:
+        return {
+            'name': self.name,
+            'media_type': self.media_type,
+            'digest': self.digest,
+            'origin_etag': self.origin_etag,
+            'origin_last_modified': self.origin_last_modified,
+            'fetched_at': self.fetched_at,
+        }
+
+
+def _parse_http_date(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _write_json(path: str, data: Dict):
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(temp_path, path)
+
+
+def _open_temp(path: str, temp_path: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return open(temp_path, 'wb')
+
+
+class ImageProxy:
+    """源站图片的磁盘读穿缓存"""
+
+    def __init__(
+        self,
+        origin: str,
+        cache_dir: str = DEFAULT_PROXY_CACHE_DIR,
+        max_bytes: int = 1024 * 1024 * 1024,
+        fresh_ttl: float = 3600.0,
+        stale_ttl: float = 86400.0,
+        negative_ttl: float = 60.0,
+        max_connections: int = 20,
+        timeout: float = 10.0,
+        max_object_bytes: int = 20 * 1024 * 1024,
+        negative_max: int = 10000,
+        miss_rate: float = 20.0,
+        miss_burst: float = 50.0,
+    ):
+        self.origin = origin.rstrip('/') + '/'
+        self.cache_dir = cache_dir
+        self.fresh_ttl = fresh_ttl
+        self.stale_ttl = stale_ttl
+        self.negative_ttl = negative_ttl
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.max_object_bytes = max_object_bytes
+        self.negative_max = negative_max
+        self.miss_rate = miss_rate      # 0 表示不限速
+        self.miss_burst = miss_burst
+        self._miss_tokens = miss_burst
+        self._miss_refilled = time.monotonic()
+        self.lru = DiskLRU(cache_dir, max_bytes, companion_suffixes=(META_SUFFIX,))
+        self.index: Dict[str, ProxyEntry] = {}
+        # 源站 404 的文件名 -> 过期时间; TTL 相同, 插入顺序即过期顺序, 从头部清理并限制数量
+        self._missing: 'OrderedDict[str, float]' = OrderedDict()
+        self._pending: Dict[str, asyncio.Task] = {}
+        self._client = None
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.origin_requests = 0
+        self.origin_errors = 0
+        self.throttled = 0
+
+    @classmethod
+    def from_env(cls, origin: Optional[str]) -> Optional['ImageProxy']:
+        """IMAGE_PROXY=true 且配置了源站时启用"""
+        if not origin:
+            return None
+        if httpx is None:
+            print("✗ 图片代理需要 httpx, 未安装时不启用")
+            return None
+        return cls(
+            origin=origin,
+            cache_dir=os.getenv('IMAGE_PROXY_CACHE_DIR', DEFAULT_PROXY_CACHE_DIR),
+            max_bytes=int(os.getenv('IMAGE_PROXY_MAX_BYTES', str(1024 * 1024 * 1024))),
+            fresh_ttl=float(os.getenv('IMAGE_PROXY_TTL', '3600')),
+            stale_ttl=float(os.getenv('IMAGE_PROXY_STALE', '86400')),
+            negative_ttl=float(os.getenv('IMAGE_PROXY_NEGATIVE_TTL', '60')),
+            max_connections=int(os.getenv('IMAGE_PROXY_CONNECTIONS', '20')),
+            timeout=float(os.getenv('IMAGE_PROXY_TIMEOUT', '10')),
+            negative_max=int(os.getenv('IMAGE_PROXY_NEGATIVE_MAX', '10000')),
+            miss_rate=float(os.getenv('IMAGE_PROXY_MISS_RATE', '20')),
+            miss_burst=float(os.getenv('IMAGE_PROXY_MISS_BURST', '50')),
+        )
+
+    # ---- 生命周期 ----
+
+    def load(self):
+        """恢复磁盘缓存索引 (启动时在线程池中调用), 缺少元数据的文件直接丢弃"""
+        self.lru.load()
+        for path in self.lru:
+            try:
+                with open(path + META_SUFFIX, 'r', encoding='utf-8') as f:
+                    meta = json.load(f)
+                entry = ProxyEntry(meta['name'], path, meta)
+            except (OSError, ValueError, KeyError):
+                self.lru.discard(path)
+                continue
+            self.index[entry.name] = entry
+
+    async def start(self):
+        self._client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=self.max_connections,
+                                max_keepalive_connections=self.max_connections),
+            timeout=httpx.Timeout(self.timeout),
+            follow_redirects=True,
+        )
+        await asyncio.get_running_loop().run_in_executor(None, self.load)
+        print(f"✓ 图片代理已启用 (源站 {self.origin}, 本地缓存 {len(self.index)} 个文件)")
+
+    async def close(self):
+        for task in list(self._pending.values()):
+            task.cancel()
+        if self._client is not None:
+            await self._client.aclose()
+
+    # ---- 读取 ----
+
+    def cache_path(self, name: str) -> str:
+        key = hashlib.sha256(name.encode('utf-8')).hexdigest()[:40]
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    async def get(self, name: str) -> ProxyEntry:
+        """返回缓存中的文件, 需要时从源站拉取; 源站没有时抛 ImageNotFound, 不可用时抛 OriginError"""
+        if os.path.basename(name) != name or name.startswith('.'):
+            raise ImageNotFound(name)
+        self._prune_missing()
+        if name in self._missing:
+            raise ImageNotFound(name)
+
+        entry = self.index.get(name)
+        if entry is not None and not await self.lru.touch_async(entry.path):
+            # 已被淘汰; 等待期间可能已被其他请求重新拉取
+            if self.index.get(name) is entry:
+                del self.index[name]
+            entry = self.index.get(name)
+        if entry is None:
+            self.misses += 1
+            if name not in self._pending and not self._take_miss_token():
+                self.throttled += 1
+                raise OriginThrottled("源站请求过于频繁")
+            return await self._fetch(name, None)
+
+        age = time.time() - entry.fetched_at
+        if age < self.fresh_ttl:
+            self.hits += 1
+            return entry
+        if age < self.fresh_ttl + self.stale_ttl:
+            # 先返回旧内容, 后台重新验证
+            self.stale_hits += 1
+            if name not in self._pending:
+                self._start_fetch(name, entry).add_done_callback(self._log_background_error)
+            return entry
+        try:
+            return await self._fetch(name, entry)
+        except OriginError:
+            # 源站出错时宁可返回旧内容
+            self.stale_hits += 1
+            return entry
+
+    def _prune_missing(self):
+        now = time.monotonic()
+        while self._missing:
+            name, expires_at = next(iter(self._missing.items()))
+            if expires_at > now:
+                break
+            del self._missing[name]
+
+    def _remember_missing(self, name: str):
+        self._missing.pop(name, None)
+        self._missing[name] = time.monotonic() + self.negative_ttl
+        while len(self._missing) > self.negative_max:
+            self._missing.popitem(last=False)
+
+    def _take_miss_token(self) -> bool:
+        """令牌桶: 未缓存文件的源站请求每秒最多 miss_rate 个, 允许 miss_burst 的突发"""
+        if self.miss_rate <= 0:
+            return True
+        now = time.monotonic()
+        self._miss_tokens = min(self.miss_burst, self._miss_tokens + (now - self._miss_refilled) * self.miss_rate)
+        self._miss_refilled = now
+        if self._miss_tokens < 1:
+            return False
+        self._miss_tokens -= 1
+        return True
+
+    def _start_fetch(self, name: str, entry: Optional[ProxyEntry]) -> asyncio.Task:
+        task = asyncio.ensure_future(self._download(name, entry))
+        self._pending[name] = task
+        task.add_done_callback(lambda _: self._finished(name, task))
+        return task
+
+    def _finished(self, name: str, task: asyncio.Task):
+        if self._pending.get(name) is task:
+            del self._pending[name]
+        # 取出异常, 等待者都已断开时也不会出现 "exception was never retrieved"
+        if not task.cancelled():
+            task.exception()
+
+    async def _fetch(self, name: str, entry: Optional[ProxyEntry]) -> ProxyEntry:
+        """同一文件的并发请求共用一次源站请求; shield 避免某个客户端断开时取消共享的下载"""
+        task = self._pending.get(name) or self._start_fetch(name, entry)
+        return await asyncio.shield(task)
+
+    @staticmethod
+    def _log_background_error(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None and not isinstance(task.exception(), ImageNotFound):
+            print(f"✗ 图片后台重新验证失败: {task.exception()}")
+
+    async def _download(self, name: str, entry: Optional[ProxyEntry]) -> ProxyEntry:
+        headers = {}
+        if entry is not None:
+            if entry.origin_etag:
+                headers['If-None-Match'] = entry.origin_etag
+            if entry.origin_last_modified:
+                headers['If-Modified-Since'] = entry.origin_last_modified
+
+        path = self.cache_path(name)
+        loop = asyncio.get_running_loop()
+        self.origin_requests += 1
+        try:
+            async with self._client.stream('GET', self.origin + quote(name), headers=headers) as response:
+                if response.status_code == 304 and entry is not None:
+                    entry.fetched_at = time.time()
+                    await loop.run_in_executor(None, _write_json, entry.path + META_SUFFIX, entry.meta())
+                    self.revalidations += 1
+                    return entry
+                if response.status_code in (404, 410):
+                    await loop.run_in_executor(None, remove_files, self._forget(name))
+                    self._remember_missing(name)
+                    raise ImageNotFound(name)
+                if response.status_code != 200:
+                    raise OriginError(f"源站返回 {response.status_code}")
+
+                temp_path = f"{path}.{os.getpid()}.{id(response)}.tmp"
+                digest = hashlib.sha256()
+                head = b''
+                size = 0
+                f = await loop.run_in_executor(None, _open_temp, path, temp_path)
+                try:
+                    try:
+                        async for chunk in response.aiter_bytes():
+                            if not head:
+                                head = chunk[:512]
+                            size += len(chunk)
+                            if size > self.max_object_bytes:
+                                raise OriginError(f"文件超过 {self.max_object_bytes} 字节")
+                            digest.update(chunk)
+                            await loop.run_in_executor(None, f.write, chunk)
+                    finally:
+                        await loop.run_in_executor(None, f.close)
+                    media_type = response.headers.get('content-type', '').split(';')[0].strip()
+                    if not media_type.startswith('image/'):
+                        media_type = sniff_media_type(head, name)
+                    if media_type is None:
+                        raise OriginError("源站返回的不是图片")
+                    await loop.run_in_executor(None, os.replace, temp_path, path)
+                finally:
+                    await loop.run_in_executor(None, remove_files, [temp_path])
+        except httpx.HTTPError as e:
+            self.origin_errors += 1
+            raise OriginError(f"源站请求失败: {e}") from e
+        except OriginError:
+            self.origin_errors += 1
+            raise
+
+        fresh = ProxyEntry(name, path, {
+            'media_type': media_type,
+            'digest': digest.hexdigest(),
+            'origin_etag': response.headers.get('etag'),
+            'origin_last_modified': response.headers.get('last-modified'),
+            'fetched_at': time.time(),
+        })
+        await loop.run_in_executor(None, _write_json, path + META_SUFFIX, fresh.meta())
+        self.index[name] = fresh
+        await self.lru.add_async(path, size)
+        return fresh
+
+    def _forget(self, name: str) -> List[str]:
+        """源站已删除的文件从索引中移除, 返回需要删除的磁盘文件"""
+        entry = self.index.pop(name, None)
+        if entry is None:
+            return []
+        self.lru.discard(entry.path)
+        return [entry.path, entry.path + META_SUFFIX]
+
+    def stats(self) -> Dict:
+        return {
+            "origin": self.origin,
+            "cached_files": len(self.index),
+            **self.lru.stats(),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "revalidations": self.revalidations,
+            "origin_requests": self.origin_requests,
+            "origin_errors": self.origin_errors,
+            "throttled": self.throttled,
+            "negative_entries": len(self._missing),
+            "in_flight": len(self._pending),
+        }
@@ -5,32 +5,128 @@ FastAPI应用主入口
 """
 
 import os
+import time
 import asyncio
 import asyncpg
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Header, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, Response, StreamingResponse
 from typing import Optional, List, Dict, Any
 from pydantic import BaseModel
 from dotenv import load_dotenv
 import json
+import hmac
+
+from catalog import CatalogEngine
+from shared_catalog import SharedCatalog
+from database import READ_YOUR_WRITES_COOKIE, DatabaseRouter
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, Metrics, pool_metrics, route_label
+from query_log import REPORT_ORDERS, QueryLog
+from settings import Settings
+from tool_records import ToolRecordStore
+from tool_detail import ToolDetailFetcher
+from related import RelatedEngine
+from suggest import SUGGEST_MAX_LIMIT, SuggestEngine
+from thumbnails import THUMBNAILS_AVAILABLE, ThumbnailCache
+from image_manifest import IMMUTABLE_CACHE_CONTROL, DEFAULT_CACHE_CONTROL, ImageManifest
+from image_proxy import ImageNotFound, OriginError, OriginThrottled, ImageProxy
+from catalog_stats import CATEGORIES_STATS_QUERY, build_tags_stats_query, detect_stats
+from submissions import SubmissionSchema, detect_submission_schema, insert_tool, match_tags, record_submission
+from pagination import ORDER_BY_CLAUSE, SEEK_COLUMNS, InvalidCursor, encode_cursor, decode_cursor
+from textsearch import SEARCH_FTS, SEARCH_ILIKE, SEARCH_MEMORY, build_tsquery, detect_fts
+from search_index import SearchEngine
+from response_cache import ResponseCache
+from fast_json import FAST_JSON_ENABLED, FastJSONResponse, envelope
+from streaming import STREAM_FORMATS, STREAM_BATCH_SIZE, encode_stream
+from conditional import (
+    CatalogVersionSource, make_etag, etag_matches, format_http_date, not_modified_since,
+    bind_data_version, release_data_version, current_data_version,
+)
+from counting import (
+    CountCache, filter_key, is_broad_query, estimate_total,
+    TOTAL_WINDOW, TOTAL_COUNT_QUERY, TOTAL_CACHED, TOTAL_ESTIMATE, TOTAL_MEMORY, WINDOW_COUNT_COLUMN
+)
 
 # 加载环境变量
 load_dotenv()
 
+# 启动时解析一次的配置
+settings = Settings.from_env()
+
 app = FastAPI(title="LookAiTools API - Multilingual", version="2.0.0")
 
-# CORS配置
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# 按语句指纹的慢查询日志 (SLOW_QUERY_LOG=true 时启用)
+query_log = QueryLog.from_env()
+
+# 数据库连接池 (启动时创建并预热, 关闭时释放); 配置 DATABASE_REPLICA_URLS 时读接口走只读副本
+db_router = DatabaseRouter.from_env(query_log)
+
+# 搜索后端: fts / ilike / memory; 未配置时启动阶段根据是否已执行全文检索迁移自动选择
+search_backend = os.getenv('SEARCH_BACKEND', '').lower() or None
+
+# 相关工具: category(默认, 同分类按评分排序) 或 tags(基于标签相似度的预计算邻居表)
+RELATED_ENGINE = os.getenv('RELATED_ENGINE', 'category').lower()
+
+# 分类/标签统计是否读取汇总表 (sql/005_catalog_stats.sql), 启动时检测
+catalog_stats_enabled = False
+
+# 工具提交可选迁移 (sql/006_tool_submissions.sql) 的状态, 启动时检测
+submission_schema = SubmissionSchema()
+
+# 内存目录引擎 (CATALOG_ENGINE=memory 时启用, 内存搜索和标签相关工具依赖它)
+# CATALOG_ENGINE=shared 时各 worker 只读映射同一个快照文件 (shared_catalog.py), 不在进程内保留目录副本
+CATALOG_ENGINE = os.getenv('CATALOG_ENGINE', '').lower()
+catalog_engine = None
+if CATALOG_ENGINE == 'shared':
+    catalog_engine = SharedCatalog.from_env()
+    if search_backend == SEARCH_MEMORY:
+        print("✗ 共享目录快照模式不支持内存搜索索引, 改为自动检测搜索后端")
+        search_backend = None
+    if RELATED_ENGINE == 'tags':
+        print("✗ 共享目录快照模式不支持标签相关工具, 改为同分类查询")
+        RELATED_ENGINE = 'category'
+elif CATALOG_ENGINE == 'memory' or search_backend == SEARCH_MEMORY or RELATED_ENGINE == 'tags':
+    catalog_engine = CatalogEngine()
 
-# 数据库连接池
-db_pool = None
+# 进程内目录引擎 (共享快照模式下为 None)
+local_catalog = catalog_engine if isinstance(catalog_engine, CatalogEngine) else None
+
+# 预先格式化的工具列表记录, 跟随内存目录更新
+tool_records = ToolRecordStore(lambda row, language: format_tool_response(row, language)) if local_catalog is not None else None
+
+# 进程内倒排索引 (SEARCH_BACKEND=memory 时启用)
+search_engine = SearchEngine() if search_backend == SEARCH_MEMORY else None
+
+# 标签相似度相关工具 (RELATED_ENGINE=tags 时启用)
+related_engine = RelatedEngine() if RELATED_ENGINE == 'tags' else None
+
+# 输入联想前缀索引 (默认启用, SUGGEST_INDEX=false 时 /api/suggest 直接查询数据库)
+suggest_engine = SuggestEngine() if os.getenv('SUGGEST_INDEX', 'true').lower() == 'true' else None
+
+# 截图缩略图/WebP 变体 (/api/images?w=&format=), 需要 Pillow
+image_variants = ThumbnailCache.from_env()
+
+# 远程截图源站的读穿代理 (IMAGE_PROXY=true 时启用)
+image_proxy = ImageProxy.from_env(settings.image_proxy_origin)
+
+# 本地截图目录清单 (远程图片地址或代理模式时为 None)
+image_manifest = ImageManifest.from_env(settings.image_base_url) if image_proxy is None else None
+
+# 运行指标 (/metrics, METRICS_ENABLED=false 时关闭)
+metrics = Metrics.from_env()
+metrics.add_collector(pool_metrics(db_router.databases))
+
+# 工具详情查询方式: single(默认, 一条语句) / pipelined(并发) / sequential
+detail_fetcher = ToolDetailFetcher()
+
+# 批量详情单次最多的工具数
+TOOL_BATCH_MAX = int(os.getenv('TOOL_BATCH_MAX', '50'))
+
+# 列表总数策略: window(默认, 同一条语句内计数) 或 cached(按筛选条件缓存精确总数)
+COUNT_STRATEGY = os.getenv('COUNT_STRATEGY', TOTAL_WINDOW).lower()
+count_cache = CountCache()
+if catalog_engine is not None:
+    catalog_engine.add_listener(count_cache.clear)
 
 # 响应模型
 class PaginationResponse(BaseModel):
@@ -38,27 +134,50 @@ class PaginationResponse(BaseModel):
     limit: int
     total: int
     totalPages: int
+    next_cursor: Optional[str] = None
+    total_source: Optional[str] = None
 
 class APIResponse(BaseModel):
     data: Any
     pagination: Optional[PaginationResponse] = None
 
+class ToolBatchRequest(BaseModel):
+    ids: List[str]
+    language: str = "en"
+
+class ToolSubmission(BaseModel):
+    # 多语言字段形如 {"en": "...", "zh": "..."}
+    name: Dict[str, str]
+    title: Dict[str, str]
+    description: Dict[str, str]
+    long_description: Dict[str, str]
+    url: str
+    thumbnail_url: str = ""
+
+    category: str
+    subcategory: Dict[str, str]
+    tags: List[Dict[str, str]] = []
+    industry_tags: List[Dict[str, str]] = []
+
+    key_features: List[Dict[str, str]] = []
+    use_cases: Dict[str, str]
+    target_audience: Dict[str, str]
+
+    pricing_type: Dict[str, str]
+    pricing_details: Dict[str, str]
+    trial_available: Dict[str, str]
+
+    contact_email: str
+    contact_name: str
+    company_name: str = ""
+
 async def get_db_connection():
-    """获取数据库连接池"""
-    global db_pool
-    if db_pool is None:
-        database_url = os.getenv('DATABASE_URL')
-        if not database_url:
-            raise ValueError("DATABASE_URL环境变量未设置")
-
-        db_pool = await asyncpg.create_pool(
-            database_url,
-            min_size=1,
-            max_size=10,
-            command_timeout=60
-        )
-        print("✓ 数据库连接池创建成功")
-    return db_pool
+    """获取读接口使用的数据库连接池 (有可用副本时为副本)"""
+    return await db_router.reader()
+
+async def get_db_write_connection():
+    """获取写入使用的主库连接池"""
+    return await db_router.writer()
 
 def normalize_language_code(language: str) -> str:
     """标准化语言代码"""
@@ -71,22 +190,100 @@ def normalize_language_code(language: str) -> str:
     }
     return lang_map.get(language.lower(), language.lower())
 
+# 响应缓存 (RESPONSE_CACHE=true 时启用)
+response_cache = ResponseCache(
+    normalizers={'language': normalize_language_code},
+    skip=db_router.pinned,
+    version=current_data_version,
+)
+if catalog_engine is not None:
+    catalog_engine.add_listener(response_cache.on_catalog_update)
+
+# 首页聚合数据: 按语言预生成, 短TTL, 始终启用
+HOMEPAGE_SECTION_LIMIT = int(os.getenv('HOMEPAGE_SECTION_LIMIT', '8'))
+HOMEPAGE_CACHE_TTL = float(os.getenv('HOMEPAGE_CACHE_TTL', '30'))
+HOMEPAGE_LANGUAGES = [lang.strip() for lang in os.getenv('HOMEPAGE_LANGUAGES', 'en,cn').split(',') if lang.strip()]
+homepage_cache = ResponseCache(
+    enabled=True,
+    route_ttls={'homepage': HOMEPAGE_CACHE_TTL},
+    normalizers={'language': normalize_language_code},
+    skip=db_router.pinned,
+    version=current_data_version,
+)
+homepage_refresher: Optional[asyncio.Task] = None
+
+# 目录版本, 用于生成 ETag / Last-Modified
+catalog_version = CatalogVersionSource()
+if catalog_engine is not None:
+    catalog_engine.add_listener(catalog_version.invalidate)
+
+# 支持条件请求的目录接口
+CONDITIONAL_PATHS = ('/api/tools', '/api/categories', '/api/tags', '/api/homepage-data')
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """管理接口鉴权: 请求头 X-Admin-Token 需与 ADMIN_TOKEN 一致, 未配置时拒绝所有请求"""
+    token = os.getenv('ADMIN_TOKEN')
+    if not token or not x_admin_token or not hmac.compare_digest(token, x_admin_token):
+        raise HTTPException(status_code=403, detail="无权访问")
+
+def catalog_ready() -> bool:
+    """内存目录是否可用于应答"""
+    return catalog_engine is not None and catalog_engine.ready
+
+def api_response(data: Any, pagination: Optional[Dict[str, Any]] = None):
+    """列表接口响应: FAST_JSON 启用时直接编码为字节, 否则走 pydantic 模型"""
+    if FAST_JSON_ENABLED:
+        return FastJSONResponse(envelope(data, pagination))
+    return APIResponse(
+        data=data,
+        pagination=PaginationResponse(**pagination) if pagination is not None else None
+    )
+
+def build_tools_page(tools: List[Dict], total: int, page: int, limit: int, all: bool,
+                     next_cursor: Optional[str] = None, total_source: Optional[str] = None):
+    """构建工具列表分页响应"""
+    if all:
+        # 返回所有数据时，分页信息特殊处理
+        pagination = {
+            "page": 1,
+            "limit": total,  # limit设为总数
+            "total": total,
+            "totalPages": 1,  # 只有1页
+            "next_cursor": None,
+            "total_source": total_source,
+        }
+    else:
+        # 正常分页
+        total_pages = (total + limit - 1) // limit
+        pagination = {
+            "page": page,
+            "limit": limit,
+            "total": total,
+            "totalPages": total_pages,
+            "next_cursor": next_cursor,
+            "total_source": total_source,
+        }
+    return api_response(tools, pagination)
+
+def split_keyset_page(rows: List, limit: int) -> tuple:
+    """游标模式多取一行用于判断是否还有下一页, 返回 (当前页行, next_cursor)"""
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1])
+    return rows, None
+
+def screenshot_url(screenshot: Optional[str]) -> Optional[str]:
+    """截图URL; 本地截图在清单中时附加内容版本号, 图片接口据此返回 immutable 缓存头"""
+    url = settings.screenshot_url(screenshot)
+    if image_manifest is not None and url and url.startswith(settings.local_image_prefix):
+        version = image_manifest.url_version(screenshot)
+        if version:
+            return f"{url}?v={version}"
+    return url
+
 def format_tool_response(tool_row: Dict, language: str = 'en') -> Dict:
     """格式化工具响应数据"""
-    # 处理图片URL
-    screenshot = tool_row.get('page_screenshot', '')
-    if screenshot:
-        # 检查是否是完整URL
-        if not screenshot.startswith(('http://', 'https://')):
-            # 从环境变量获取基础URL
-            base_url = os.getenv('FRONTEND_IMAGE_BASE_URL', '/Users/wingerliu/Downloads/startups/LookAiTools/crawler/screenshots')
-            if base_url.startswith('@'):
-                # S3或其他远程URL (以@开头表示远程)
-                screenshot = f"{base_url[1:].rstrip('/')}/{screenshot}"
-            else:
-                # 本地路径，转换为完整的API URL
-                api_base_url = os.getenv('API_BASE_URL', 'http://localhost:8000')
-                screenshot = f"{api_base_url}/api/images/{screenshot}"
+    screenshot = screenshot_url(tool_row.get('page_screenshot', ''))
 
     return {
         "id": tool_row.get('id'),
@@ -107,22 +304,256 @@ def format_tool_response(tool_row: Dict, language: str = 'en') -> Dict:
         "trial_available": tool_row.get('trial_available', False),
     }
 
+def format_tool_detail(tool_data: Dict, language: str = 'en') -> Dict:
+    """格式化工具详情响应数据"""
+    response_data = format_tool_response(tool_data, language)
+    response_data.update({
+        "long_description": tool_data.get('long_description', ''),
+        "use_cases": tool_data.get('use_cases', ''),
+        "target_audience": tool_data.get('target_audience', ''),
+        "subcategory": tool_data.get('subcategory', ''),
+        "industry_tags": tool_data.get('industry_tags', []),
+        "key_features": tool_data.get('key_features', []),
+        "category_description": tool_data.get('category_description', '')
+    })
+    return response_data
+
+def format_category(row: Dict) -> Dict:
+    """格式化分类响应数据"""
+    return {
+        "id": row['category_key'],
+        "name": row['category_name'] or row['category_key'],
+        "slug": row['category_key'],
+        "description": row['category_description'] or '',
+        "count": row['tool_count']
+    }
+
+def format_tag(row: Dict) -> Dict:
+    """格式化标签响应数据 - 匹配前端Category接口"""
+    return {
+        "id": row['tag_key'],       # 前端期望的id字段
+        "name": row['tag_name'],
+        "slug": row['tag_key'],     # 前端期望的slug字段
+        "description": f"{row['tag_type']} tag",  # 可选的描述
+        "count": int(row['usage_count'])  # 前端期望的count字段
+    }
+
+def is_conditional_path(path: str) -> bool:
+    return path in CONDITIONAL_PATHS or path.startswith('/api/tools/')
+
+async def resolve_data_version() -> tuple:
+    """应答所用数据的版本 (version, last_modified): 目录快照就绪时取快照版本, 与内存应答一致;
+    否则取数据库的目录版本"""
+    if catalog_ready():
+        return catalog_engine.data_version()
+    return await catalog_version.get(await get_db_connection())
+
+@app.middleware("http")
+async def catalog_conditional_get(request: Request, call_next):
+    """目录接口的 ETag / Last-Modified, 客户端缓存仍有效时直接返回 304"""
+    if request.method not in ('GET', 'HEAD') or not is_conditional_path(request.url.path):
+        return await call_next(request)
+
+    try:
+        version, last_modified = await resolve_data_version()
+    except Exception as e:
+        print(f"✗ 获取目录版本失败: {e}")
+        return await call_next(request)
+
+    etag = make_etag(version, request.url.path, request.url.query)
+    validators = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified is not None:
+        validators["Last-Modified"] = format_http_date(last_modified)
+
+    if_none_match = request.headers.get('if-none-match')
+    if_modified_since = request.headers.get('if-modified-since')
+    if if_none_match is not None:
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=validators)
+    elif if_modified_since and last_modified is not None and not_modified_since(if_modified_since, last_modified):
+        return Response(status_code=304, headers=validators)
+
+    # 响应缓存以同一版本分键, 保证应答内容不比 ETag 对应的版本旧
+    token = bind_data_version(version)
+    try:
+        response = await call_next(request)
+    finally:
+        release_data_version(token)
+    if response.status_code == 200:
+        response.headers.update(validators)
+    return response
+
+@app.middleware("http")
+async def read_your_writes(request: Request, call_next):
+    """刚写入过的客户端 (cookie 未过期) 在本请求内读主库, 注册在条件请求中间件之后, 位于其外层"""
+    token = db_router.pin_from_cookie(request.cookies.get(READ_YOUR_WRITES_COOKIE))
+    try:
+        return await call_next(request)
+    finally:
+        db_router.release_pin(token)
+
+@app.middleware("http")
+async def record_metrics(request: Request, call_next):
+    """请求耗时和响应大小指标, 注册在读己之写中间件之后 (位于其外层), 中间件直接返回的304也计入"""
+    if not metrics.enabled:
+        return await call_next(request)
+    started = time.perf_counter()
+    metrics.in_flight += 1
+    response = None
+    try:
+        response = await call_next(request)
+        return response
+    finally:
+        metrics.in_flight -= 1
+        metrics.observe_request(
+            route_label(request.scope, app.router.routes),
+            request.method,
+            response.status_code if response is not None else 500,
+            time.perf_counter() - started,
+            response.headers.get('content-length') if response is not None else None,
+        )
+
+# CORS配置 (最后注册, 位于最外层, 保证中间件直接返回的304等响应也带上跨域头)
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+def warm_statements() -> List[str]:
+    """连接池新连接上预先准备的热点语句: 默认形态的列表/首页区块、详情、相关工具、分类和标签"""
+    statements = [TOOL_TAG_KEYS_QUERY, RELATED_CURRENT_TOOL_QUERY, RELATED_TOOLS_QUERY]
+    # 列表第一页: 无筛选 / 按分类 / 仅精选; 语言和分类都是参数, 取值不影响语句文本
+    for category, featured_only in ((None, False), ('category', False), (None, True)):
+        from_where, params, _ = build_tools_filter('en', category, None, featured_only, None)
+        statements.append(build_tools_list_query(
+            from_where, len(params), None, True, None, False, False, False, 1, TOOLS_PAGE_SIZE
+        )[0])
+    for featured_only, order_by in ((True, None), (False, 'created_at'), (False, 'view_count')):
+        statements.append(build_top_tools_query('en', featured_only, order_by)[0])
+    statements.extend(detail_fetcher.statements())
+    # 汇总表在启动阶段才检测, 两种统计查询都准备 (汇总表不存在时该条跳过)
+    statements.extend([CATEGORIES_QUERY, CATEGORIES_STATS_QUERY])
+    for popular in (False, True):
+        statements.append(build_tags_query('en', None, None, 100, popular)[0])
+        statements.append(build_tags_stats_query('en', None, None, 100, popular)[0])
+    return statements
+
 @app.on_event("startup")
 async def startup_event():
     """应用启动时初始化数据库连接"""
+    global search_backend
+    if image_proxy is not None:
+        try:
+            await image_proxy.start()
+        except Exception as e:
+            print(f"✗ 图片代理启动失败: {e}")
+
+    if image_manifest is not None:
+        # 先于工具记录预生成加载, 截图URL才能带上版本号
+        try:
+            await image_manifest.start(on_image_manifest_change)
+        except Exception as e:
+            print(f"✗ 图片清单加载失败: {e}")
+
     try:
-        await get_db_connection()
+        db_router.set_warm_statements(warm_statements)
+        # 主库连接池: 以下检测和目录/联想加载 (含 LISTEN, 副本上不可用) 都在主库上执行
+        pool = await db_router.start()
         print("✓ 数据库连接池已初始化 (多语言架构)")
     except Exception as e:
         print(f"✗ 数据库连接失败: {e}")
+        return
+
+    if search_backend is None:
+        try:
+            async with pool.acquire() as conn:
+                search_backend = SEARCH_FTS if await detect_fts(conn) else SEARCH_ILIKE
+        except Exception as e:
+            search_backend = SEARCH_ILIKE
+            print(f"✗ 检测全文检索失败: {e}")
+        print(f"✓ 搜索后端: {search_backend}")
+
+    global catalog_stats_enabled
+    try:
+        async with pool.acquire() as conn:
+            catalog_stats_enabled = await detect_stats(conn)
+        if catalog_stats_enabled:
+            print("✓ 分类/标签统计读取汇总表")
+    except Exception as e:
+        print(f"✗ 检测统计汇总表失败: {e}")
+
+    global submission_schema
+    try:
+        async with pool.acquire() as conn:
+            submission_schema = await detect_submission_schema(conn)
+        if not submission_schema.slug_unique:
+            print("✗ tools.slug 缺少唯一索引, 工具提交退回咨询锁 (请执行 sql/006_tool_submissions.sql)")
+    except Exception as e:
+        print(f"✗ 检测工具提交迁移失败: {e}")
+
+    if catalog_engine is not None:
+        try:
+            await catalog_engine.start(pool)
+        except Exception as e:
+            print(f"✗ 目录引擎加载失败, 回退到数据库查询: {e}")
+
+    if tool_records is not None and catalog_ready():
+        try:
+            await tool_records.attach(catalog_engine)
+        except Exception as e:
+            print(f"✗ 工具记录预生成失败: {e}")
+
+    if search_engine is not None and catalog_ready():
+        try:
+            await search_engine.attach(catalog_engine)
+        except Exception as e:
+            print(f"✗ 搜索索引构建失败: {e}")
+
+    if related_engine is not None and catalog_ready():
+        try:
+            await related_engine.attach(catalog_engine)
+        except Exception as e:
+            print(f"✗ 相关工具邻居表构建失败, 回退到同分类查询: {e}")
+
+    if suggest_engine is not None:
+        try:
+            if local_catalog is not None and catalog_ready():
+                await suggest_engine.attach(catalog_engine)
+            else:
+                await suggest_engine.start(pool)
+        except Exception as e:
+            print(f"✗ 联想索引构建失败, 回退到数据库查询: {e}")
+
+    if THUMBNAILS_AVAILABLE:
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, image_variants.load)
+        except Exception as e:
+            print(f"✗ 缩略图缓存目录加载失败: {e}")
+
+    global homepage_refresher
+    await refresh_homepage_data()
+    homepage_refresher = asyncio.create_task(homepage_refresh_loop())
+    if catalog_engine is not None:
+        catalog_engine.add_listener(on_homepage_catalog_update)
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """应用关闭时清理资源"""
-    global db_pool
-    if db_pool:
-        await db_pool.close()
-        print("✓ 数据库连接池已关闭")
+    if homepage_refresher is not None:
+        homepage_refresher.cancel()
+    if suggest_engine is not None:
+        await suggest_engine.stop()
+    image_variants.close()
+    if image_manifest is not None:
+        image_manifest.stop()
+    if image_proxy is not None:
+        await image_proxy.close()
+    if catalog_engine is not None:
+        await catalog_engine.stop()
+    await db_router.close()
 
 @app.get("/health")
 async def health_check():
@@ -131,235 +562,621 @@ async def health_check():
         pool = await get_db_connection()
         async with pool.acquire() as conn:
             await conn.fetchval("SELECT 1")
-        return {"status": "healthy", "database": "connected", "architecture": "multilingual"}
+        health = {"status": "healthy", "database": "connected", "architecture": "multilingual"}
+        health["database_pool"] = db_router.stats()
+        health["images"] = image_variants.stats()
+        if image_manifest is not None:
+            health["image_manifest"] = image_manifest.stats()
+        if image_proxy is not None:
+            health["image_proxy"] = image_proxy.stats()
+        if catalog_engine is not None:
+            health["catalog"] = catalog_engine.stats()
+        if tool_records is not None:
+            health["tool_records"] = tool_records.stats()
+        if search_engine is not None:
+            health["search"] = search_engine.stats()
+        if related_engine is not None:
+            health["related"] = related_engine.stats()
+        if suggest_engine is not None:
+            health["suggest"] = suggest_engine.stats()
+        return health
     except Exception as e:
         return {"status": "unhealthy", "database": "disconnected", "error": str(e)}
 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus 文本格式的运行指标"""
+    if not metrics.enabled:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return Response(content=metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
+# 工具列表默认每页数量
+TOOLS_PAGE_SIZE = 12
+
+# 列表查询的列
+TOOL_LIST_COLUMNS = """
+    t.*,
+    c.category_key,
+    ct.category_name,
+    tt.name, tt.title, tt.description
+"""
+
+def build_tools_filter(
+    language: str,
+    category: Optional[str],
+    tag_list: Optional[List[str]],
+    featured_only: bool,
+    search: Optional[str],
+) -> tuple:
+    """构建工具列表共用的 FROM/WHERE 片段, 返回 (from_where, params, relevance_expr)"""
+    # 构建查询条件
+    where_conditions = ["t.status = 'active'"]
+    params = []
+    param_count = 0
+
+    # 分类筛选
+    if category:
+        param_count += 1
+        where_conditions.append(f"c.category_key = ${param_count}")
+        params.append(category)
+
+    # 标签筛选
+    if tag_list:
+        param_count += 1
+        where_conditions.append(f"""
+            t.id IN (
+                SELECT DISTINCT tool_tags.tool_id 
+                FROM tool_tags 
+                JOIN tags ON tool_tags.tag_id = tags.id 
+                WHERE tags.tag_key = ANY(${param_count})
+            )
+        """)
+        params.append(tag_list)
+
+    # 精选筛选
+    if featured_only:
+        where_conditions.append("t.featured = true")
+
+    # 搜索功能: 全文索引 + 名称模糊匹配, 不可用时退回 ILIKE
+    relevance_expr = None
+    tsquery = build_tsquery(search, language) if search and search_backend == SEARCH_FTS else None
+    if tsquery:
+        config, query_text = tsquery
+        params.extend([config, query_text, search])
+        config_index, query_index, term_index = param_count + 1, param_count + 2, param_count + 3
+        param_count += 3
+        ts_query = f"to_tsquery(${config_index}::regconfig, ${query_index})"
+        where_conditions.append(f"(tt.search_vector @@ {ts_query} OR tt.name % ${term_index})")
+        relevance_expr = (
+            f"ts_rank_cd(tt.search_vector, {ts_query}) + similarity(coalesce(tt.name, ''), ${term_index})"
+        )
+    elif search:
+        param_count += 1
+        where_conditions.append(f"""
+            (tt.name ILIKE ${param_count} OR
+             tt.title ILIKE ${param_count} OR
+             tt.description ILIKE ${param_count})
+        """)
+        params.append(f"%{search}%")
+        # 名称命中优先于标题, 标题优先于描述
+        relevance_expr = f"""
+            CASE WHEN tt.name ILIKE ${param_count} THEN 3
+                 WHEN tt.title ILIKE ${param_count} THEN 2
+                 ELSE 1 END
+        """
+
+    where_clause = " AND ".join(where_conditions)
+    
+    # 语言参数将作为最后一个参数
+    language_param_index = param_count + 1
+
+    from_where = f"""
+        FROM tools t
+        LEFT JOIN categories c ON t.category_id = c.id
+        LEFT JOIN tool_translations tt ON t.id = tt.tool_id AND tt.language_code = ${language_param_index}
+        LEFT JOIN category_translations ct ON c.id = ct.category_id AND ct.language_code = ${language_param_index}
+        WHERE {where_clause}
+    """
+    params.append(language)
+
+    return from_where, params, relevance_expr
+
+def build_tools_list_query(
+    from_where: str,
+    param_count: int,
+    relevance_expr: Optional[str],
+    use_window: bool,
+    after: Optional[tuple],
+    by_relevance: bool,
+    keyset: bool,
+    all: bool,
+    page: int,
+    limit: int,
+) -> tuple:
+    """拼接工具列表的数据查询, 返回 (query, offset); 游标值作为 from_where 参数之后的参数"""
+    select_columns = TOOL_LIST_COLUMNS
+    if use_window:
+        select_columns += f", COUNT(*) OVER() AS {WINDOW_COUNT_COLUMN}"
+    if relevance_expr:
+        select_columns += f", {relevance_expr} AS relevance"
+    query = f"SELECT {select_columns} {from_where}"
+
+    if after is not None:
+        # 行值比较定位到游标之后, 可直接利用排序索引
+        seek_placeholders = ", ".join(f"${param_count + i + 1}" for i in range(len(after)))
+        query += f" AND {SEEK_COLUMNS} < ({seek_placeholders})"
+
+    if by_relevance and relevance_expr:
+        query += f" ORDER BY relevance DESC, {ORDER_BY_CLAUSE}"
+    else:
+        query += f" ORDER BY {ORDER_BY_CLAUSE}"
+
+    # 分页查询
+    offset = 0
+    if keyset:
+        query += f" LIMIT {limit + 1}"
+    elif not all:
+        offset = (page - 1) * limit
+        query += f" LIMIT {limit} OFFSET {offset}"
+    return query, offset
+
+# 批量查询工具的标签key
+TOOL_TAG_KEYS_QUERY = """
+    SELECT tt.tool_id, t.tag_key, tt.tag_type
+    FROM tool_tags tt
+    JOIN tags t ON tt.tag_id = t.id
+    WHERE tt.tool_id = ANY($1)
+"""
+
+async def fetch_tool_tag_keys(conn, tool_ids: List[int]) -> Dict[int, List[str]]:
+    """批量查询工具的标签key"""
+    tools_tags: Dict[int, List[str]] = {}
+    if not tool_ids:
+        return tools_tags
+    for tag_row in await metrics.time_query('tags_batch', conn.fetch(TOOL_TAG_KEYS_QUERY, tool_ids)):
+        tools_tags.setdefault(tag_row['tool_id'], []).append(tag_row['tag_key'])
+    return tools_tags
+
+def catalog_tool_records(tool_ids: List[int], language: str, scores: Optional[Dict[int, float]] = None,
+                         snap=None) -> List[Dict]:
+    """按ID取内存目录中预先格式化的工具记录, 有搜索分数时复制后附加 relevance
+    指定的快照已被替换时, 预生成的记录对应新快照, 改为从该快照现场格式化
+    """
+    if tool_records is not None and tool_records.ready and (snap is None or snap is catalog_engine.snapshot):
+        tools = tool_records.get_many(tool_ids, language)
+    else:
+        tools = [format_tool_response(row, language) for row in catalog_engine.tool_rows(tool_ids, language, snap=snap)]
+    if scores is not None:
+        tools = [dict(tool, relevance=scores[tool['id']]) for tool in tools]
+    return tools
+
+async def iter_catalog_tool_batches(
+    language: str,
+    category: Optional[str],
+    tag_list: Optional[List[str]],
+    featured_only: bool,
+    search: Optional[str],
+    scores: Optional[Dict[int, float]],
+    by_relevance: bool,
+):
+    """从内存目录按批次产出格式化后的工具; 全程使用开始时的快照, 输出期间目录更新不会造成重复或遗漏"""
+    snap = catalog_engine.snapshot
+    ids = catalog_engine.filter_tool_ids(language, category, tag_list, featured_only, search, scores, snap=snap)
+    if scores is not None and by_relevance:
+        ids = sorted(ids, key=lambda tool_id: -scores[tool_id])
+    for start in range(0, len(ids), STREAM_BATCH_SIZE):
+        yield catalog_tool_records(ids[start:start + STREAM_BATCH_SIZE], language, scores, snap=snap)
+
+async def iter_db_tool_batches(
+    language: str,
+    category: Optional[str],
+    tag_list: Optional[List[str]],
+    featured_only: bool,
+    search: Optional[str],
+    by_relevance: bool,
+):
+    """通过服务端游标按批次读取工具, 每批一次性补齐标签"""
+    from_where, params, relevance_expr = build_tools_filter(
+        language, category, tag_list, featured_only, search
+    )
+    query, _ = build_tools_list_query(
+        from_where, len(params), relevance_expr, False, None, by_relevance, False, True, 1, 0
+    )
+
+    pool = await get_db_connection()
+    async with pool.acquire() as conn:
+        # 服务端游标必须在事务内使用
+        async with conn.transaction():
+            cur = await conn.cursor(query, *params)
+            while True:
+                rows = await cur.fetch(STREAM_BATCH_SIZE)
+                if not rows:
+                    break
+                tools_tags = await fetch_tool_tag_keys(conn, [row['id'] for row in rows])
+                batch = []
+                for row in rows:
+                    tool_data = dict(row)
+                    tool_data['tags'] = tools_tags.get(row['id'], [])
+                    tool = format_tool_response(tool_data, language)
+                    if relevance_expr:
+                        tool['relevance'] = float(row['relevance'] or 0)
+                    batch.append(tool)
+                yield batch
+
+async def log_stream_errors(batches):
+    """流式响应开始后无法再改状态码, 出错时记录日志后继续抛出:
+    服务器随即中断连接, 分块传输没有正常结束, 客户端能识别为不完整的输出 (而不是一份被截短的完整结果)
+    """
+    try:
+        async for batch in batches:
+            yield batch
+    except Exception as e:
+        print(f"✗ 流式输出工具列表失败: {e}")
+        raise
+
 @app.get("/api/tools")
+@response_cache.route("tools", bypass=lambda params: bool(params.get('format')))
 async def get_tools(
     page: int = Query(1, ge=1, description="页码"),
-    limit: int = Query(12, ge=1, le=100, description="每页数量"),
+    limit: int = Query(TOOLS_PAGE_SIZE, ge=1, le=100, description="每页数量"),
     category: Optional[str] = Query(None, description="分类筛选"),
     tags: Optional[str] = Query(None, description="标签筛选"),
     featured: Optional[str] = Query(None, description="是否精选"),
     search: Optional[str] = Query(None, description="搜索关键词"),
     language: str = Query("en", description="语言"),
     minimal: Optional[str] = Query(None, description="简化响应"),
-    all: bool = Query(False, description="是否返回所有数据（忽略分页）")
+    all: bool = Query(False, description="是否返回所有数据（忽略分页）"),
+    cursor: Optional[str] = Query(None, description="游标分页: 传空值取第一页, 之后传上一页返回的next_cursor"),
+    approximate_total: bool = Query(False, description="宽泛查询允许返回估算的总数"),
+    sort: Optional[str] = Query(None, description="排序方式: relevance 按搜索相关度"),
+    format: Optional[str] = Query(None, description="流式输出格式: ndjson / json-stream (需配合 all=true)")
 ):
     """获取工具列表 - 多语言架构版本"""
     try:
+        if format is not None and (format not in STREAM_FORMATS or not all):
+            raise HTTPException(status_code=400, detail="format 仅支持 ndjson / json-stream, 且需配合 all=true")
+
         # 标准化语言代码
         language = normalize_language_code(language)
+
+        # 游标分页模式 (all=true 时忽略)
+        keyset = cursor is not None and not all
+        try:
+            after = decode_cursor(cursor) if keyset else None
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        # 相关度排序只在有搜索词时生效, 且无法与游标分页组合
+        by_relevance = sort == 'relevance' and bool(search)
+        if by_relevance and keyset:
+            raise HTTPException(status_code=400, detail="游标分页不支持按相关度排序")
+
+        tag_list = [tag.strip() for tag in tags.split(',') if tag.strip()] if tags else None
+        featured_only = bool(featured and featured.lower() in ['true', '1'])
+        count_key = filter_key(language, category, tag_list, featured_only, search)
+
+        # 内存搜索引擎命中结果 {tool_id: 分数}
+        scores = None
+        if search and search_engine is not None and search_engine.ready:
+            scores = await search_engine.search_async(search, language)
+
+        use_catalog = catalog_ready() and (scores is not None or not by_relevance)
+
+        # 流式输出: 批量读取、边格式化边写出
+        if format:
+            if use_catalog:
+                batches = iter_catalog_tool_batches(
+                    language, category, tag_list, featured_only, search, scores, by_relevance
+                )
+            else:
+                batches = iter_db_tool_batches(language, category, tag_list, featured_only, search, by_relevance)
+            return StreamingResponse(
+                encode_stream(format, log_stream_errors(batches)),
+                media_type=STREAM_FORMATS[format]
+            )
+
+        # 内存目录可用时直接应答 (相关度排序需要内存搜索引擎)
+        if use_catalog:
+            ids, total = catalog_engine.list_tool_ids(
+                language,
+                category=category,
+                tags=tag_list,
+                featured=featured_only,
+                search=search,
+                page=page,
+                limit=limit,
+                all=all,
+                after=after,
+                keyset=keyset,
+                scores=scores,
+                by_relevance=by_relevance,
+            )
+            next_cursor = None
+            if keyset and len(ids) > limit:
+                ids = ids[:limit]
+                next_cursor = encode_cursor(catalog_engine.sort_row(ids[-1]))
+            tools = catalog_tool_records(ids, language, scores)
+            return build_tools_page(tools, total, page, limit, all, next_cursor, TOTAL_MEMORY)
+
         pool = await get_db_connection()
+        if COUNT_STRATEGY == TOTAL_CACHED:
+            # 数据库路径没有目录引擎的变更回调, 总数按目录版本分键缓存, 数据变更后旧总数不再命中
+            version, _ = await catalog_version.get(pool)
+            count_key = (version,) + count_key
         async with pool.acquire() as conn:
-            # 构建查询条件
-            where_conditions = ["t.status = 'active'"]
-            params = []
-            param_count = 0
-
-            # 分类筛选
-            if category:
-                param_count += 1
-                where_conditions.append(f"c.category_key = ${param_count}")
-                params.append(category)
-
-            # 标签筛选
-            if tags:
-                tag_list = [tag.strip() for tag in tags.split(',') if tag.strip()]
-                if tag_list:
-                    param_count += 1
-                    where_conditions.append(f"""
-                        t.id IN (
-                            SELECT DISTINCT tool_tags.tool_id 
-                            FROM tool_tags 
-                            JOIN tags ON tool_tags.tag_id = tags.id 
-                            WHERE tags.tag_key = ANY(${param_count})
-                        )
-                    """)
-                    params.append(tag_list)
-
-            # 精选筛选
-            if featured and featured.lower() in ['true', '1']:
-                where_conditions.append("t.featured = true")
-
-            # 搜索功能
-            if search:
-                param_count += 1
-                where_conditions.append(f"""
-                    (tt.name ILIKE ${param_count} OR
-                     tt.title ILIKE ${param_count} OR
-                     tt.description ILIKE ${param_count})
-                """)
-                params.append(f"%{search}%")
-
-            where_clause = " AND ".join(where_conditions)
-            
-            # 语言参数将作为最后一个参数
-            language_param_index = param_count + 1
-
-            # 构建主查询
-            base_query = f"""
-                SELECT
-                    t.*,
-                    c.category_key,
-                    ct.category_name,
-                    tt.name, tt.title, tt.description
-                FROM tools t
-                LEFT JOIN categories c ON t.category_id = c.id
-                LEFT JOIN tool_translations tt ON t.id = tt.tool_id AND tt.language_code = ${language_param_index}
-                LEFT JOIN category_translations ct ON c.id = ct.category_id AND ct.language_code = ${language_param_index}
-                WHERE {where_clause}
-                ORDER BY t.featured DESC, t.rating DESC, t.view_count DESC, t.created_at DESC
-            """
-            params.append(language)
-
-            # 获取总数
-            count_query = f"""
-                SELECT COUNT(DISTINCT t.id)
-                FROM tools t
-                LEFT JOIN categories c ON t.category_id = c.id
-                LEFT JOIN tool_translations tt ON t.id = tt.tool_id AND tt.language_code = ${language_param_index}
-                LEFT JOIN category_translations ct ON c.id = ct.category_id AND ct.language_code = ${language_param_index}
-                WHERE {where_clause}
-            """
-            total = await conn.fetchval(count_query, *params)
-
-            # 分页查询
-            if not all:
-                offset = (page - 1) * limit
-                base_query += f" LIMIT {limit} OFFSET {offset}"
-
-            rows = await conn.fetch(base_query, *params)
+            from_where, params, relevance_expr = build_tools_filter(
+                language, category, tag_list, featured_only, search
+            )
+
+            # 总数: 优先使用估算值或缓存, 否则在数据查询中用窗口函数一并取回
+            total, total_source = None, None
+            if approximate_total and is_broad_query(tag_list, search):
+                total = await metrics.time_query('estimate', estimate_total(conn, from_where, params))
+                if total is not None:
+                    total_source = TOTAL_ESTIMATE
+            if total is None and COUNT_STRATEGY == TOTAL_CACHED:
+                total = count_cache.get(count_key)
+                if total is not None:
+                    total_source = TOTAL_CACHED
+            # 游标定位后窗口函数只能统计剩余行, 此时需要单独计数
+            use_window = total is None and after is None
+
+            base_query, offset = build_tools_list_query(
+                from_where, len(params), relevance_expr, use_window, after, by_relevance, keyset, all, page, limit
+            )
+            data_params = list(params) + list(after or ())
+
+            rows = await metrics.time_query('list', conn.fetch(base_query, *data_params))
+
+            if use_window and (rows or offset == 0):
+                total = rows[0][WINDOW_COUNT_COLUMN] if rows else 0
+                total_source = TOTAL_WINDOW
+            elif total is None:
+                # 游标翻页或页码越界时窗口函数拿不到总数
+                count_query = f"SELECT COUNT(*) {from_where}"
+                total = await metrics.time_query('count', conn.fetchval(count_query, *params))
+                total_source = TOTAL_COUNT_QUERY
+
+            if COUNT_STRATEGY == TOTAL_CACHED and total_source in (TOTAL_WINDOW, TOTAL_COUNT_QUERY):
+                count_cache.set(count_key, total)
+
+            next_cursor = None
+            if keyset:
+                rows, next_cursor = split_keyset_page(rows, limit)
 
             # 批量获取所有工具的标签
             tools = []
-            tool_ids = [row['id'] for row in rows]
-            
-            if tool_ids:
-                # 批量查询所有工具的标签
-                tags_query = """
-                    SELECT tt.tool_id, t.tag_key, tt.tag_type
-                    FROM tool_tags tt
-                    JOIN tags t ON tt.tag_id = t.id
-                    WHERE tt.tool_id = ANY($1)
-                """
-                tags_rows = await conn.fetch(tags_query, tool_ids)
-                
-                # 按工具ID组织标签数据
-                tools_tags = {}
-                for tag_row in tags_rows:
-                    tool_id = tag_row['tool_id']
-                    if tool_id not in tools_tags:
-                        tools_tags[tool_id] = []
-                    tools_tags[tool_id].append(tag_row['tag_key'])
+            tools_tags = await fetch_tool_tag_keys(conn, [row['id'] for row in rows])
 
             # 格式化响应
             for row in rows:
                 tool_data = dict(row)
                 # 添加标签数据
                 tool_data['tags'] = tools_tags.get(row['id'], [])
-                tools.append(format_tool_response(tool_data, language))
-
-            if all:
-                # 返回所有数据时，分页信息特殊处理
-                return APIResponse(
-                    data=tools,
-                    pagination=PaginationResponse(
-                        page=1,
-                        limit=total,  # limit设为总数
-                        total=total,
-                        totalPages=1  # 只有1页
-                    )
+                tool = format_tool_response(tool_data, language)
+                if relevance_expr:
+                    tool['relevance'] = float(row['relevance'] or 0)
+                tools.append(tool)
+
+            return build_tools_page(tools, total, page, limit, all, next_cursor, total_source)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取工具列表失败: {str(e)}")
+
+def parse_batch_identifiers(ids: List[str]) -> List[str]:
+    """去掉空白项, 校验数量"""
+    identifiers = [identifier.strip() for identifier in ids if identifier and identifier.strip()]
+    if not identifiers:
+        raise HTTPException(status_code=400, detail="ids 不能为空")
+    if len(identifiers) > TOOL_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"ids 最多 {TOOL_BATCH_MAX} 个")
+    return identifiers
+
+async def load_tool_batch(identifiers: List[str], language: str) -> APIResponse:
+    """批量详情: 按请求顺序返回, 每项带 found 标记, 未找到时 tool 为 null"""
+    language = normalize_language_code(language)
+    if catalog_ready():
+        tools = [catalog_engine.get_tool_detail(identifier, language) for identifier in identifiers]
+    else:
+        pool = await get_db_connection()
+        tools = await metrics.time_query('detail_batch', detail_fetcher.fetch_many(pool, identifiers, language))
+
+    return APIResponse(data=[
+        {
+            "identifier": identifier,
+            "found": tool_data is not None,
+            "tool": format_tool_detail(tool_data, language) if tool_data is not None else None,
+        }
+        for identifier, tool_data in zip(identifiers, tools)
+    ])
+
+# 需在 /api/tools/{tool_identifier} 之前注册, 避免 batch 被当作工具标识符
+@app.get("/api/tools/batch")
+async def get_tools_batch(
+    ids: str = Query(..., description="逗号分隔的工具ID或slug"),
+    language: str = Query("en", description="语言"),
+):
+    """批量获取工具详情 (对比页、聊天卡片), 查询条数与工具数无关"""
+    identifiers = parse_batch_identifiers(ids.split(','))
+    try:
+        return await load_tool_batch(identifiers, language)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"批量获取工具详情失败: {str(e)}")
+
+@app.post("/api/tools/batch")
+async def post_tools_batch(request: ToolBatchRequest):
+    """批量获取工具详情, 请求体 {"ids": [...], "language": "en"}"""
+    identifiers = parse_batch_identifiers(request.ids)
+    try:
+        return await load_tool_batch(identifiers, request.language)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"批量获取工具详情失败: {str(e)}")
+
+def submission_slug(name: str) -> str:
+    return name.strip().lower().replace(' ', '-').replace('_', '-')
+
+def submission_languages(values: Dict[str, str]) -> Dict[str, str]:
+    """按标准化后的语言代码取值; zh / cn 等标准化后相同的键取第一个非空值"""
+    merged: Dict[str, str] = {}
+    for language, value in values.items():
+        if value:
+            merged.setdefault(normalize_language_code(language), value)
+    return merged
+
+@app.post("/api/tools/submit")
+async def submit_tool(submission: ToolSubmission):
+    """提交AI工具: 写入主库, 状态为 pending 待审核; 响应带读己之写 cookie
+
+    - category 必须是已有分类, 否则返回 422
+    - 各语言字段按标准化后的语言代码合并, 每种语言一条翻译
+    - tags / industry_tags 只关联已有标签, 未匹配的在 data.unmatched_tags 中返回
+    - pricing_details、联系人信息和完整提交内容在执行 sql/006_tool_submissions.sql 后保存
+    - 没有落库的字段 (未执行迁移时) 列在 data.ignored_fields 中
+    """
+    names = submission_languages(submission.name)
+    slug = submission_slug(names.get('en', ''))
+    if not slug:
+        raise HTTPException(status_code=400, detail="工具英文名称不能为空")
+    schema = submission_schema
+    ignored_fields = []
+    if not schema.submissions:
+        ignored_fields += [
+            field for field in ('contact_email', 'contact_name', 'company_name')
+            if getattr(submission, field)
+        ]
+    pricing_details = submission_languages(submission.pricing_details)
+    if not schema.pricing_details and pricing_details:
+        ignored_fields.append('pricing_details')
+    fields = {
+        field: submission_languages(getattr(submission, field))
+        for field in ('title', 'description', 'long_description', 'use_cases', 'target_audience', 'subcategory')
+    }
+    try:
+        pool = await get_db_write_connection()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                category_id = await conn.fetchval(
+                    "SELECT id FROM categories WHERE category_key = $1", submission.category
                 )
-            else:
-                # 正常分页
-                total_pages = (total + limit - 1) // limit
-                return APIResponse(
-                    data=tools,
-                    pagination=PaginationResponse(
-                        page=page,
-                        limit=limit,
-                        total=total,
-                        totalPages=total_pages
-                    )
+                if category_id is None:
+                    raise HTTPException(status_code=422, detail=f"分类不存在: {submission.category}")
+                trial = submission.trial_available.get('en', '').strip().lower() in ('yes', 'true', '1')
+                tool_id, slug = await insert_tool(
+                    conn, schema, slug, submission.url, submission.thumbnail_url or None, category_id,
+                    submission.pricing_type.get('en') or None, trial,
                 )
 
+                # 每种提交了名称的语言一条翻译
+                columns = ['tool_id', 'language_code', 'name', *fields]
+                if schema.pricing_details:
+                    columns.append('pricing_details')
+                translations = []
+                for language, name in names.items():
+                    row = (tool_id, language, name, *(values.get(language) for values in fields.values()))
+                    if schema.pricing_details:
+                        row += (pricing_details.get(language),)
+                    translations.append(row)
+                placeholders = ", ".join(f"${i}" for i in range(1, len(columns) + 1))
+                await conn.executemany(
+                    f"INSERT INTO tool_translations ({', '.join(columns)}) VALUES ({placeholders})", translations
+                )
+
+                features = [
+                    (tool_id, language, text, sort_order)
+                    for sort_order, feature in enumerate(submission.key_features, 1)
+                    for language, text in submission_languages(feature).items()
+                ]
+                if features:
+                    await conn.executemany("""
+                        INSERT INTO tool_features (tool_id, language_code, feature_text, sort_order)
+                        VALUES ($1, $2, $3, $4)
+                    """, features)
+
+                matched_tags, unmatched_tags = await match_tags(conn, (
+                    [('general', tag) for tag in submission.tags]
+                    + [('industry', tag) for tag in submission.industry_tags]
+                ))
+                if matched_tags:
+                    await conn.executemany("""
+                        INSERT INTO tool_tags (tool_id, tag_id, tag_type) VALUES ($1, $2, $3)
+                    """, [(tool_id, tag_id, tag_type) for tag_id, tag_type in matched_tags])
+
+                if schema.submissions:
+                    await record_submission(conn, tool_id, submission.model_dump())
+
+        response = JSONResponse(content={
+            "data": {
+                "id": tool_id, "slug": slug, "status": "pending",
+                "unmatched_tags": unmatched_tags, "ignored_fields": ignored_fields,
+            },
+            "success": True,
+            "message": "工具提交成功，我们将在2-3个工作日内审核",
+        })
+        db_router.pin(response)
+        return response
+
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"获取工具列表失败: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"提交工具失败: {str(e)}")
 
 @app.get("/api/tools/{tool_identifier}")
+@response_cache.route("tool")
 async def get_tool(tool_identifier: str, language: str = Query("en", description="语言")):
     """获取单个工具详情 - 多语言架构版本"""
     try:
         # 标准化语言代码
         language = normalize_language_code(language)
-        pool = await get_db_connection()
-        async with pool.acquire() as conn:
-            # 构建查询 - 支持通过slug或ID查找
-            base_query = """
-                SELECT
-                    t.*,
-                    c.category_key,
-                    ct.category_name, ct.category_description,
-                    tt.name, tt.title, tt.description, tt.long_description,
-                    tt.use_cases, tt.target_audience, tt.subcategory
-                FROM tools t
-                LEFT JOIN categories c ON t.category_id = c.id
-                LEFT JOIN tool_translations tt ON t.id = tt.tool_id AND tt.language_code = $1
-                LEFT JOIN category_translations ct ON c.id = ct.category_id AND ct.language_code = $1
-                WHERE t.status = 'active' AND (t.slug = $2 OR t.id::text = $2)
-            """
-
-            row = await conn.fetchrow(base_query, language, tool_identifier)
-
-            if not row:
+
+        if catalog_ready():
+            tool_data = catalog_engine.get_tool_detail(tool_identifier, language)
+            if not tool_data:
                 raise HTTPException(status_code=404, detail="工具不存在")
+            return APIResponse(data=format_tool_detail(tool_data, language))
+
+        pool = await get_db_connection()
+        tool_data = await metrics.time_query('detail', detail_fetcher.fetch(pool, tool_identifier, language))
+        if not tool_data:
+            raise HTTPException(status_code=404, detail="工具不存在")
 
-            # 获取标签
-            tags_query = """
-                SELECT ttr.tag_name, tt.tag_type
-                FROM tool_tags tt
-                JOIN tag_translations ttr ON tt.tag_id = ttr.tag_id
-                WHERE tt.tool_id = $1 AND ttr.language_code = $2
-            """
-            tags = await conn.fetch(tags_query, row['id'], language)
-
-            # 获取功能特性
-            features_query = """
-                SELECT feature_text
-                FROM tool_features
-                WHERE tool_id = $1 AND language_code = $2
-                ORDER BY sort_order
-            """
-            features = await conn.fetch(features_query, row['id'], language)
-
-            # 格式化工具数据
-            tool_data = dict(row)
-            tool_data['tags'] = [tag['tag_name'] for tag in tags if tag['tag_type'] == 'general']
-            tool_data['industry_tags'] = [tag['tag_name'] for tag in tags if tag['tag_type'] == 'industry']
-            tool_data['key_features'] = [f['feature_text'] for f in features]
-
-            # 构建完整响应
-            response_data = format_tool_response(tool_data, language)
-            response_data.update({
-                "long_description": tool_data.get('long_description', ''),
-                "use_cases": tool_data.get('use_cases', ''),
-                "target_audience": tool_data.get('target_audience', ''),
-                "subcategory": tool_data.get('subcategory', ''),
-                "industry_tags": tool_data.get('industry_tags', []),
-                "key_features": tool_data.get('key_features', []),
-                "category_description": tool_data.get('category_description', '')
-            })
-
-            return APIResponse(data=response_data)
+        return APIResponse(data=format_tool_detail(tool_data, language))
 
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取工具详情失败: {str(e)}")
 
+# 相关工具回退查询: 当前工具的分类, 以及同分类按评分排序的其他工具
+RELATED_CURRENT_TOOL_QUERY = """
+    SELECT id, category_id
+    FROM tools
+    WHERE (slug = $1 OR id::text = $1) AND status = 'active'
+"""
+
+RELATED_TOOLS_QUERY = """
+    SELECT
+        t.id, t.slug, t.url, t.page_screenshot, t.rating, t.view_count,
+        t.pricing_type, t.featured, t.created_at, t.updated_at,
+        c.category_key,
+        ct.category_name,
+        tt.name as name,
+        tt.title as title,
+        tt.description as description
+    FROM tools t
+    LEFT JOIN categories c ON t.category_id = c.id
+    LEFT JOIN tool_translations tt ON t.id = tt.tool_id AND tt.language_code = $1
+    LEFT JOIN category_translations ct ON c.id = ct.category_id AND ct.language_code = $1
+    WHERE t.category_id = $2
+      AND t.id != $3
+      AND t.status = 'active'
+    ORDER BY t.rating DESC, t.view_count DESC
+    LIMIT $4
+"""
+
 @app.get("/api/tools/{tool_identifier}/related")
+@response_cache.route("related")
 async def get_related_tools(
     tool_identifier: str, 
     language: str = Query("en", description="语言"),
@@ -369,93 +1186,263 @@ async def get_related_tools(
     try:
         # 标准化语言代码
         language = normalize_language_code(language)
+
+        # 预计算的标签相似度邻居表: 一次查找
+        if related_engine is not None and related_engine.ready and catalog_ready():
+            tool_id = catalog_engine.resolve(tool_identifier)
+            if tool_id is None:
+                raise HTTPException(status_code=404, detail="工具不存在")
+            return api_response(catalog_tool_records(related_engine.related(tool_id, limit), language))
+
         pool = await get_db_connection()
         async with pool.acquire() as conn:
             # 首先获取当前工具的信息
-            tool_query = """
-                SELECT id, category_id
-                FROM tools
-                WHERE (slug = $1 OR id::text = $1) AND status = 'active'
-            """
-            current_tool = await conn.fetchrow(tool_query, tool_identifier)
+            current_tool = await metrics.time_query(
+                'related_tool', conn.fetchrow(RELATED_CURRENT_TOOL_QUERY, tool_identifier)
+            )
             
             if not current_tool:
                 raise HTTPException(status_code=404, detail="工具不存在")
             
             # 查询同类别的其他工具（排除当前工具）
-            related_query = """
-                SELECT
-                    t.id, t.slug, t.url, t.page_screenshot, t.rating, t.view_count,
-                    t.pricing_type, t.featured, t.created_at, t.updated_at,
-                    c.category_key,
-                    ct.category_name,
-                    tt.name as name,
-                    tt.title as title,
-                    tt.description as description
-                FROM tools t
-                LEFT JOIN categories c ON t.category_id = c.id
-                LEFT JOIN tool_translations tt ON t.id = tt.tool_id AND tt.language_code = $1
-                LEFT JOIN category_translations ct ON c.id = ct.category_id AND ct.language_code = $1
-                WHERE t.category_id = $2 
-                  AND t.id != $3 
-                  AND t.status = 'active'
-                ORDER BY t.rating DESC, t.view_count DESC
-                LIMIT $4
-            """
-            
-            rows = await conn.fetch(related_query, language, current_tool['category_id'], current_tool['id'], limit)
-            
+            rows = await metrics.time_query('related', conn.fetch(
+                RELATED_TOOLS_QUERY, language, current_tool['category_id'], current_tool['id'], limit
+            ))
+            tools_tags = await fetch_tool_tag_keys(conn, [row['id'] for row in rows])
+
             # 格式化响应
             related_tools = []
             for row in rows:
                 tool_data = dict(row)
+                tool_data['tags'] = tools_tags.get(row['id'], [])
                 related_tools.append(format_tool_response(tool_data, language))
             
-            return APIResponse(data=related_tools)
+            return api_response(related_tools)
             
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取相关工具失败: {str(e)}")
 
+CATEGORIES_QUERY = """
+    SELECT
+        c.category_key,
+        ct.category_name,
+        ct.category_description,
+        COUNT(t.id) as tool_count
+    FROM categories c
+    LEFT JOIN category_translations ct ON c.id = ct.category_id AND ct.language_code = $1
+    LEFT JOIN tools t ON c.id = t.category_id AND t.status = 'active'
+    GROUP BY c.id, c.category_key, ct.category_name, ct.category_description, c.sort_order
+    ORDER BY c.sort_order, tool_count DESC
+"""
+
+async def fetch_categories(conn, language: str) -> List[Dict]:
+    """分类列表及各分类的活跃工具数"""
+    query = CATEGORIES_STATS_QUERY if catalog_stats_enabled else CATEGORIES_QUERY
+    rows = await metrics.time_query('categories', conn.fetch(query, language))
+    return [format_category(row) for row in rows]
+
 @app.get("/api/categories")
+@response_cache.route("categories")
 async def get_categories(language: str = Query("en", description="语言")):
     """获取分类列表 - 多语言架构版本"""
     try:
         # 标准化语言代码
         language = normalize_language_code(language)
+
+        if catalog_ready():
+            return api_response([format_category(row) for row in catalog_engine.list_categories(language)])
+
         pool = await get_db_connection()
         async with pool.acquire() as conn:
-            query = """
-                SELECT
-                    c.category_key,
-                    ct.category_name,
-                    ct.category_description,
-                    COUNT(t.id) as tool_count
-                FROM categories c
-                LEFT JOIN category_translations ct ON c.id = ct.category_id AND ct.language_code = $1
-                LEFT JOIN tools t ON c.id = t.category_id AND t.status = 'active'
-                GROUP BY c.id, c.category_key, ct.category_name, ct.category_description, c.sort_order
-                ORDER BY c.sort_order, tool_count DESC
-            """
-            rows = await conn.fetch(query, language)
-
-            categories = []
-            for row in rows:
-                categories.append({
-                    "id": row['category_key'],
-                    "name": row['category_name'] or row['category_key'],
-                    "slug": row['category_key'],
-                    "description": row['category_description'] or '',
-                    "count": row['tool_count']
-                })
+            categories = await fetch_categories(conn, language)
 
-            return APIResponse(data=categories)
+            return api_response(categories)
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取分类列表失败: {str(e)}")
 
+# 首页工具区块的排序, 与 catalog.TOP_SORT_KEYS 一致
+TOP_ORDER_CLAUSES = {
+    'created_at': "t.created_at DESC, t.id DESC",
+    'view_count': "t.view_count DESC, t.created_at DESC, t.id DESC",
+}
+
+def build_top_tools_query(language: str, featured_only: bool = False, order_by: Optional[str] = None) -> tuple:
+    """首页工具区块查询, 返回 (query, params)"""
+    from_where, params, _ = build_tools_filter(language, None, None, featured_only, None)
+    order_clause = TOP_ORDER_CLAUSES[order_by] if order_by else ORDER_BY_CLAUSE
+    query = f"SELECT {TOOL_LIST_COLUMNS} {from_where} ORDER BY {order_clause} LIMIT {HOMEPAGE_SECTION_LIMIT}"
+    return query, params
+
+async def fetch_top_tools(pool, language: str, featured_only: bool = False, order_by: Optional[str] = None) -> List[Dict]:
+    """首页工具区块: 在独立连接上查询, 带标签"""
+    query, params = build_top_tools_query(language, featured_only, order_by)
+    async with pool.acquire() as conn:
+        rows = await metrics.time_query('top_tools', conn.fetch(query, *params))
+        tools_tags = await fetch_tool_tag_keys(conn, [row['id'] for row in rows])
+    tools = []
+    for row in rows:
+        tool_data = dict(row)
+        tool_data['tags'] = tools_tags.get(row['id'], [])
+        tools.append(format_tool_response(tool_data, language))
+    return tools
+
+async def load_homepage_data(language: str) -> Dict[str, Any]:
+    """首页各区块: 内存目录可用时直接组装, 否则在独立连接上并发查询"""
+    if catalog_ready():
+        featured_ids, _ = catalog_engine.list_tool_ids(language, featured=True, limit=HOMEPAGE_SECTION_LIMIT)
+        return {
+            "categories": [format_category(row) for row in catalog_engine.list_categories(language)],
+            "featured_tools": catalog_tool_records(featured_ids, language),
+            "latest_tools": catalog_tool_records(catalog_engine.top_tool_ids('created_at', HOMEPAGE_SECTION_LIMIT), language),
+            "popular_tools": catalog_tool_records(catalog_engine.top_tool_ids('view_count', HOMEPAGE_SECTION_LIMIT), language),
+        }
+
+    pool = await get_db_connection()
+
+    async def load_categories():
+        async with pool.acquire() as conn:
+            return await fetch_categories(conn, language)
+
+    categories, featured_tools, latest_tools, popular_tools = await asyncio.gather(
+        load_categories(),
+        fetch_top_tools(pool, language, featured_only=True),
+        fetch_top_tools(pool, language, order_by='created_at'),
+        fetch_top_tools(pool, language, order_by='view_count'),
+    )
+    return {
+        "categories": categories,
+        "featured_tools": featured_tools,
+        "latest_tools": latest_tools,
+        "popular_tools": popular_tools,
+    }
+
+async def refresh_homepage_data(languages: Optional[List[str]] = None):
+    """预生成首页数据并写入缓存, 失败时保留旧数据"""
+    for language in languages or HOMEPAGE_LANGUAGES:
+        try:
+            # 先取版本再加载, 缓存的首页数据不会比所标记的版本旧
+            version, _ = await resolve_data_version()
+            data = await load_homepage_data(normalize_language_code(language))
+            homepage_cache.put('homepage', {'language': language}, api_response(data), version=version)
+        except Exception as e:
+            print(f"✗ 首页数据预生成失败 ({language}): {e}")
+
+async def homepage_refresh_loop():
+    """在TTL到期前刷新, 首页请求始终命中内存"""
+    while True:
+        await asyncio.sleep(max(1.0, HOMEPAGE_CACHE_TTL * 0.8))
+        await refresh_homepage_data()
+
+def on_homepage_catalog_update(tool_ids):
+    """目录变更后立即重新生成, 不等待TTL"""
+    asyncio.ensure_future(refresh_homepage_data())
+
+@app.get("/api/homepage-data")
+@homepage_cache.route("homepage")
+async def get_homepage_data(language: str = Query("en", description="语言")):
+    """批量获取首页数据: 分类、精选、最新、热门, 一次请求"""
+    try:
+        return api_response(await load_homepage_data(normalize_language_code(language)))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取首页数据失败: {str(e)}")
+
+def build_tags_query(
+    language: str,
+    type: Optional[str],
+    search: Optional[str],
+    limit: int,
+    popular: bool,
+) -> tuple:
+    """标签列表查询 (实时统计 tool_tags), 返回 (query, params)"""
+    params = []
+
+    if popular:
+        # 按使用频率排序
+        query = """
+            SELECT 
+                t.tag_key,
+                ttr.tag_name,
+                tt.tag_type,
+                COUNT(tt.tool_id) as usage_count
+            FROM tags t
+            JOIN tag_translations ttr ON t.id = ttr.tag_id AND ttr.language_code = $1
+            JOIN tool_tags tt ON t.id = tt.tag_id
+        """
+
+        where_conditions = []
+        params.append(language)
+        param_count = 1
+
+        # 标签类型过滤
+        if type and type in ['general', 'industry']:
+            param_count += 1
+            where_conditions.append(f"tt.tag_type = ${param_count}")
+            params.append(type)
+
+        # 搜索功能
+        if search:
+            param_count += 1
+            where_conditions.append(f"ttr.tag_name ILIKE ${param_count}")
+            params.append(f"%{search}%")
+
+        if where_conditions:
+            query += " WHERE " + " AND ".join(where_conditions)
+
+        query += f"""
+            GROUP BY t.tag_key, ttr.tag_name, tt.tag_type
+            ORDER BY usage_count DESC, ttr.tag_name ASC
+            LIMIT {limit}
+        """
+    else:
+        # 按字母顺序排序 - 获取所有标签（包括未使用的）
+        query = """
+            SELECT 
+                t.tag_key,
+                ttr.tag_name,
+                COALESCE(tag_stats.tag_type, 'general') as tag_type,
+                COALESCE(tag_stats.usage_count, 0) as usage_count
+            FROM tags t
+            JOIN tag_translations ttr ON t.id = ttr.tag_id AND ttr.language_code = $1
+            LEFT JOIN (
+                SELECT 
+                    tag_id,
+                    tag_type,
+                    COUNT(tool_id) as usage_count
+                FROM tool_tags
+                GROUP BY tag_id, tag_type
+            ) tag_stats ON t.id = tag_stats.tag_id
+        """
+
+        where_conditions = []
+        params.append(language)
+        param_count = 1
+
+        # 标签类型过滤
+        if type and type in ['general', 'industry']:
+            param_count += 1
+            where_conditions.append(f"tag_stats.tag_type = ${param_count}")
+            params.append(type)
+
+        # 搜索功能
+        if search:
+            param_count += 1
+            where_conditions.append(f"ttr.tag_name ILIKE ${param_count}")
+            params.append(f"%{search}%")
+
+        if where_conditions:
+            query += " WHERE " + " AND ".join(where_conditions)
+
+        query += f"""
+            ORDER BY ttr.tag_name ASC
+            LIMIT {limit}
+        """
+    return query, params
+
 @app.get("/api/tags")
+@response_cache.route("tags")
 async def get_tags(
     language: str = Query("en", description="语言"),
     type: Optional[str] = Query(None, description="标签类型过滤 (general/industry)"),
@@ -467,147 +1454,226 @@ async def get_tags(
     try:
         # 标准化语言代码
         language = normalize_language_code(language)
+
+        if catalog_ready():
+            rows = catalog_engine.list_tags(language, type=type, search=search, limit=limit, popular=popular)
+            return api_response([format_tag(row) for row in rows])
+
         pool = await get_db_connection()
         async with pool.acquire() as conn:
-            # 构建查询参数
-            params = []
-            param_count = 0
-
-            # 构建主查询
-            if popular:
-                # 按使用频率排序
-                query = """
-                    SELECT 
-                        t.tag_key,
-                        ttr.tag_name,
-                        tt.tag_type,
-                        COUNT(tt.tool_id) as usage_count
-                    FROM tags t
-                    JOIN tag_translations ttr ON t.id = ttr.tag_id AND ttr.language_code = $1
-                    JOIN tool_tags tt ON t.id = tt.tag_id
-                """
-                
-                where_conditions = []
-                params.append(language)
-                param_count = 1
-
-                # 标签类型过滤
-                if type and type in ['general', 'industry']:
-                    param_count += 1
-                    where_conditions.append(f"tt.tag_type = ${param_count}")
-                    params.append(type)
-
-                # 搜索功能
-                if search:
-                    param_count += 1
-                    where_conditions.append(f"ttr.tag_name ILIKE ${param_count}")
-                    params.append(f"%{search}%")
-
-                if where_conditions:
-                    query += " WHERE " + " AND ".join(where_conditions)
-
-                query += f"""
-                    GROUP BY t.tag_key, ttr.tag_name, tt.tag_type
-                    ORDER BY usage_count DESC, ttr.tag_name ASC
-                    LIMIT {limit}
-                """
+            if catalog_stats_enabled:
+                # 统计取自触发器维护的汇总表
+                query, params = build_tags_stats_query(language, type, search, limit, popular)
             else:
-                # 按字母顺序排序 - 获取所有标签（包括未使用的）
-                query = """
-                    SELECT 
-                        t.tag_key,
-                        ttr.tag_name,
-                        COALESCE(tag_stats.tag_type, 'general') as tag_type,
-                        COALESCE(tag_stats.usage_count, 0) as usage_count
-                    FROM tags t
-                    JOIN tag_translations ttr ON t.id = ttr.tag_id AND ttr.language_code = $1
-                    LEFT JOIN (
-                        SELECT 
-                            tag_id,
-                            tag_type,
-                            COUNT(tool_id) as usage_count
-                        FROM tool_tags
-                        GROUP BY tag_id, tag_type
-                    ) tag_stats ON t.id = tag_stats.tag_id
-                """
-                
-                where_conditions = []
-                params.append(language)
-                param_count = 1
-
-                # 标签类型过滤
-                if type and type in ['general', 'industry']:
-                    param_count += 1
-                    where_conditions.append(f"tag_stats.tag_type = ${param_count}")
-                    params.append(type)
-
-                # 搜索功能
-                if search:
-                    param_count += 1
-                    where_conditions.append(f"ttr.tag_name ILIKE ${param_count}")
-                    params.append(f"%{search}%")
-
-                if where_conditions:
-                    query += " WHERE " + " AND ".join(where_conditions)
-
-                query += f"""
-                    ORDER BY ttr.tag_name ASC
-                    LIMIT {limit}
-                """
-
-            rows = await conn.fetch(query, *params)
+                query, params = build_tags_query(language, type, search, limit, popular)
+
+            rows = await metrics.time_query('tags', conn.fetch(query, *params))
 
             # 格式化响应 - 匹配前端Category接口
-            tags = []
-            for row in rows:
-                tags.append({
-                    "id": row['tag_key'],       # 前端期望的id字段
-                    "name": row['tag_name'],
-                    "slug": row['tag_key'],     # 前端期望的slug字段
-                    "description": f"{row['tag_type']} tag",  # 可选的描述
-                    "count": int(row['usage_count'])  # 前端期望的count字段
-                })
+            tags = [format_tag(row) for row in rows]
 
-            return APIResponse(data=tags)
+            return api_response(tags)
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取标签列表失败: {str(e)}")
 
+# 联想索引不可用时的回退查询, 子串匹配 (与 /api/tools、/api/tags 的 search 一致)
+SUGGEST_FALLBACK_QUERIES = {
+    'tools': """
+        SELECT t.id, t.slug, tt.name, COALESCE(t.view_count, 0) as view_count
+        FROM tools t
+        JOIN tool_translations tt ON t.id = tt.tool_id AND tt.language_code = $1
+        WHERE t.status = 'active' AND (tt.name ILIKE $2 OR tt.title ILIKE $2)
+        ORDER BY view_count DESC, tt.name ASC
+        LIMIT $3
+    """,
+    'tags': """
+        SELECT t.tag_key, ttr.tag_name, COUNT(tg.tool_id) as usage_count
+        FROM tags t
+        JOIN tag_translations ttr ON t.id = ttr.tag_id AND ttr.language_code = $1
+        LEFT JOIN tool_tags tg ON t.id = tg.tag_id
+        WHERE ttr.tag_name ILIKE $2
+        GROUP BY t.tag_key, ttr.tag_name
+        ORDER BY usage_count DESC, ttr.tag_name ASC
+        LIMIT $3
+    """,
+}
+
+@app.get("/api/suggest")
+async def get_suggestions(
+    q: str = Query("", description="已输入的内容"),
+    language: str = Query("en", description="语言"),
+    type: Optional[str] = Query(None, description="只返回 tools 或 tags"),
+    limit: int = Query(8, ge=1, le=SUGGEST_MAX_LIMIT, description="每类返回数量")
+):
+    """搜索框/标签选择器的输入联想: 工具按浏览量、标签按使用次数排序"""
+    language = normalize_language_code(language)
+    kinds = (type,) if type in ('tools', 'tags') else ('tools', 'tags')
+    if not q.strip():
+        return api_response({kind: [] for kind in kinds})
+
+    if suggest_engine is not None and suggest_engine.ready:
+        result = suggest_engine.suggest(q, language, limit, kinds)
+        if result is not None:
+            return api_response(result)
+
+    try:
+        pool = await get_db_connection()
+        async with pool.acquire() as conn:
+            result = {}
+            for kind in kinds:
+                rows = await metrics.time_query(
+                    'suggest', conn.fetch(SUGGEST_FALLBACK_QUERIES[kind], language, f"%{q.strip()}%", limit)
+                )
+                result[kind] = [dict(row) for row in rows]
+        return api_response(result)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取联想结果失败: {str(e)}")
+
+@app.get("/api/cache/stats", dependencies=[Depends(require_admin)])
+async def get_cache_stats():
+    """响应缓存统计 (含首页预生成数据)"""
+    return APIResponse(data={**response_cache.stats(), "homepage": homepage_cache.stats()})
+
+@app.post("/api/cache/invalidate", dependencies=[Depends(require_admin)])
+async def invalidate_cache(
+    tool_id: Optional[str] = Query(None, description="按工具ID或slug失效"),
+    category: Optional[str] = Query(None, description="按分类key失效"),
+    all: bool = Query(False, description="清空全部缓存")
+):
+    """手动失效响应缓存"""
+    removed = 0
+    if all:
+        removed += response_cache.clear()
+    if tool_id:
+        if tool_id.isdigit():
+            removed += response_cache.invalidate_tool(int(tool_id))
+        # slug 也可能是纯数字, 两种标签都尝试
+        removed += response_cache.invalidate_tool_slug(tool_id)
+    if category:
+        removed += response_cache.invalidate_category(category)
+    return APIResponse(data={"removed": removed})
+
+@app.get("/api/db/slow-queries", dependencies=[Depends(require_admin)])
+async def get_slow_queries(
+    limit: int = Query(50, ge=1, le=1000, description="返回的指纹数"),
+    order_by: str = Query('total', description="排序: total / p99 / calls / slow"),
+):
+    """本进程按语句指纹的耗时统计和抓取到的执行计划"""
+    if not query_log.enabled:
+        raise HTTPException(status_code=404, detail="慢查询日志未启用 (SLOW_QUERY_LOG=true)")
+    if order_by not in REPORT_ORDERS:
+        raise HTTPException(status_code=400, detail=f"order_by 仅支持 {' / '.join(REPORT_ORDERS)}")
+    return APIResponse(data=query_log.report(limit, order_by))
+
+@app.post("/api/db/slow-queries/reset", dependencies=[Depends(require_admin)])
+async def reset_slow_queries():
+    """清空慢查询统计, 之后慢语句会重新抓取执行计划"""
+    return APIResponse(data={"removed": query_log.reset()})
+
+def on_image_manifest_change():
+    """截图变化后URL版本号随之变化, 丢弃含旧截图URL的格式化结果"""
+    if tool_records is not None and tool_records.ready:
+        tool_records.reset()
+    response_cache.clear()
+    asyncio.ensure_future(refresh_homepage_data())
+
+def image_not_modified(request: Request, etag: str, modified) -> bool:
+    """If-None-Match 优先, 没有时才比较 If-Modified-Since"""
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get('if-modified-since')
+    return bool(if_modified_since) and not_modified_since(if_modified_since, modified)
+
 @app.get("/api/images/{filename}")
-async def get_image(filename: str):
-    """提供图片文件服务"""
+async def get_image(
+    request: Request,
+    filename: str,
+    w: Optional[int] = Query(None, description="缩略图宽度, 取值见 IMAGE_WIDTHS"),
+    format: Optional[str] = Query(None, description="输出格式 (webp/jpeg)"),
+    v: Optional[str] = Query(None, description="内容版本号, 与当前文件一致时长期缓存")
+):
+    """提供图片文件服务, 指定 w 或 format 时返回缩放后的变体"""
     try:
-        # 从环境变量获取图片基础路径
-        base_path = os.getenv('FRONTEND_IMAGE_BASE_URL', '/Users/wingerliu/Downloads/startups/LookAiTools/crawler/screenshots')
-        
-        # 构建完整文件路径 - 添加toolify子目录
-        file_path = os.path.join(base_path, 'toolify', filename)
-        
-        # 添加调试日志
-        print(f"[DEBUG] 请求图片: {filename}")
-        print(f"[DEBUG] 基础路径: {base_path}")
-        print(f"[DEBUG] 完整路径: {file_path}")
-        print(f"[DEBUG] 文件存在: {os.path.exists(file_path)}")
-        
-        # 检查文件是否存在
-        if not os.path.exists(file_path):
-            print(f"[ERROR] 图片不存在: {file_path}")
-            raise HTTPException(status_code=404, detail="图片不存在")
+        if image_proxy is not None:
+            try:
+                entry = await image_proxy.get(filename)
+            except ImageNotFound:
+                raise HTTPException(status_code=404, detail="图片不存在")
+            except OriginThrottled as e:
+                raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+            except OriginError as e:
+                raise HTTPException(status_code=502, detail=f"图片源站不可用: {str(e)}")
+            return await serve_image_entry(request, entry, w, format, immutable=False)
 
-        # 返回文件
-        return FileResponse(
-            file_path,
-            media_type="image/jpeg",
-            headers={"Cache-Control": "public, max-age=3600"}
-        )
+        if image_manifest is None or not image_manifest.ready:
+            return await serve_image_without_manifest(filename, w, format)
+
+        # 只按清单查找, 未知文件名不访问文件系统
+        entry = image_manifest.get(filename)
+        if entry is None:
+            raise HTTPException(status_code=404, detail="图片不存在")
+        return await serve_image_entry(request, entry, w, format, immutable=(v == entry.version))
 
     except HTTPException:
         raise
     except Exception as e:
-        print(f"[ERROR] 获取图片异常: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"获取图片失败: {str(e)}")
+        print(f"✗ 获取图片异常: {str(e)}")
         raise HTTPException(status_code=500, detail=f"获取图片失败: {str(e)}")
 
+class VariantFileResponse(FileResponse):
+    """缩略图变体响应: 发送结束 (包括客户端断开) 后解除变体在磁盘缓存中的固定"""
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            image_variants.release(self.path)
+
+async def serve_image_entry(request: Request, entry, w: Optional[int], format: Optional[str], immutable: bool):
+    """清单或代理缓存中的文件: ETag/Last-Modified 校验, 需要时返回缩略图变体"""
+    variant = None
+    etag = entry.etag
+    if (w is not None or format is not None) and THUMBNAILS_AVAILABLE:
+        try:
+            variant = image_variants.parse(w, format)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        etag = f'"{entry.digest[:32]}-{variant[0]}-{variant[1]}"'
+
+    headers = {
+        "ETag": etag,
+        "Last-Modified": entry.last_modified,
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL if immutable else DEFAULT_CACHE_CONTROL,
+    }
+    if image_not_modified(request, etag, entry.modified):
+        return Response(status_code=304, headers=headers)
+
+    if variant is not None:
+        variant_path, media_type = await image_variants.get(entry.path, *variant, digest=entry.digest)
+        return VariantFileResponse(variant_path, media_type=media_type, headers=headers)
+    # Range / If-Range 由 FileResponse 处理; 清单中的文件直接使用已有的 stat 结果
+    return FileResponse(entry.path, media_type=entry.media_type, headers=headers, stat_result=entry.stat)
+
+async def serve_image_without_manifest(filename: str, w: Optional[int], format: Optional[str]):
+    """清单不可用 (加载中或失败) 时直接读取截图目录"""
+    if os.path.basename(filename) != filename or filename.startswith('.'):
+        raise HTTPException(status_code=404, detail="图片不存在")
+    file_path = os.path.join(settings.image_base_url, 'toolify', filename)
+    if not os.path.isfile(file_path):
+        raise HTTPException(status_code=404, detail="图片不存在")
+
+    if (w is not None or format is not None) and THUMBNAILS_AVAILABLE:
+        try:
+            width, image_format = image_variants.parse(w, format)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        variant_path, media_type = await image_variants.get(file_path, width, image_format)
+        return VariantFileResponse(variant_path, media_type=media_type, headers={"Cache-Control": DEFAULT_CACHE_CONTROL})
+
+    return FileResponse(file_path, media_type="image/jpeg", headers={"Cache-Control": DEFAULT_CACHE_CONTROL})
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
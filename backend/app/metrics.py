@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Prometheus 文本格式的运行指标 (/metrics)
+- 请求: 按路由模板、方法、状态码的耗时直方图, 按路由的响应体大小直方图
+- 数据库: 按查询名的耗时直方图, 连接池大小/空闲/获取连接等待 (抓取时从连接池读取)
+热点路径只做一次二分和几次整数累加, 不加锁: 观测都在事件循环线程内完成, 抓取时才拼接文本
+METRICS_ENABLED=false 时不记录, /metrics 返回 404
+"""
+
+import os
+import time
+from bisect import bisect_left
+from typing import Optional, List, Dict, Tuple, Callable, Iterable
+
+from starlette.routing import Match
+
+# 请求/查询耗时的桶上界 (秒)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# 响应体大小的桶上界 (字节)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# 未匹配到路由的请求统一记为该值, 避免按原始路径产生无限多的标签组合
+UNMATCHED_ROUTE = 'unmatched'
+
+INF_BUCKET = 'le="+Inf"'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_number(value) -> str:
+    if isinstance(value, float):
+        if value == float('inf'):
+            return '+Inf'
+        return str(int(value)) if value.is_integer() else repr(value)
+    return str(value)
+
+
+class Histogram:
+    """单个标签组合的直方图; counts 最后一格为超出所有上界的观测"""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class HistogramFamily:
+    """按标签值分组的直方图, 标签组合首次出现时创建"""
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...], buckets: Tuple[float, ...]):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.buckets = buckets
+        self.children: Dict[Tuple, Histogram] = {}
+
+    def labels(self, *values) -> Histogram:
+        child = self.children.get(values)
+        if child is None:
+            child = self.children[values] = Histogram(self.buckets)
+        return child
+
+    def observe(self, value: float, *label_values):
+        self.labels(*label_values).observe(value)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for values, child in list(self.children.items()):
+            lines.extend(render_histogram(
+                self.name, self.label_names, values, child.buckets, child.counts, child.sum, child.count
+            ))
+        return lines
+
+
+def render_histogram(name: str, label_names: Tuple[str, ...], values: Tuple, buckets: Iterable[float],
+                     counts: List[int], total: float, count: int) -> List[str]:
+    """一个标签组合的 _bucket (累计) / _sum / _count 行; counts 为各桶的非累计次数"""
+    lines = []
+    cumulative = 0
+    for bound, bucket_count in zip(buckets, counts):
+        cumulative += bucket_count
+        labels = _format_labels(label_names, values, f'le="{_format_number(float(bound))}"')
+        lines.append(f"{name}_bucket{labels} {cumulative}")
+    lines.append(f"{name}_bucket{_format_labels(label_names, values, INF_BUCKET)} {count}")
+    lines.append(f"{name}_sum{_format_labels(label_names, values)} {_format_number(float(total))}")
+    lines.append(f"{name}_count{_format_labels(label_names, values)} {count}")
+    return lines
+
+
+def render_gauge(name: str, documentation: str, label_names: Tuple[str, ...],
+                 samples: List[Tuple[Tuple, float]], metric_type: str = 'gauge') -> List[str]:
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} {metric_type}"]
+    for values, value in samples:
+        lines.append(f"{name}{_format_labels(label_names, values)} {_format_number(value)}")
+    return lines
+
+
+def route_label(scope: Dict, routes: Iterable = ()) -> str:
+    """请求匹配到的路由模板 (如 /api/tools/{tool_identifier}), 未匹配时为 UNMATCHED_ROUTE
+    中间件直接返回的响应 (如304) 没有经过路由, 此时按 routes 重新匹配一次
+    """
+    route = scope.get('route')
+    if route is None:
+        route = next((r for r in routes if r.matches(scope)[0] == Match.FULL), None)
+    return getattr(route, 'path', None) or UNMATCHED_ROUTE
+
+
+class Metrics:
+    """进程内指标; 多 worker 部署时每个 worker 各自暴露, 由抓取端按实例聚合"""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.started_at = time.time()
+        self.requests = HistogramFamily(
+            'http_request_duration_seconds', '请求耗时 (到响应头发出), 按路由模板、方法和状态码',
+            ('route', 'method', 'status'), LATENCY_BUCKETS,
+        )
+        self.response_sizes = HistogramFamily(
+            'http_response_size_bytes', '响应体大小 (有 Content-Length 的响应), 按路由模板和方法',
+            ('route', 'method'), SIZE_BUCKETS,
+        )
+        self.queries = HistogramFamily(
+            'db_query_duration_seconds', '数据库查询耗时, 按查询名',
+            ('query',), LATENCY_BUCKETS,
+        )
+        self.in_flight = 0
+        self._collectors: List[Callable[[], List[str]]] = []
+
+    @classmethod
+    def from_env(cls) -> 'Metrics':
+        return cls(enabled=os.getenv('METRICS_ENABLED', 'true').lower() == 'true')
+
+    def add_collector(self, collector: Callable[[], List[str]]):
+        """注册抓取时调用的采集函数, 返回指标文本行"""
+        self._collectors.append(collector)
+
+    async def time_query(self, name: str, awaitable):
+        """等待查询并记录耗时: rows = await metrics.time_query('list', conn.fetch(...))"""
+        if not self.enabled:
+            return await awaitable
+        started = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            self.queries.observe(time.perf_counter() - started, name)
+
+    def observe_request(self, route: str, method: str, status: int, seconds: float,
+                        content_length: Optional[str] = None):
+        self.requests.observe(seconds, route, method, status)
+        if content_length is not None and content_length.isdigit():
+            self.response_sizes.observe(int(content_length), route, method)
+
+    def render(self) -> str:
+        lines = render_gauge(
+            'process_start_time_seconds', '进程启动时间 (Unix 时间戳)', (), [((), self.started_at)]
+        )
+        lines += render_gauge('http_requests_in_flight', '正在处理的请求数', (), [((), self.in_flight)])
+        for family in (self.requests, self.response_sizes, self.queries):
+            lines += family.render()
+        for collector in self._collectors:
+            try:
+                lines += collector()
+            except Exception as e:
+                print(f"✗ 指标采集失败: {e}")
+        return '\n'.join(lines) + '\n'
+
+
+def pool_metrics(databases: Callable[[], List]) -> Callable[[], List[str]]:
+    """连接池指标采集函数; databases() 返回 database.Database 列表 (主库和各副本)"""
+
+    def collect() -> List[str]:
+        size, idle, max_size, timeouts = [], [], [], []
+        wait_lines = [
+            "# HELP db_pool_acquire_wait_seconds 从连接池获取连接的等待时间",
+            "# TYPE db_pool_acquire_wait_seconds histogram",
+        ]
+        for database in databases():
+            labels = (database.name,)
+            max_size.append((labels, database.max_size))
+            if database.pool is not None:
+                size.append((labels, database.pool.get_size()))
+                idle.append((labels, database.pool.get_idle_size()))
+            wait = database.wait_stats
+            timeouts.append((labels, wait.timeouts))
+            # 超出最大上界的等待只计入 +Inf
+            wait_lines += render_histogram(
+                'db_pool_acquire_wait_seconds', ('pool',), labels,
+                wait.buckets, wait.bucket_counts, wait.total_seconds, wait.count,
+            )
+        lines = render_gauge('db_pool_connections', '连接池当前连接数', ('pool',), size)
+        lines += render_gauge('db_pool_idle_connections', '连接池空闲连接数', ('pool',), idle)
+        lines += render_gauge('db_pool_max_connections', '连接池最大连接数', ('pool',), max_size)
+        lines += wait_lines
+        lines += render_gauge(
+            'db_pool_acquire_timeouts_total', '获取连接超时次数', ('pool',), timeouts, metric_type='counter'
+        )
+        return lines
+
+    return collect
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+游标(keyset)分页工具
+游标编码最后一行的排序元组 (featured, rating, view_count, created_at, id)，
+下一页用行值比较直接定位，避免 OFFSET 随页数线性变慢。
+排序与定位都作用在 COALESCE 后的表达式上 (NULL 视为 false/0/0/-infinity),
+否则行值比较遇到 NULL 结果为 NULL, 含空值的行会被跳过
+"""
+
+import json
+import math
+import base64
+from datetime import datetime
+from decimal import Decimal
+from typing import Optional, Dict, Tuple, Any
+
+# 列表默认排序列, id 作为唯一的最终排序键
+SORT_COLUMNS = ('featured', 'rating', 'view_count', 'created_at', 'id')
+
+# 与 sql/002_tools_listing_index.sql 的表达式索引一致
+SORT_EXPRESSIONS = (
+    "COALESCE(t.featured, false)",
+    "COALESCE(t.rating, 0)",
+    "COALESCE(t.view_count, 0)",
+    "COALESCE(t.created_at, '-infinity')",
+    "t.id",
+)
+
+# 空值的替代值, asyncpg 把 datetime.min 编码为 -infinity
+SORT_DEFAULTS = (False, 0, 0, datetime.min, None)
+
+ORDER_BY_CLAUSE = ", ".join(f"{expr} DESC" for expr in SORT_EXPRESSIONS)
+
+SEEK_COLUMNS = f"({', '.join(SORT_EXPRESSIONS)})"
+
+
+class InvalidCursor(ValueError):
+    """游标无法解析"""
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, Decimal):
+        return {"dec": str(value)}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        try:
+            if "dt" in value:
+                return datetime.fromisoformat(value["dt"])
+            if "dec" in value:
+                result = Decimal(value["dec"])
+                if result.is_finite():
+                    return result
+        except (TypeError, ValueError, ArithmeticError):
+            pass
+        raise InvalidCursor("未知的游标字段类型")
+    return value
+
+
+def _is_int(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+# 每个排序列允许的值类型 (None 在解码时替换为 SORT_DEFAULTS)
+_VALUE_CHECKS = (
+    lambda v: isinstance(v, bool),
+    lambda v: _is_int(v) or isinstance(v, Decimal) or (isinstance(v, float) and math.isfinite(v)),
+    _is_int,
+    lambda v: isinstance(v, datetime),
+    _is_int,
+)
+
+
+def sort_tuple(row: Dict) -> Tuple:
+    """取出一行的排序元组, 空值替换为与 ORDER BY 相同的 COALESCE 值"""
+    return tuple(
+        default if row.get(col) is None else row.get(col)
+        for col, default in zip(SORT_COLUMNS, SORT_DEFAULTS)
+    )
+
+
+def encode_cursor(row: Dict) -> str:
+    """把行的排序元组编码为不透明游标"""
+    payload = json.dumps([_encode_value(v) for v in sort_tuple(row)], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Optional[Tuple]:
+    """解析游标, 空游标表示第一页"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f"游标格式错误: {e}")
+    if not isinstance(values, list) or len(values) != len(SORT_COLUMNS):
+        raise InvalidCursor("游标字段数量不匹配")
+    decoded = []
+    for column, value, default, check in zip(SORT_COLUMNS, values, SORT_DEFAULTS, _VALUE_CHECKS):
+        value = _decode_value(value)
+        if value is None and default is not None:
+            value = default
+        if not check(value):
+            raise InvalidCursor(f"游标字段类型错误: {column}")
+        decoded.append(value)
+    return tuple(decoded)
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+慢查询日志 (SLOW_QUERY_LOG=true)
+列表、标签等接口按筛选条件动态拼接SQL, 同一接口会产生多种语句形态; 这里按语句指纹分别统计:
+- 连接池的每个新连接通过 asyncpg 的公开接口 Connection.add_query_logger 注册回调,
+  经 fetch/fetchrow/fetchval/execute/executemany 的语句都会被记录
+  (事务控制语句、asyncpg 内部的类型查询和连接重置、服务端游标、预热时的语句准备不计入)
+- 指纹 = 规范化后的SQL (字面量替换为 ?, 空白合并) + 参数类型, LIMIT 12 与 LIMIT 20 归为同一指纹
+- 每个指纹记录调用次数、总耗时、最近 SLOW_QUERY_SAMPLES 次耗时的 p50/p95/p99
+- 单次耗时超过阈值时, 在后台另取连接抓取一次执行计划 (每个指纹只抓一次):
+  只读语句用 EXPLAIN (ANALYZE, BUFFERS), 写语句只 EXPLAIN 不执行; 均在回滚的事务内并限制语句超时
+
+    SLOW_QUERY_LOG                  true 时启用 (默认关闭)
+    SLOW_QUERY_MS                   慢查询阈值毫秒 (默认 200)
+    SLOW_QUERY_SAMPLES              每个指纹保留多少次最近耗时用于计算分位数 (默认 1000)
+    SLOW_QUERY_MAX_FINGERPRINTS     最多跟踪的指纹数, 超出后新指纹合并计入 "other" (默认 1000)
+    SLOW_QUERY_EXPLAIN              false 时不抓取执行计划 (默认 true)
+    SLOW_QUERY_EXPLAIN_TIMEOUT      抓取执行计划的超时秒数 (默认 10)
+
+报告通过管理接口 GET /api/db/slow-queries 查看 (每个 worker 各自统计), 或用命令行导出:
+    python backend/app/query_log.py report --url http://localhost:8000 --limit 20 --plans
+"""
+
+import os
+import re
+import sys
+import json
+import math
+import time
+import asyncio
+import hashlib
+import argparse
+import contextvars
+from collections import deque
+from typing import Optional, List, Dict, Tuple, Any
+
+# 单引号字符串和独立的数字字面量 ($1 这类参数占位符不替换)
+_LITERAL = re.compile(r"'(?:[^']|'')*'|(?<![\w$.])\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+_WRITE_KEYWORDS = re.compile(r"\b(insert|update|delete|merge|truncate|create|drop|alter)\b", re.IGNORECASE)
+# 不计入的语句: conn.transaction() 的事务控制, 以及 asyncpg 自身的类型查询、jit 设置和归还连接时的重置
+_SKIPPED_QUERY = re.compile(
+    r"\s*(?:(?:begin|start transaction|commit|rollback|savepoint|release)\b"
+    r"|with recursive typeinfo_tree\b|select pg_advisory_unlock_all\(\)|select\s+(?:current_setting|set_config)\('jit')",
+    re.IGNORECASE,
+)
+
+# 超出指纹上限后新语句合并到这个指纹
+OVERFLOW_FINGERPRINT = 'other'
+
+REPORT_ORDERS = ('total', 'p99', 'calls', 'slow')
+
+# 抓取执行计划的任务内不再记录 (避免 EXPLAIN 本身被记录或再次触发抓取)
+_explaining: contextvars.ContextVar[bool] = contextvars.ContextVar('query_log_explaining', default=False)
+
+
+def normalize_sql(query: str) -> str:
+    """字面量替换为 ?, 空白合并为单个空格"""
+    return _WHITESPACE.sub(' ', _LITERAL.sub('?', query)).strip()
+
+
+def fingerprint(normalized: str, param_types: Tuple[str, ...]) -> str:
+    return hashlib.sha1(f"{normalized}|{','.join(param_types)}".encode('utf-8')).hexdigest()[:16]
+
+
+def is_read_only(query: str) -> bool:
+    """只读语句才允许 EXPLAIN ANALYZE (ANALYZE 会真正执行语句)"""
+    head = query.lstrip().lower()
+    return head.startswith(('select', 'with', 'values')) and not _WRITE_KEYWORDS.search(query)
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    """最近秩分位数, ordered 需已排序"""
+    if not ordered:
+        return 0.0
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+class QueryStats:
+    """一个指纹的累计统计和执行计划"""
+
+    __slots__ = (
+        'fingerprint', 'query', 'param_types', 'database', 'calls', 'errors', 'total_seconds', 'max_seconds',
+        'samples', 'slow_calls', 'last_slow_at', 'explain_state', 'explain',
+    )
+
+    def __init__(self, fingerprint: str, query: str, param_types: Tuple[str, ...], database: str, samples: int):
+        self.fingerprint = fingerprint
+        self.query = query
+        self.param_types = param_types
+        self.database = database
+        self.calls = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.samples: deque = deque(maxlen=samples)
+        self.slow_calls = 0
+        self.last_slow_at: Optional[float] = None
+        # None: 未抓取; pending: 抓取中; done / failed
+        self.explain_state: Optional[str] = None
+        self.explain: Optional[Dict[str, Any]] = None
+
+    def observe(self, seconds: float, failed: bool):
+        self.calls += 1
+        self.total_seconds += seconds
+        if seconds > self.max_seconds:
+            self.max_seconds = seconds
+        self.samples.append(seconds)
+        if failed:
+            self.errors += 1
+
+    def report(self) -> Dict[str, Any]:
+        ordered = sorted(self.samples)
+        return {
+            "fingerprint": self.fingerprint,
+            "query": self.query,
+            "param_types": list(self.param_types),
+            "database": self.database,
+            "calls": self.calls,
+            "errors": self.errors,
+            "total_ms": round(self.total_seconds * 1000, 3),
+            "mean_ms": round(self.total_seconds / self.calls * 1000, 3) if self.calls else 0.0,
+            "p50_ms": round(percentile(ordered, 0.50) * 1000, 3),
+            "p95_ms": round(percentile(ordered, 0.95) * 1000, 3),
+            "p99_ms": round(percentile(ordered, 0.99) * 1000, 3),
+            "max_ms": round(self.max_seconds * 1000, 3),
+            "slow_calls": self.slow_calls,
+            "last_slow_at": self.last_slow_at,
+            "explain_state": self.explain_state,
+            "explain": self.explain,
+        }
+
+
+class QueryLog:
+    """按语句指纹统计耗时, 超过阈值时后台抓取执行计划"""
+
+    def __init__(self, enabled: bool = False, threshold_ms: float = 200.0, samples: int = 1000,
+                 max_fingerprints: int = 1000, explain: bool = True, explain_timeout: float = 10.0):
+        self.enabled = enabled
+        self.threshold_seconds = threshold_ms / 1000
+        self.samples = samples
+        self.max_fingerprints = max_fingerprints
+        self.explain_enabled = explain
+        self.explain_timeout = explain_timeout
+        self.started_at = time.time()
+        self.fingerprints: Dict[str, QueryStats] = {}
+        # (原始语句文本, 参数类型) -> 统计, 同一文本只规范化一次
+        self._by_text: Dict[Tuple[str, Tuple[str, ...]], QueryStats] = {}
+        self._explain_tasks: set = set()
+
+    @classmethod
+    def from_env(cls) -> 'QueryLog':
+        return cls(
+            enabled=os.getenv('SLOW_QUERY_LOG', 'false').lower() == 'true',
+            threshold_ms=float(os.getenv('SLOW_QUERY_MS', '200')),
+            samples=int(os.getenv('SLOW_QUERY_SAMPLES', '1000')),
+            max_fingerprints=int(os.getenv('SLOW_QUERY_MAX_FINGERPRINTS', '1000')),
+            explain=os.getenv('SLOW_QUERY_EXPLAIN', 'true').lower() == 'true',
+            explain_timeout=float(os.getenv('SLOW_QUERY_EXPLAIN_TIMEOUT', '10')),
+        )
+
+    def attach(self, conn, database):
+        """在 database.Database 连接池的新连接上注册查询回调 (连接的 init 钩子中调用)"""
+        if self.enabled:
+            conn.add_query_logger(lambda logged: self._on_query(logged, database))
+
+    def _on_query(self, logged, database):
+        """asyncpg 在语句结束后通过 loop.call_soon 调用, 上下文沿用执行语句的任务"""
+        if _explaining.get() or _SKIPPED_QUERY.match(logged.query):
+            return
+        failed = logged.exception is not None
+        if isinstance(logged.args, tuple):
+            self.record(logged.query, logged.args, logged.elapsed, failed, database)
+        else:
+            # executemany 的参数是多组参数的序列, 批量参数不参与执行计划抓取
+            self.record(logged.query, (), logged.elapsed, failed, None)
+
+    def _stats_for(self, query: str, args, database) -> QueryStats:
+        param_types = tuple(type(arg).__name__ for arg in args)
+        key = (query, param_types)
+        stats = self._by_text.get(key)
+        if stats is not None:
+            return stats
+        normalized = normalize_sql(query)
+        fp = fingerprint(normalized, param_types)
+        stats = self.fingerprints.get(fp)
+        if stats is None:
+            if len(self.fingerprints) >= self.max_fingerprints:
+                fp, normalized, param_types = OVERFLOW_FINGERPRINT, OVERFLOW_FINGERPRINT, ()
+                stats = self.fingerprints.get(fp)
+            if stats is None:
+                database_name = database.name if database is not None else None
+                stats = self.fingerprints[fp] = QueryStats(fp, normalized, param_types, database_name, self.samples)
+        # 原始文本种类 (如 LIMIT 取值) 过多时整体清空, 之后重新规范化
+        if len(self._by_text) >= self.max_fingerprints * 4:
+            self._by_text.clear()
+        self._by_text[key] = stats
+        return stats
+
+    def record(self, query: str, args, seconds: float, failed: bool, database):
+        stats = self._stats_for(query, args, database)
+        stats.observe(seconds, failed)
+        if seconds < self.threshold_seconds:
+            return
+        stats.slow_calls += 1
+        stats.last_slow_at = time.time()
+        if (self.explain_enabled and database is not None and stats.explain_state is None
+                and stats.fingerprint != OVERFLOW_FINGERPRINT):
+            stats.explain_state = 'pending'
+            task = asyncio.ensure_future(self._explain(stats, query, list(args), database, seconds))
+            self._explain_tasks.add(task)
+            task.add_done_callback(self._explain_tasks.discard)
+
+    async def _explain(self, stats: QueryStats, query: str, args: List, database, seconds: float):
+        """另取连接抓取执行计划; 事务最后回滚"""
+        _explaining.set(True)
+        analyze = is_read_only(query)
+        options = "ANALYZE, BUFFERS" if analyze else "COSTS"
+        try:
+            pool = await database.get()
+            async with pool.acquire(timeout=self.explain_timeout) as conn:
+                transaction = conn.transaction()
+                await transaction.start()
+                try:
+                    await conn.execute(f"SET LOCAL statement_timeout = {int(self.explain_timeout * 1000)}")
+                    rows = await conn.fetch(f"EXPLAIN ({options}) {query}", *args)
+                finally:
+                    await transaction.rollback()
+            stats.explain = {
+                "analyze": analyze,
+                "captured_at": time.time(),
+                "trigger_ms": round(seconds * 1000, 3),
+                "plan": "\n".join(row[0] for row in rows),
+            }
+            stats.explain_state = 'done'
+            print(f"✓ 慢查询执行计划已抓取 [{stats.fingerprint}] ({seconds * 1000:.0f}ms)")
+        except Exception as e:
+            stats.explain = {"error": str(e), "captured_at": time.time(), "trigger_ms": round(seconds * 1000, 3)}
+            stats.explain_state = 'failed'
+            print(f"✗ 慢查询执行计划抓取失败 [{stats.fingerprint}]: {e}")
+
+    def report(self, limit: int = 50, order_by: str = 'total') -> Dict[str, Any]:
+        rows = [stats.report() for stats in list(self.fingerprints.values())]
+        sort_key = {
+            'total': lambda r: r['total_ms'],
+            'p99': lambda r: r['p99_ms'],
+            'calls': lambda r: r['calls'],
+            'slow': lambda r: (r['slow_calls'], r['total_ms']),
+        }[order_by]
+        rows.sort(key=sort_key, reverse=True)
+        return {
+            "pid": os.getpid(),
+            "enabled": self.enabled,
+            "threshold_ms": self.threshold_seconds * 1000,
+            "since": self.started_at,
+            "fingerprint_count": len(self.fingerprints),
+            "queries": rows[:limit],
+        }
+
+    def reset(self) -> int:
+        removed = len(self.fingerprints)
+        self.fingerprints.clear()
+        self._by_text.clear()
+        self.started_at = time.time()
+        return removed
+
+
+# ---- 命令行: 从运行中的服务导出报告 ----
+
+def format_report(report: Dict[str, Any], plans: bool = False) -> str:
+    lines = [
+        f"进程 {report['pid']}, 阈值 {report['threshold_ms']:g}ms, 共 {report['fingerprint_count']} 个指纹",
+        f"{'指纹':<16} {'次数':>8} {'p50ms':>9} {'p95ms':>9} {'p99ms':>9} {'maxms':>9} {'慢':>6}  语句",
+    ]
+    for row in report['queries']:
+        query = row['query'] if len(row['query']) <= 120 else row['query'][:117] + '...'
+        lines.append(
+            f"{row['fingerprint']:<16} {row['calls']:>8} {row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} "
+            f"{row['p99_ms']:>9.2f} {row['max_ms']:>9.2f} {row['slow_calls']:>6}  {query}"
+        )
+        if row['param_types']:
+            lines.append(f"{'':<16} 参数类型: {', '.join(row['param_types'])}")
+        explain = row.get('explain')
+        if plans and explain:
+            if 'plan' in explain:
+                kind = "EXPLAIN (ANALYZE, BUFFERS)" if explain['analyze'] else "EXPLAIN"
+                lines.append(f"{'':<16} {kind}, 触发耗时 {explain['trigger_ms']}ms:")
+                lines.extend(f"{'':<18}{line}" for line in explain['plan'].splitlines())
+            else:
+                lines.append(f"{'':<16} 执行计划抓取失败: {explain['error']}")
+    return "\n".join(lines)
+
+
+def main():
+    from urllib.request import Request, urlopen
+    from urllib.parse import urlencode
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="慢查询日志")
+    sub = parser.add_subparsers(dest='command', required=True)
+    report = sub.add_parser('report', help="从运行中的服务导出慢查询报告")
+    report.add_argument('--url', default=os.getenv('API_BASE_URL', 'http://localhost:8000'))
+    report.add_argument('--token', default=os.getenv('ADMIN_TOKEN'), help="管理接口令牌, 默认 ADMIN_TOKEN")
+    report.add_argument('--limit', type=int, default=20)
+    report.add_argument('--order-by', default='total', choices=REPORT_ORDERS)
+    report.add_argument('--plans', action='store_true', help="同时输出抓取到的执行计划")
+    report.add_argument('--json', action='store_true', help="输出原始 JSON")
+    args = parser.parse_args()
+
+    query = urlencode({'limit': args.limit, 'order_by': args.order_by})
+    request = Request(f"{args.url.rstrip('/')}/api/db/slow-queries?{query}",
+                      headers={'X-Admin-Token': args.token or ''})
+    try:
+        with urlopen(request, timeout=30) as response:
+            payload = json.load(response)
+    except Exception as e:
+        raise SystemExit(f"✗ 获取慢查询报告失败: {e}")
+
+    data = payload['data']
+    if args.json:
+        json.dump(data, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    else:
+        print(format_report(data, plans=args.plans))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""
+基于标签相似度的相关工具
+- 每个工具是一个稀疏的标签权重向量 (通用标签与行业标签权重不同)
+- 相似度为加权 Jaccard: Σmin(wa, wb) / Σmax(wa, wb), 交集部分通过 标签 -> 工具 倒排表
+  按行计算 (即稀疏的 工具×标签 矩阵与其转置相乘), 只访问共享标签的工具
+- 总分 = Jaccard + 同分类加分 + 热度 (view_count 取对数归一化)
+- 每个工具预先保存前 K 个邻居, 接口只做一次字典查找
+目录全量刷新时在线程池中重建; 局部更新只重算变更工具, 以及列表中含有它或可能新收录它的工具
+
+全量构建在安装了 numpy / scipy 时向量化执行: 权重只有少数几档, Σmin(wa, wb) 按档位分层
+(min(a, b) = Σ 档差 × [a ≥ 档位][b ≥ 档位]) 写成若干个 0/1 稀疏矩阵与其转置的乘积之和;
+未安装时按倒排表逐行计算, 结果相同。局部更新总是逐行计算。
+"""
+
+import os
+import math
+import heapq
+import asyncio
+from typing import Optional, List, Dict, Set, Tuple
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:  # 可选依赖
+    np = None
+    sparse = None
+
+SPARSE_AVAILABLE = sparse is not None
+
+
+class RelatedIndex:
+    """相关工具的邻居表及其所需的稀疏向量, 构建后可增量更新"""
+
+    def __init__(
+        self,
+        top_k: int = 12,
+        general_weight: float = 1.0,
+        industry_weight: float = 0.6,
+        category_bonus: float = 0.15,
+        popularity_weight: float = 0.1,
+        max_tag_df: int = 500,
+    ):
+        self.top_k = top_k
+        self.tag_weights = {'general': general_weight, 'industry': industry_weight}
+        self.category_bonus = category_bonus
+        self.popularity_weight = popularity_weight
+        # 出现在太多工具上的标签不用于生成候选 (否则接近全表两两比较), 只在打分时计入
+        self.max_tag_df = max_tag_df
+
+        self.vectors: Dict[int, Dict[int, float]] = {}     # tool_id -> {tag_id: 权重}
+        self.norms: Dict[int, float] = {}                  # tool_id -> 权重和
+        self.postings: Dict[int, Dict[int, float]] = {}    # tag_id -> {tool_id: 权重}, 即矩阵的列
+        self.categories: Dict[int, Optional[int]] = {}     # tool_id -> category_id
+        self.popularity: Dict[int, float] = {}             # tool_id -> [0, 1]
+        self.by_category: Dict[Optional[int], List[int]] = {}  # 分类内按热度降序, 用于补足候选
+        self.neighbors: Dict[int, List[Tuple[float, int]]] = {}
+        self.listed_by: Dict[int, Set[int]] = {}           # tool_id -> 邻居表中含有它的工具
+        self.max_views_log = 1.0
+
+    # ---- 向量 ----
+
+    def _vector(self, snapshot, tool_id: int) -> Dict[int, float]:
+        vector: Dict[int, float] = {}
+        for tag_id, tag_type in snapshot.tool_tags.get(tool_id, ()):
+            weight = self.tag_weights.get(tag_type, self.tag_weights['general'])
+            # 同一标签同时以两种类型出现时取较大权重
+            if weight > vector.get(tag_id, 0.0):
+                vector[tag_id] = weight
+        return vector
+
+    def _add_tool(self, snapshot, tool_id: int):
+        tool = snapshot.tools[tool_id]
+        vector = self._vector(snapshot, tool_id)
+        self.vectors[tool_id] = vector
+        self.norms[tool_id] = sum(vector.values())
+        for tag_id, weight in vector.items():
+            self.postings.setdefault(tag_id, {})[tool_id] = weight
+        self.categories[tool_id] = tool.get('category_id')
+        views_log = math.log1p(int(tool.get('view_count') or 0))
+        self.popularity[tool_id] = min(1.0, views_log / self.max_views_log)
+
+    def _remove_tool(self, tool_id: int):
+        for tag_id in self.vectors.pop(tool_id, {}):
+            tools = self.postings.get(tag_id)
+            if tools is not None:
+                tools.pop(tool_id, None)
+                if not tools:
+                    del self.postings[tag_id]
+        self.norms.pop(tool_id, None)
+        self.popularity.pop(tool_id, None)
+        category_id = self.categories.pop(tool_id, None)
+        members = self.by_category.get(category_id)
+        if members is not None and tool_id in members:
+            members.remove(tool_id)
+        self._set_neighbors(tool_id, [])
+        self.neighbors.pop(tool_id, None)
+
+    def _sort_category(self, category_id):
+        self.by_category[category_id] = sorted(
+            (tool_id for tool_id, cat in self.categories.items() if cat == category_id),
+            key=lambda tool_id: (-self.popularity[tool_id], tool_id),
+        )
+
+    # ---- 打分 ----
+
+    def _score(self, tool_id: int, other_id: int, intersection: float) -> float:
+        union = self.norms[tool_id] + self.norms[other_id] - intersection
+        score = intersection / union if union > 0 else 0.0
+        category_id = self.categories.get(tool_id)
+        if category_id is not None and category_id == self.categories.get(other_id):
+            score += self.category_bonus
+        return score + self.popularity_weight * self.popularity[other_id]
+
+    def _intersection(self, vector: Dict[int, float], other_id: int) -> float:
+        other = self.vectors[other_id]
+        if len(other) < len(vector):
+            vector, other = other, vector
+        return sum(min(weight, other[tag_id]) for tag_id, weight in vector.items() if tag_id in other)
+
+    def score_pair(self, tool_id: int, other_id: int) -> float:
+        return self._score(tool_id, other_id, self._intersection(self.vectors[tool_id], other_id))
+
+    def _category_candidates(self, tool_id: int) -> List[int]:
+        """同分类最热门的 K+1 个工具 (可能包含自身)"""
+        return self.by_category.get(self.categories.get(tool_id), ())[:self.top_k + 1]
+
+    def _compute(self, tool_id: int) -> List[Tuple[float, int]]:
+        """稀疏矩阵乘积的一行: 沿倒排表累加 Σmin(wa, wb), 再补充同分类的热门工具"""
+        vector = self.vectors[tool_id]
+        intersections: Dict[int, float] = {}
+        hub_tags = []
+        for tag_id, weight in vector.items():
+            tools = self.postings.get(tag_id, ())
+            if len(tools) > self.max_tag_df:
+                hub_tags.append((tag_id, weight))
+                continue
+            for other_id, other_weight in tools.items():
+                intersections[other_id] = intersections.get(other_id, 0.0) + (
+                    weight if weight < other_weight else other_weight
+                )
+        for other_id in self._category_candidates(tool_id):
+            intersections.setdefault(other_id, 0.0)
+        intersections.pop(tool_id, None)
+        # 高频标签只补算到已有候选上
+        for tag_id, weight in hub_tags:
+            for other_id in intersections:
+                other_weight = self.vectors[other_id].get(tag_id)
+                if other_weight is not None:
+                    intersections[other_id] += min(weight, other_weight)
+
+        return heapq.nlargest(
+            self.top_k,
+            ((self._score(tool_id, other_id, inter), other_id) for other_id, inter in intersections.items()),
+            key=lambda item: (item[0], -item[1]),
+        )
+
+    def _set_neighbors(self, tool_id: int, neighbors: List[Tuple[float, int]]):
+        for _, other_id in self.neighbors.get(tool_id, ()):
+            listed = self.listed_by.get(other_id)
+            if listed is not None:
+                listed.discard(tool_id)
+        if neighbors:
+            self.neighbors[tool_id] = neighbors
+        for _, other_id in neighbors:
+            self.listed_by.setdefault(other_id, set()).add(tool_id)
+
+    # ---- 构建与更新 ----
+
+    def build(self, snapshot) -> 'RelatedIndex':
+        active = list(snapshot.order)
+        max_views = max((int(snapshot.tools[tool_id].get('view_count') or 0) for tool_id in active), default=0)
+        self.max_views_log = math.log1p(max_views) or 1.0
+        for tool_id in active:
+            self._add_tool(snapshot, tool_id)
+        for category_id in set(self.categories.values()):
+            self._sort_category(category_id)
+        if SPARSE_AVAILABLE and active:
+            neighbors = self._compute_all(active)
+        else:
+            neighbors = {tool_id: self._compute(tool_id) for tool_id in active}
+        for tool_id in active:
+            self._set_neighbors(tool_id, neighbors.get(tool_id, []))
+        return self
+
+    def _tag_layers(self, active: List[int]):
+        """按权重档位分层的 0/1 工具×标签矩阵 [(档差, 非高频标签列, 高频标签列)]"""
+        tags = sorted(self.postings)
+        columns = {tag_id: j for j, tag_id in enumerate(tags)}
+        hub = np.array([len(self.postings[tag_id]) > self.max_tag_df for tag_id in tags], dtype=bool)
+        rows, cols, weights = [], [], []
+        for i, tool_id in enumerate(active):
+            for tag_id, weight in self.vectors[tool_id].items():
+                rows.append(i)
+                cols.append(columns[tag_id])
+                weights.append(weight)
+        rows, cols, weights = np.array(rows, dtype=np.int64), np.array(cols, dtype=np.int64), np.array(weights)
+
+        layers = []
+        previous = 0.0
+        for level in sorted(set(weights.tolist())):
+            mask = weights >= level
+            matrix = sparse.csr_matrix(
+                (np.ones(int(mask.sum())), (rows[mask], cols[mask])), shape=(len(active), len(tags))
+            )
+            layers.append((level - previous, matrix[:, ~hub].tocsr(), matrix[:, hub].tocsr()))
+            previous = level
+        return layers
+
+    def _compute_all(self, active: List[int]) -> Dict[int, List[Tuple[float, int]]]:
+        """向量化的全量邻居计算, 候选与打分规则和 _compute 一致"""
+        n = len(active)
+        positions = {tool_id: i for i, tool_id in enumerate(active)}
+        layers = self._tag_layers(active)
+
+        # 共享非高频标签的工具对及其交集: Σ 档差 × (B Bᵀ)
+        shared = sparse.csr_matrix((n, n))
+        for delta, matrix, _ in layers:
+            shared = shared + delta * (matrix @ matrix.T)
+        shared = shared.tocoo()
+        # 同分类最热门的 K+1 个工具作为补充候选
+        category_rows, category_cols = [], []
+        for i, tool_id in enumerate(active):
+            for other_id in self._category_candidates(tool_id):
+                category_rows.append(i)
+                category_cols.append(positions[other_id])
+
+        first = np.concatenate([shared.row, np.array(category_rows, dtype=np.int64)]).astype(np.int64)
+        second = np.concatenate([shared.col, np.array(category_cols, dtype=np.int64)]).astype(np.int64)
+        values = np.concatenate([shared.data, np.zeros(len(category_rows))])
+        pairs, inverse = np.unique(first * n + second, return_inverse=True)
+        intersections = np.bincount(inverse, weights=values, minlength=len(pairs))
+        first, second = pairs // n, pairs % n
+        keep = first != second
+        first, second, intersections = first[keep], second[keep], intersections[keep]
+
+        # 高频标签只补算到已有候选上
+        for delta, _, hub_matrix in layers:
+            if hub_matrix.shape[1]:
+                both = hub_matrix[first].multiply(hub_matrix[second])
+                intersections = intersections + delta * np.asarray(both.sum(axis=1)).ravel()
+
+        ids = np.array(active, dtype=np.int64)
+        norms = np.array([self.norms[tool_id] for tool_id in active])
+        popularity = np.array([self.popularity[tool_id] for tool_id in active])
+        category_keys = {category_id: k for k, category_id in enumerate(set(self.categories.values()))}
+        categories = np.array([category_keys[self.categories[tool_id]] for tool_id in active])
+        has_category = np.array([self.categories[tool_id] is not None for tool_id in active], dtype=bool)
+
+        unions = norms[first] + norms[second] - intersections
+        scores = np.divide(intersections, unions, out=np.zeros_like(intersections), where=unions > 0)
+        same_category = has_category[first] & (categories[first] == categories[second])
+        scores = np.where(same_category, scores + self.category_bonus, scores)
+        scores = scores + self.popularity_weight * popularity[second]
+
+        # 每行按 (分数降序, 工具ID升序) 取前 K 个
+        order = np.lexsort((ids[second], -scores, first))
+        first, second, scores = first[order], second[order], scores[order]
+        starts = np.r_[True, first[1:] != first[:-1]]
+        offsets = np.arange(len(first))
+        ranks = offsets - np.maximum.accumulate(np.where(starts, offsets, 0))
+        top = ranks < self.top_k
+
+        neighbors: Dict[int, List[Tuple[float, int]]] = {}
+        for i, j, score in zip(first[top].tolist(), second[top].tolist(), scores[top].tolist()):
+            neighbors.setdefault(active[i], []).append((score, active[j]))
+        return neighbors
+
+    def update(self, snapshot, tool_ids: List[int]):
+        """局部更新: 变更工具重算; 列表中含有它的工具重算; 共享标签或同分类的工具按新分数合并
+        变更导致候选规则本身变化时, 受影响的工具也重算或合并: 分类内最热门的 K+1 个有进出,
+        或标签的工具数跨过 max_tag_df (该标签开始/停止参与生成候选)
+        """
+        recompute: Set[int] = set()
+        categories = set()
+        tags = set()
+        for tool_id in tool_ids:
+            if tool_id in self.categories:
+                categories.add(self.categories[tool_id])
+            tool = snapshot.tools.get(tool_id)
+            if tool is not None and tool.get('status') == 'active':
+                categories.add(tool.get('category_id'))
+            tags.update(self.vectors.get(tool_id, ()))
+            tags.update(tag_id for tag_id, _ in snapshot.tool_tags.get(tool_id, ()))
+        tops_before = {category_id: set(self.by_category.get(category_id, ())[:self.top_k + 1])
+                       for category_id in categories}
+        hubs_before = {tag_id: len(self.postings.get(tag_id, ())) > self.max_tag_df for tag_id in tags}
+
+        for tool_id in tool_ids:
+            recompute |= self.listed_by.get(tool_id, set())
+            if tool_id in self.vectors:
+                self._remove_tool(tool_id)
+
+        changed = [
+            tool_id for tool_id in tool_ids
+            if tool_id in snapshot.tools and snapshot.tools[tool_id].get('status') == 'active'
+        ]
+        for tool_id in changed:
+            self._add_tool(snapshot, tool_id)
+        for category_id in categories:
+            self._sort_category(category_id)
+
+        for tag_id, was_hub in hubs_before.items():
+            if (len(self.postings.get(tag_id, ())) > self.max_tag_df) != was_hub:
+                recompute.update(self.postings.get(tag_id, ()))
+        entered: List[Tuple[int, Optional[int]]] = []
+        for category_id, before in tops_before.items():
+            after = set(self.by_category.get(category_id, ())[:self.top_k + 1])
+            # 掉出前 K+1 的工具不再是同分类工具的候选, 列表中含有它的同分类工具重算
+            for left_id in before - after:
+                recompute.update(
+                    other_id for other_id in self.listed_by.get(left_id, ())
+                    if self.categories.get(other_id) == category_id
+                )
+            entered.extend((other_id, category_id) for other_id in after - before if other_id not in changed)
+
+        for tool_id in changed:
+            self._set_neighbors(tool_id, self._compute(tool_id))
+            # 可能新收录该工具的候选: 共享标签, 或该工具属于分类内最热门的 K+1 个时的同分类工具
+            candidates = set()
+            if tool_id in self._category_candidates(tool_id):
+                candidates |= set(self.by_category.get(self.categories.get(tool_id), ()))
+            for tag_id in self.vectors[tool_id]:
+                tools = self.postings.get(tag_id, {})
+                if len(tools) <= self.max_tag_df:
+                    candidates.update(tools)
+            candidates -= recompute
+            candidates.discard(tool_id)
+            for other_id in candidates:
+                self._merge(other_id, tool_id)
+
+        # 被挤进前 K+1 的未变更工具成为整个分类的候选
+        for entered_id, category_id in entered:
+            for other_id in self.by_category.get(category_id, ()):
+                if other_id != entered_id and other_id not in recompute:
+                    self._merge(other_id, entered_id)
+
+        for tool_id in recompute - set(tool_ids):
+            if tool_id in self.vectors:
+                self._set_neighbors(tool_id, self._compute(tool_id))
+
+    def _merge(self, tool_id: int, candidate_id: int):
+        """把一个候选按分数插入邻居表, 超出 K 个时去掉末尾"""
+        neighbors = [item for item in self.neighbors.get(tool_id, []) if item[1] != candidate_id]
+        entry = (self.score_pair(tool_id, candidate_id), candidate_id)
+        if len(neighbors) >= self.top_k and (entry[0], -entry[1]) <= (neighbors[-1][0], -neighbors[-1][1]):
+            return
+        neighbors.append(entry)
+        neighbors.sort(key=lambda item: (item[0], -item[1]), reverse=True)
+        self._set_neighbors(tool_id, neighbors[:self.top_k])
+
+    def related(self, tool_id: int, limit: int) -> List[int]:
+        return [other_id for _, other_id in self.neighbors.get(tool_id, ())[:limit]]
+
+
+class RelatedEngine:
+    """持有相关工具邻居表, 跟随目录引擎的快照更新"""
+
+    def __init__(self):
+        self.top_k = int(os.getenv('RELATED_TOP_K', '12'))
+        self.options = {
+            'general_weight': float(os.getenv('RELATED_GENERAL_WEIGHT', '1.0')),
+            'industry_weight': float(os.getenv('RELATED_INDUSTRY_WEIGHT', '0.6')),
+            'category_bonus': float(os.getenv('RELATED_CATEGORY_BONUS', '0.15')),
+            'popularity_weight': float(os.getenv('RELATED_POPULARITY_WEIGHT', '0.1')),
+            'max_tag_df': int(os.getenv('RELATED_MAX_TAG_DF', '500')),
+        }
+        self.index: Optional[RelatedIndex] = None
+        self.version = 0
+        self.incremental_updates = 0
+        self._catalog = None
+        self._rebuilding: Optional[asyncio.Task] = None
+        self._dirty = False
+
+    @property
+    def ready(self) -> bool:
+        return self.index is not None
+
+    async def attach(self, catalog_engine):
+        """基于目录引擎当前快照构建邻居表, 并在后续快照更新时自动维护"""
+        self._catalog = catalog_engine
+        # 先注册回调: 首次构建期间到达的更新会标记 dirty, 构建完成后按最新快照重建, 不会丢失
+        catalog_engine.add_listener(self._on_catalog_update)
+        self._rebuilding = asyncio.ensure_future(self._rebuild_until_clean())
+        await self._rebuilding
+        if self.index is None:
+            raise RuntimeError("相关工具邻居表构建失败")
+        print(f"✓ 相关工具邻居表已构建 ({len(self.index.neighbors)} 个工具, K={self.top_k})")
+
+    def related(self, tool_id: int, limit: int) -> List[int]:
+        """前 limit 个相关工具ID (最多 K 个), 过滤掉当前快照中已下线的工具"""
+        snapshot = self._catalog.snapshot
+        return [
+            other_id for other_id in self.index.related(tool_id, self.top_k)
+            if other_id in snapshot.tools and snapshot.tools[other_id].get('status') == 'active'
+        ][:limit]
+
+    def _on_catalog_update(self, tool_ids):
+        if tool_ids is not None and self.index is not None:
+            try:
+                self.index.update(self._catalog.snapshot, tool_ids)
+                self.incremental_updates += 1
+            except Exception as e:
+                print(f"✗ 相关工具增量更新失败: {e}")
+                tool_ids = None
+            if tool_ids is not None and (self._rebuilding is None or self._rebuilding.done()):
+                return
+        if self._rebuilding is not None and not self._rebuilding.done():
+            self._dirty = True
+            return
+        self._rebuilding = asyncio.ensure_future(self._rebuild_until_clean())
+
+    async def _rebuild_until_clean(self):
+        while True:
+            self._dirty = False
+            try:
+                await self.rebuild()
+            except Exception as e:
+                print(f"✗ 相关工具邻居表重建失败: {e}")
+            if not self._dirty:
+                return
+
+    def _build(self, snapshot) -> RelatedIndex:
+        return RelatedIndex(top_k=self.top_k, **self.options).build(snapshot)
+
+    async def rebuild(self):
+        snapshot = self._catalog.snapshot
+        loop = asyncio.get_running_loop()
+        # 构建是纯CPU工作, 放到线程池避免阻塞事件循环
+        self.index = await loop.run_in_executor(None, self._build, snapshot)
+        self.version += 1
+
+    def stats(self) -> Dict:
+        return {
+            "ready": self.ready,
+            "version": self.version,
+            "tools": len(self.index.neighbors) if self.index else 0,
+            "top_k": self.top_k,
+            "incremental_updates": self.incremental_updates,
+        }
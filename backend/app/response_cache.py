@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+响应缓存
+- 键为 路由 + 规范化后的查询参数 (language 先经过 normalize_language_code) + 请求的数据版本
+- LRU 淘汰, 条目数有上限, 每个路由可单独配置 TTL
+- single-flight: 同一个键的并发未命中只触发一次加载, 其余请求等待同一结果
+- 按工具ID或slug / 分类key / 路由 / 全局失效, 并统计命中、未命中、淘汰次数
+"""
+
+import os
+import time
+import asyncio
+import functools
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Callable, Awaitable, Iterable, Set, Tuple
+
+# 默认每个路由的TTL(秒)
+DEFAULT_ROUTE_TTLS = {
+    'tools': 30,
+    'tool': 120,
+    'related': 300,
+    'categories': 300,
+    'tags': 300,
+}
+
+
+def parse_route_ttls(value: str) -> Dict[str, float]:
+    """解析 "tools=30,tool=120" 形式的配置"""
+    ttls = {}
+    for item in (value or '').split(','):
+        if '=' in item:
+            route, ttl = item.split('=', 1)
+            ttls[route.strip()] = float(ttl)
+    return ttls
+
+
+def tool_tag(tool_id: Any) -> str:
+    return f"tool:{tool_id}"
+
+
+def tool_slug_tag(slug: str) -> str:
+    return f"tool-slug:{slug}"
+
+
+def category_tag(category_key: str) -> str:
+    return f"category:{category_key}"
+
+
+def response_tags(result: Any) -> Set[str]:
+    """从响应中提取失效标签: 包含的工具ID、slug和分类"""
+    data = getattr(result, 'data', None)
+    items = data if isinstance(data, list) else [data] if isinstance(data, dict) else []
+    tags = set()
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        if 'thumbnail_url' in item:
+            # 工具记录
+            tags.add(tool_tag(item.get('id')))
+            if item.get('slug'):
+                tags.add(tool_slug_tag(item['slug']))
+            if item.get('category'):
+                tags.add(category_tag(item['category']))
+        elif 'count' in item and 'slug' in item:
+            # 分类/标签记录
+            tags.add(category_tag(item['slug']))
+    return tags
+
+
+class _Entry:
+    __slots__ = ('value', 'expires_at', 'route', 'tags')
+
+    def __init__(self, value, expires_at, route, tags):
+        self.value = value
+        self.expires_at = expires_at
+        self.route = route
+        self.tags = tags
+
+
+class ResponseCache:
+    """进程内响应缓存"""
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        route_ttls: Optional[Dict[str, float]] = None,
+        normalizers: Optional[Dict[str, Callable[[Any], Any]]] = None,
+        enabled: Optional[bool] = None,
+        skip: Optional[Callable[[], bool]] = None,
+        version: Optional[Callable[[], Any]] = None,
+    ):
+        self.enabled = enabled if enabled is not None else (
+            os.getenv('RESPONSE_CACHE', '').lower() in ('1', 'true', 'on')
+        )
+        self.max_entries = max_entries or int(os.getenv('RESPONSE_CACHE_SIZE', '2048'))
+        self.route_ttls = dict(DEFAULT_ROUTE_TTLS)
+        self.route_ttls.update(route_ttls or parse_route_ttls(os.getenv('RESPONSE_CACHE_TTLS', '')))
+        self.normalizers = normalizers or {}
+        # 请求级的跳过条件, 为真时该请求既不读也不写缓存 (如刚写入过的客户端需读到最新数据)
+        self.skip = skip
+        # 请求级的数据版本, 作为键的一部分: 数据换代后旧条目不再命中, 不依赖失效回调的时机
+        self.version = version
+        self._entries: 'OrderedDict[Tuple, _Entry]' = OrderedDict()
+        self._tag_index: Dict[str, Set[Tuple]] = {}
+        self._inflight: Dict[Tuple, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def make_key(self, route: str, params: Dict[str, Any], version: Any = None) -> Tuple:
+        """路由 + 规范化参数 + 数据版本, None 值不参与"""
+        normalized = []
+        for name in sorted(params):
+            value = params[name]
+            if value is None:
+                continue
+            if name in self.normalizers:
+                value = self.normalizers[name](value)
+            elif isinstance(value, str):
+                value = value.strip()
+            normalized.append((name, value))
+        return (route, tuple(normalized), version)
+
+    def _lookup(self, key: Tuple) -> Tuple[bool, Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        if entry.expires_at < time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            return False, None
+        self._entries.move_to_end(key)
+        return True, entry.value
+
+    def _store(self, key: Tuple, route: str, value: Any, tags: Iterable[str]):
+        ttl = self.route_ttls.get(route, 60)
+        if ttl <= 0:
+            return
+        if key in self._entries:
+            self._remove(key)
+        tags = frozenset(tags)
+        self._entries[key] = _Entry(value, time.monotonic() + ttl, route, tags)
+        for tag in tags:
+            self._tag_index.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: Tuple):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry.tags:
+            keys = self._tag_index.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_index[tag]
+
+    async def get_or_load(
+        self,
+        route: str,
+        params: Dict[str, Any],
+        loader: Callable[[], Awaitable[Any]],
+        tagger: Callable[[Any], Iterable[str]] = response_tags,
+    ) -> Any:
+        """命中直接返回; 未命中时同一个键只有一个请求执行 loader"""
+        key = self.make_key(route, params, self.version() if self.version is not None else None)
+        found, value = self._lookup(key)
+        if found:
+            self.hits += 1
+            return value
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            inflight = self._start_load(key, route, loader, tagger)
+        # 加载在独立任务中进行, shield 保证某个请求 (包括发起加载的请求) 被取消时不会取消共享的加载
+        return await asyncio.shield(inflight)
+
+    def _start_load(self, key: Tuple, route: str, loader: Callable[[], Awaitable[Any]],
+                    tagger: Callable[[Any], Iterable[str]]) -> asyncio.Task:
+        task = asyncio.ensure_future(loader())
+        self._inflight[key] = task
+        task.add_done_callback(lambda _: self._loaded(key, route, task, tagger))
+        return task
+
+    def _loaded(self, key: Tuple, route: str, task: asyncio.Task, tagger: Callable[[Any], Iterable[str]]):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # 取出异常, 等待者都已断开时也不会出现 "exception was never retrieved"
+        if task.cancelled() or task.exception() is not None:
+            return
+        value = task.result()
+        self._store(key, route, value, tagger(value))
+
+    def put(self, route: str, params: Dict[str, Any], value: Any,
+            tagger: Callable[[Any], Iterable[str]] = response_tags, version: Any = None):
+        """直接写入 (后台预生成), 替换已有条目; version 为加载数据前取得的数据版本"""
+        self._store(self.make_key(route, params, version), route, value, tagger(value))
+
+    def route(self, name: str, bypass: Optional[Callable[[Dict[str, Any]], bool]] = None):
+        """路由装饰器: 以端点的关键字参数作为缓存键; bypass(kwargs) 为真时不走缓存 (如流式响应)"""
+        def decorator(func):
+            @functools.wraps(func)
+            async def wrapper(**kwargs):
+                if (not self.enabled or (self.skip is not None and self.skip())
+                        or (bypass is not None and bypass(kwargs))):
+                    return await func(**kwargs)
+                return await self.get_or_load(name, kwargs, lambda: func(**kwargs))
+            return wrapper
+        return decorator
+
+    # ---- 失效 ----
+
+    def _invalidate_tag(self, tag: str) -> int:
+        keys = list(self._tag_index.get(tag, ()))
+        for key in keys:
+            self._remove(key)
+        self.invalidations += len(keys)
+        return len(keys)
+
+    def invalidate_tool(self, tool_id: Any) -> int:
+        """失效所有包含该工具的响应"""
+        return self._invalidate_tag(tool_tag(tool_id))
+
+    def invalidate_tool_slug(self, slug: str) -> int:
+        """按 slug 失效所有包含该工具的响应"""
+        return self._invalidate_tag(tool_slug_tag(slug))
+
+    def invalidate_category(self, category_key: str) -> int:
+        """失效所有包含该分类的响应"""
+        return self._invalidate_tag(category_tag(category_key))
+
+    def invalidate_route(self, route: str) -> int:
+        keys = [key for key, entry in self._entries.items() if entry.route == route]
+        for key in keys:
+            self._remove(key)
+        self.invalidations += len(keys)
+        return len(keys)
+
+    def clear(self) -> int:
+        count = len(self._entries)
+        self._entries.clear()
+        self._tag_index.clear()
+        self.invalidations += count
+        return count
+
+    def on_catalog_update(self, tool_ids):
+        """目录引擎更新回调: 局部更新失效相关工具及所有聚合型响应, 全量更新清空"""
+        if tool_ids is None:
+            self.clear()
+            return
+        for tool_id in tool_ids:
+            self.invalidate_tool(tool_id)
+        for route in ('tools', 'related', 'categories', 'tags'):
+            self.invalidate_route(route)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "inflight": len(self._inflight),
+            "route_ttls": self.route_ttls,
+        }
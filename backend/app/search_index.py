@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+进程内倒排索引搜索引擎
+按语言对工具的 name/title/description 建立倒排索引:
+- 倒排表为按文档序号升序的 array('I'), 词频为并行的 array('H')
+- BM25 打分, 查询时再按 rating / view_count 做热度加权
+- 中文按汉字二元组切分 (与 textsearch.cjk_bigrams 一致), 拉丁词最后一个按前缀扩展
+索引基于内存目录快照构建, 目录更新后在线程池中重建并整体替换; 查询同样在线程池中执行
+"""
+
+import os
+import math
+import asyncio
+from array import array
+from bisect import bisect_left
+from typing import Optional, List, Dict, Tuple, Iterable
+
+from textsearch import cjk_bigrams, is_cjk
+
+# 字段权重: 名称 > 标题 > 描述
+FIELD_WEIGHTS = (('name', 3), ('title', 2), ('description', 1))
+
+# BM25 参数
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# 前缀扩展的最大词数, 避免单字母查询展开整个词表
+MAX_EXPANSIONS = 64
+
+# 词频上限 (array('H'))
+_MAX_TF = 65535
+
+
+class SearchIndex:
+    """单一语言的倒排索引, 构建后只读"""
+
+    def __init__(self, language: str):
+        self.language = language
+        self.doc_ids = array('I')        # 序号 -> tool_id
+        self.doc_lengths = array('f')    # 序号 -> 加权文档长度
+        self.ratings = array('f')
+        self.views = array('I')
+        self.postings: Dict[str, array] = {}
+        self.frequencies: Dict[str, array] = {}
+        self.vocabulary: List[str] = []  # 排序后的词表, 用于前缀扩展
+        self.cjk_suffixes: Dict[str, List[str]] = {}  # 汉字 -> 以其结尾的二元组
+        self.avg_length = 0.0
+        self.max_views_log = 1.0
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def build(self, docs: Iterable[Tuple[int, Dict, float, int]]):
+        """docs: (tool_id, 翻译字段, rating, view_count), 按 tool_id 顺序给出序号"""
+        postings: Dict[str, List[int]] = {}
+        frequencies: Dict[str, List[int]] = {}
+        total_length = 0.0
+        max_views = 0
+
+        for ordinal, (tool_id, fields, rating, views) in enumerate(docs):
+            term_freqs: Dict[str, int] = {}
+            length = 0
+            for field, weight in FIELD_WEIGHTS:
+                tokens = cjk_bigrams(fields.get(field) or '')
+                length += weight * len(tokens)
+                for token in tokens:
+                    term_freqs[token] = term_freqs.get(token, 0) + weight
+
+            self.doc_ids.append(tool_id)
+            self.doc_lengths.append(float(length))
+            self.ratings.append(float(rating or 0))
+            self.views.append(int(views or 0))
+            total_length += length
+            max_views = max(max_views, int(views or 0))
+
+            for token, tf in term_freqs.items():
+                postings.setdefault(token, []).append(ordinal)
+                frequencies.setdefault(token, []).append(min(tf, _MAX_TF))
+
+        self.postings = {token: array('I', ordinals) for token, ordinals in postings.items()}
+        self.frequencies = {token: array('H', freqs) for token, freqs in frequencies.items()}
+        self.vocabulary = sorted(self.postings)
+        self.cjk_suffixes = {}
+        for token in self.vocabulary:
+            if len(token) == 2 and is_cjk(token[1]):
+                self.cjk_suffixes.setdefault(token[1], []).append(token)
+        self.avg_length = total_length / len(self.doc_ids) if self.doc_ids else 0.0
+        self.max_views_log = math.log1p(max_views) or 1.0
+        return self
+
+    def _expand(self, token: str, prefix: bool) -> List[str]:
+        """把查询词展开为词表中的实际词"""
+        if len(token) == 1 and is_cjk(token):
+            # 单个汉字: 匹配包含该字的所有二元组
+            expanded = [token] if token in self.postings else []
+            expanded.extend(self._prefixed(token))
+            expanded.extend(self.cjk_suffixes.get(token, ()))
+            return list(dict.fromkeys(expanded))[:MAX_EXPANSIONS]
+        if prefix:
+            return self._prefixed(token)
+        return [token] if token in self.postings else []
+
+    def _prefixed(self, prefix: str) -> List[str]:
+        start = bisect_left(self.vocabulary, prefix)
+        matched = []
+        for token in self.vocabulary[start:start + MAX_EXPANSIONS]:
+            if not token.startswith(prefix):
+                break
+            matched.append(token)
+        return matched
+
+    def _term_scores(self, tokens: List[str], candidates: Optional[Dict[int, float]]) -> Dict[int, float]:
+        """计算一个查询词(含扩展词)在候选文档上的 BM25 分数, 扩展词之间取最大值"""
+        n_docs = len(self.doc_ids)
+        avg_length = self.avg_length or 1.0
+        scores: Dict[int, float] = {}
+        for token in tokens:
+            ordinals = self.postings[token]
+            freqs = self.frequencies[token]
+            df = len(ordinals)
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+
+            if candidates is not None and len(candidates) * 8 < df:
+                # 候选集很小时在有序倒排表上二分查找
+                positions = []
+                for ordinal in candidates:
+                    pos = bisect_left(ordinals, ordinal)
+                    if pos < df and ordinals[pos] == ordinal:
+                        positions.append(pos)
+            else:
+                positions = range(df)
+
+            for pos in positions:
+                ordinal = ordinals[pos]
+                if candidates is not None and ordinal not in candidates:
+                    continue
+                tf = freqs[pos]
+                norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lengths[ordinal] / avg_length)
+                score = idf * tf * (BM25_K1 + 1) / norm
+                if score > scores.get(ordinal, 0.0):
+                    scores[ordinal] = score
+        return scores
+
+    def search(self, query: str, view_boost: float = 0.3, rating_boost: float = 0.2) -> Dict[int, float]:
+        """返回 {tool_id: 分数}, 所有查询词都需命中 (与 ILIKE 的整体包含语义接近)"""
+        tokens = list(dict.fromkeys(cjk_bigrams(query)))
+        if not tokens or not self.doc_ids:
+            return {}
+
+        last = tokens[-1]
+        expanded = []
+        for token in tokens:
+            words = self._expand(token, prefix=(token == last and not is_cjk(token)))
+            if not words:
+                return {}
+            df = sum(len(self.postings[word]) for word in words)
+            expanded.append((df, words))
+        # 从最稀有的词开始求交集
+        expanded.sort(key=lambda item: item[0])
+
+        totals: Optional[Dict[int, float]] = None
+        for _, words in expanded:
+            term_scores = self._term_scores(words, totals)
+            if totals is None:
+                totals = term_scores
+            else:
+                totals = {ordinal: totals[ordinal] + score for ordinal, score in term_scores.items()}
+            if not totals:
+                return {}
+
+        results = {}
+        for ordinal, score in totals.items():
+            boost = 1.0
+            boost += view_boost * math.log1p(self.views[ordinal]) / self.max_views_log
+            boost += rating_boost * self.ratings[ordinal] / 5.0
+            results[self.doc_ids[ordinal]] = score * boost
+        return results
+
+
+def build_indexes(snapshot) -> Dict[str, SearchIndex]:
+    """基于目录快照为每种语言构建索引, 只收录活跃工具"""
+    indexes = {}
+    active_ids = sorted(snapshot.order)
+    for language, translations in snapshot.translations.items():
+        docs = (
+            (tool_id, translations[tool_id], snapshot.tools[tool_id].get('rating'),
+             snapshot.tools[tool_id].get('view_count'))
+            for tool_id in active_ids if tool_id in translations
+        )
+        indexes[language] = SearchIndex(language).build(docs)
+    return indexes
+
+
+class SearchEngine:
+    """持有各语言索引, 跟随目录引擎的快照更新重建"""
+
+    def __init__(self):
+        self.indexes: Dict[str, SearchIndex] = {}
+        self.view_boost = float(os.getenv('SEARCH_VIEW_BOOST', '0.3'))
+        self.rating_boost = float(os.getenv('SEARCH_RATING_BOOST', '0.2'))
+        self.version = 0
+        self._catalog = None
+        self._rebuilding: Optional[asyncio.Task] = None
+        self._dirty = False
+
+    @property
+    def ready(self) -> bool:
+        return self._catalog is not None and self.version > 0
+
+    def search(self, query: str, language: str) -> Dict[int, float]:
+        index = self.indexes.get(language)
+        if index is None:
+            return {}
+        return index.search(query, self.view_boost, self.rating_boost)
+
+    async def search_async(self, query: str, language: str) -> Dict[int, float]:
+        """在线程池中执行查询: 大目录下打分要几十毫秒, 不能占住事件循环
+        索引构建后只读, 重建时整体替换引用, 线程中读取无需加锁
+        """
+        index = self.indexes.get(language)
+        if index is None:
+            return {}
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, index.search, query, self.view_boost, self.rating_boost)
+
+    async def attach(self, catalog_engine):
+        """基于目录引擎当前快照建索引, 并在后续快照更新时自动重建"""
+        self._catalog = catalog_engine
+        await self.rebuild()
+        catalog_engine.add_listener(self._on_catalog_update)
+        sizes = ', '.join(f"{lang}={len(index)}" for lang, index in self.indexes.items())
+        print(f"✓ 搜索索引已构建 ({sizes})")
+
+    def _on_catalog_update(self, tool_ids):
+        if self._rebuilding is not None and not self._rebuilding.done():
+            self._dirty = True
+            return
+        self._rebuilding = asyncio.ensure_future(self._rebuild_until_clean())
+
+    async def _rebuild_until_clean(self):
+        while True:
+            self._dirty = False
+            try:
+                await self.rebuild()
+            except Exception as e:
+                print(f"✗ 搜索索引重建失败: {e}")
+            if not self._dirty:
+                return
+
+    async def rebuild(self):
+        snapshot = self._catalog.snapshot
+        loop = asyncio.get_running_loop()
+        # 构建是纯CPU工作, 放到线程池避免阻塞事件循环
+        self.indexes = await loop.run_in_executor(None, build_indexes, snapshot)
+        self.version += 1
+
+    def stats(self) -> Dict:
+        return {
+            "ready": self.ready,
+            "version": self.version,
+            "documents": {lang: len(index) for lang, index in self.indexes.items()},
+            "terms": {lang: len(index.postings) for lang, index in self.indexes.items()},
+        }
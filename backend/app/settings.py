@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+应用配置
+启动时从环境变量解析一次, 热点路径直接读取属性, 不再逐行调用 os.getenv
+"""
+
+import os
+from typing import Optional
+
+# 本地截图目录的默认值 (与历史行为一致)
+DEFAULT_IMAGE_BASE_URL = '/Users/wingerliu/Downloads/startups/LookAiTools/crawler/screenshots'
+DEFAULT_API_BASE_URL = 'http://localhost:8000'
+
+
+class Settings:
+    """启动时解析好的配置"""
+
+    __slots__ = ('image_base_url', 'api_base_url', 'remote_image_base', 'local_image_prefix', 'image_proxy_origin')
+
+    def __init__(self, image_base_url: str = DEFAULT_IMAGE_BASE_URL, api_base_url: str = DEFAULT_API_BASE_URL,
+                 image_proxy_origin: Optional[str] = None):
+        self.image_base_url = image_base_url
+        self.api_base_url = api_base_url
+        # 以@开头表示S3或其他远程地址, 截图直接拼接到远程地址后
+        self.remote_image_base: Optional[str] = (
+            f"{image_base_url[1:].rstrip('/')}/" if image_base_url.startswith('@') else None
+        )
+        # 本地路径转换为图片接口的完整URL
+        self.local_image_prefix = f"{api_base_url}/api/images/"
+        # 代理模式: 图片接口从源站读穿缓存, 截图URL统一指向图片接口
+        self.image_proxy_origin = image_proxy_origin
+
+    @classmethod
+    def from_env(cls) -> 'Settings':
+        image_base_url = os.getenv('FRONTEND_IMAGE_BASE_URL', DEFAULT_IMAGE_BASE_URL)
+        image_proxy_origin = None
+        if os.getenv('IMAGE_PROXY', 'false').lower() == 'true':
+            remote = image_base_url[1:] if image_base_url.startswith('@') else None
+            image_proxy_origin = os.getenv('IMAGE_PROXY_ORIGIN') or remote
+        return cls(
+            image_base_url=image_base_url,
+            api_base_url=os.getenv('API_BASE_URL', DEFAULT_API_BASE_URL),
+            image_proxy_origin=image_proxy_origin,
+        )
+
+    def screenshot_url(self, screenshot: Optional[str]) -> Optional[str]:
+        """把数据库中的截图文件名转换为前端可访问的URL, 完整URL原样返回"""
+        if not screenshot or screenshot.startswith(('http://', 'https://')):
+            return screenshot
+        if self.remote_image_base is not None and self.image_proxy_origin is None:
+            return self.remote_image_base + screenshot
+        return self.local_image_prefix + screenshot
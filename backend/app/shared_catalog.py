@@ -0,0 +1,857 @@
+#!/usr/bin/env python3
+"""
+多进程共享的目录快照文件 (CATALOG_ENGINE=shared)
+uvicorn 多个 worker 时, 进程内目录引擎每个 worker 各有一份、各自刷新;
+共享模式下由一个刷新进程把目录写成紧凑的列式二进制文件, 所有 worker 只读 mmap 同一文件:
+- 页缓存在进程间共享, 增加 worker 不增加目录内存; worker 启动时映射现有文件即可应答
+- 刷新进程由文件锁选出 (flock), 持锁的 worker 运行 CatalogEngine (LISTEN/NOTIFY + 定时全量),
+  每次快照更新写出新一代文件: 先写临时文件再 os.replace, 读者看不到写了一半的文件;
+  持锁进程退出后, 其他 worker 在下次轮询时接管
+- 各 worker 按 CATALOG_SNAPSHOT_POLL 秒检查文件是否换代, 换代时映射新文件并整体替换引用,
+  旧文件的映射在不再被引用后释放, 不复制数据
+
+文件布局: 8 字节魔数 + 8 字节头长度 + JSON 头 (代数、分类/标签等小表、各段偏移) + 8 字节对齐的各段
+- 工具按默认排序存放, 默认列表就是 0..N-1; 另存按创建时间/浏览量的排序、分类/标签/精选的工具下标
+- 数值列为定长数组, 字符串列为 偏移数组 + UTF-8 数据; 标签、功能特性为 CSR (偏移 + 条目)
+- 每种语言存一份小写的 名称/标题/描述 拼接文本, 子串搜索直接在映射上 find
+"""
+
+import os
+import sys
+import json
+import mmap
+import time
+import fcntl
+import asyncio
+from array import array
+from bisect import bisect_right
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Optional, List, Dict, Any, Tuple, Sequence, Set
+
+from catalog import (
+    CatalogEngine, CatalogSnapshot, TRANSLATION_COLUMNS, TOP_SORT_KEYS,
+    category_rows, tag_rows,
+)
+from pagination import SORT_COLUMNS
+
+MAGIC = b'LATCAT01'
+FORMAT_VERSION = 1
+DEFAULT_SNAPSHOT_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'lookaitools', 'catalog.bin')
+
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_UTC = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_ONE_MICROSECOND = timedelta(microseconds=1)
+# 空时间按 datetime.min 参与排序, 与 catalog._created_at 一致
+_MIN_MICROS = (datetime.min - _EPOCH) // _ONE_MICROSECOND
+
+# 搜索文本中字段之间的分隔符, 保证匹配不会跨字段
+_SEARCH_SEPARATOR = '\0'
+SEARCH_COLUMNS = ('name', 'title', 'description')
+
+# 可空的布尔列用 -1 表示 NULL
+_NULL_BOOL = -1
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def _micros(value: Optional[datetime]) -> Optional[int]:
+    """时间转为UTC微秒数; 带时区的先转换到UTC"""
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return (value - _EPOCH) // _ONE_MICROSECOND
+
+
+# ---- 写入 ----
+
+class _Sections:
+    """按顺序收集各段, 记录 名称 -> (相对偏移, 字节数, 类型码)"""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.index: Dict[str, Tuple[int, int, str]] = {}
+        self.size = 0
+
+    def add(self, name: str, typecode: str, data: bytes):
+        self.index[name] = (self.size, len(data), typecode)
+        self.chunks.append(data)
+        padding = _align(len(data)) - len(data)
+        if padding:
+            self.chunks.append(b'\0' * padding)
+        self.size += len(data) + padding
+
+    def numbers(self, name: str, typecode: str, values):
+        self.add(name, typecode, array(typecode, values).tobytes())
+
+    def nullable(self, name: str, typecode: str, values: List, null_value):
+        """数值列, 含 NULL 时另存一段 <name>.null 标记"""
+        self.numbers(name, typecode, [null_value if v is None else v for v in values])
+        if any(v is None for v in values):
+            self.numbers(f"{name}.null", 'B', [v is None for v in values])
+
+    def strings(self, name: str, values: Sequence[Optional[str]]):
+        """字符串列: <name>.off 偏移 (N+1) + <name> UTF-8 数据, 含 NULL 时另存 <name>.null"""
+        offsets = array('I', [0])
+        data = bytearray()
+        nulls = False
+        for value in values:
+            if value is None:
+                nulls = True
+            else:
+                data += value.encode('utf-8')
+            offsets.append(len(data))
+        self.add(f"{name}.off", 'I', offsets.tobytes())
+        self.add(name, 'B', bytes(data))
+        if nulls:
+            self.numbers(f"{name}.null", 'B', [v is None for v in values])
+
+    def csr(self, name: str, groups: Sequence[Sequence[int]], typecode: str = 'i'):
+        """每组一个整数列表: <name>.off 偏移 (组数+1) + <name> 条目"""
+        offsets = array('I', [0])
+        items = array(typecode)
+        for group in groups:
+            items.extend(group)
+            offsets.append(len(items))
+        self.add(f"{name}.off", 'I', offsets.tobytes())
+        self.add(name, typecode, items.tobytes())
+
+
+def _json_key(value) -> str:
+    return str(value)
+
+
+def build_catalog_file(snap: CatalogSnapshot, generation: int, base_generation: int,
+                       changed_tool_ids: Optional[List[int]]) -> bytes:
+    """把目录快照序列化为共享文件内容; 只包含活跃工具, 按默认排序存放"""
+    order = list(snap.order)
+    tools = [snap.tools[tool_id] for tool_id in order]
+    sections = _Sections()
+
+    sections.numbers('id', 'q', order)
+    sections.nullable('category_id', 'q', [tool.get('category_id') for tool in tools], 0)
+    sections.nullable('view_count', 'q', [tool.get('view_count') for tool in tools], 0)
+    for column in ('featured', 'trial_available'):
+        values = [tool.get(column) for tool in tools]
+        sections.numbers(column, 'b', [_NULL_BOOL if v is None else int(bool(v)) for v in values])
+    # 评分: 排序用浮点数, 响应和游标用原始文本 (numeric 还原为 Decimal)
+    ratings = [tool.get('rating') for tool in tools]
+    sections.numbers('rating_sort', 'd', [float(v or 0) for v in ratings])
+    sections.strings('rating', [None if v is None else str(v) for v in ratings])
+    rating_type = next((type(v).__name__ for v in ratings if v is not None), 'Decimal')
+
+    timestamps_tz = False
+    for column in ('created_at', 'updated_at'):
+        values = [tool.get(column) for tool in tools]
+        timestamps_tz = timestamps_tz or any(getattr(v, 'tzinfo', None) is not None for v in values)
+        sections.nullable(column, 'q', [_micros(v) for v in values], _MIN_MICROS)
+    for column in ('slug', 'url', 'page_screenshot', 'pricing_type'):
+        sections.strings(column, [tool.get(column) for tool in tools])
+
+    # 翻译、搜索文本、功能特性, 按语言
+    languages = sorted(set(snap.translations) | {language for _, language in snap.features})
+    for language in languages:
+        translations = snap.translations.get(language, {})
+        rows = [translations.get(tool_id) for tool_id in order]
+        for column in TRANSLATION_COLUMNS:
+            sections.strings(f"tr.{language}.{column}", [row.get(column) if row else None for row in rows])
+        sections.strings(f"search.{language}", [
+            _SEARCH_SEPARATOR.join((row.get(col) or '').lower() for col in SEARCH_COLUMNS) + _SEARCH_SEPARATOR
+            if row else ''
+            for row in rows
+        ])
+        # 功能特性: feat.<lang>.tool 为每个工具在 feat.<lang> 中的起止位置
+        features = [snap.features.get((tool_id, language), []) for tool_id in order]
+        counts = array('I', [0])
+        for items in features:
+            counts.append(counts[-1] + len(items))
+        sections.add(f"feat.{language}.tool", 'I', counts.tobytes())
+        sections.strings(f"feat.{language}", [text for items in features for text in items])
+
+    # 标签 (保持加载顺序), 类型名另存
+    tag_types: List[str] = []
+    type_codes: Dict[str, int] = {}
+    tag_ids, tag_type_codes = [], []
+    for tool_id in order:
+        pairs = snap.tool_tags.get(tool_id, [])
+        tag_ids.append([tag_id for tag_id, _ in pairs])
+        codes = []
+        for _, tag_type in pairs:
+            if tag_type not in type_codes:
+                type_codes[tag_type] = len(tag_types)
+                tag_types.append(tag_type)
+            codes.append(type_codes[tag_type])
+        tag_type_codes.append(codes)
+    sections.csr('tags', tag_ids, 'q')
+    sections.add('tags.type', 'B', bytes(code for codes in tag_type_codes for code in codes))
+
+    # 预计算的排序和筛选下标
+    for order_by, key in TOP_SORT_KEYS.items():
+        ranked = sorted(range(len(order)), key=lambda index: key(tools[index]), reverse=True)
+        sections.numbers(f"order.{order_by}", 'i', ranked)
+    sections.numbers('featured.idx', 'i', [index for index, tool in enumerate(tools) if tool.get('featured')])
+
+    by_category: Dict[str, List[int]] = {}
+    for index, tool in enumerate(tools):
+        category = snap.categories.get(tool.get('category_id'))
+        if category:
+            by_category.setdefault(category['key'], []).append(index)
+    category_keys = sorted(by_category)
+    sections.csr('bycat', [by_category[key] for key in category_keys])
+
+    by_tag: Dict[str, List[int]] = {}
+    for index, tool_id in enumerate(order):
+        seen = set()
+        for tag_id, _ in snap.tool_tags.get(tool_id, ()):
+            tag_key = snap.tags.get(tag_id)
+            if tag_key is not None and tag_key not in seen:
+                seen.add(tag_key)
+                by_tag.setdefault(tag_key, []).append(index)
+    tag_keys = sorted(by_tag)
+    sections.csr('bytag', [by_tag[key] for key in tag_keys])
+
+    # 标识符: 按 slug 字节序、按 id 排好的下标, 查找时二分
+    slugs = [(tool.get('slug') or '').encode('utf-8') for tool in tools]
+    sections.numbers('slug.sorted', 'i', sorted(
+        (index for index in range(len(order)) if tools[index].get('slug')), key=lambda index: slugs[index]
+    ))
+    sections.numbers('id.sorted', 'i', sorted(range(len(order)), key=lambda index: order[index]))
+
+    header = {
+        "format": FORMAT_VERSION,
+        "byteorder": sys.byteorder,
+        "generation": generation,
+        "base_generation": base_generation,
+        "changed_tool_ids": changed_tool_ids,
+        "created_at": time.time(),
+        "loaded_at": snap.loaded_at,
+        "count": len(order),
+        "languages": languages,
+        "rating_type": rating_type,
+        "timestamps_tz": timestamps_tz,
+        "tag_types": tag_types,
+        "category_keys": category_keys,
+        "tag_keys": tag_keys,
+        # 分类/标签等小表, 映射时解析
+        "categories": {_json_key(k): v for k, v in snap.categories.items()},
+        "category_translations": {
+            language: {_json_key(k): v for k, v in rows.items()}
+            for language, rows in snap.category_translations.items()
+        },
+        "category_counts": [[k, v] for k, v in snap.category_counts.items()],
+        "tags": {_json_key(k): v for k, v in snap.tags.items()},
+        "tag_translations": {
+            language: {_json_key(k): v for k, v in rows.items()}
+            for language, rows in snap.tag_translations.items()
+        },
+        "tag_usage": [[tag_id, tag_type, count] for (tag_id, tag_type), count in snap.tag_usage.items()],
+        "sections": sections.index,
+    }
+    header_bytes = json.dumps(header, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    prefix = MAGIC + len(header_bytes).to_bytes(8, 'little') + header_bytes
+    prefix += b'\0' * (_align(len(prefix)) - len(prefix))
+    return prefix + b''.join(sections.chunks)
+
+
+def write_catalog_file(path: str, content: bytes):
+    """原子写入: 临时文件 + fsync + os.replace"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+# ---- 读取 ----
+
+class CatalogFileError(ValueError):
+    """快照文件无法识别 (魔数、版本或字节序不符)"""
+
+
+def _int_keys(mapping: Dict[str, Any]) -> Dict:
+    return {int(k) if k.lstrip('-').isdigit() else k: v for k, v in mapping.items()}
+
+
+class MappedCatalog:
+    """一代快照文件的只读映射; 查询接口与 CatalogEngine 一致, 返回同样结构的行"""
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        self.size = stat.st_size
+        if self.mm[:8] != MAGIC:
+            raise CatalogFileError("目录快照文件魔数不符")
+        header_length = int.from_bytes(self.mm[8:16], 'little')
+        header = json.loads(self.mm[16:16 + header_length])
+        if header.get('format') != FORMAT_VERSION or header.get('byteorder') != sys.byteorder:
+            raise CatalogFileError("目录快照文件版本或字节序不符")
+        self.header = header
+        self.generation: int = header['generation']
+        self.count: int = header['count']
+        self.loaded_at: float = header['loaded_at']
+        self._data_start = _align(16 + header_length)
+
+        view = memoryview(self.mm)
+        self._offsets: Dict[str, int] = {}
+        self.s: Dict[str, memoryview] = {}
+        for name, (offset, length, typecode) in header['sections'].items():
+            start = self._data_start + offset
+            self._offsets[name] = start
+            self.s[name] = view[start:start + length].cast(typecode)
+
+        # 小表, 结构与 CatalogSnapshot 一致, 供 category_rows / tag_rows 使用
+        self.categories = _int_keys(header['categories'])
+        self.category_translations = {
+            language: _int_keys(rows) for language, rows in header['category_translations'].items()
+        }
+        self.category_counts = {k: v for k, v in header['category_counts']}
+        self.tags = _int_keys(header['tags'])
+        self.tag_translations = {language: _int_keys(rows) for language, rows in header['tag_translations'].items()}
+        self.tag_usage = {(tag_id, tag_type): count for tag_id, tag_type, count in header['tag_usage']}
+        self._category_slots = {key: slot for slot, key in enumerate(header['category_keys'])}
+        self._tag_slots = {key: slot for slot, key in enumerate(header['tag_keys'])}
+        self._decimal_rating = header['rating_type'] == 'Decimal'
+        self._epoch = _EPOCH_UTC if header['timestamps_tz'] else _EPOCH
+        self._ids = self.s['id']
+
+    # ---- 列读取 ----
+
+    def _is_null(self, column: str, index: int) -> bool:
+        nulls = self.s.get(f"{column}.null")
+        return nulls is not None and nulls[index] == 1
+
+    def _string(self, column: str, index: int) -> Optional[str]:
+        data = self.s.get(column)
+        if data is None or self._is_null(column, index):
+            return None
+        offsets = self.s[f"{column}.off"]
+        return str(data[offsets[index]:offsets[index + 1]], 'utf-8')
+
+    def _number(self, column: str, index: int):
+        return None if self._is_null(column, index) else self.s[column][index]
+
+    def _bool(self, column: str, index: int) -> Optional[bool]:
+        value = self.s[column][index]
+        return None if value == _NULL_BOOL else bool(value)
+
+    def _timestamp(self, column: str, index: int) -> Optional[datetime]:
+        if self._is_null(column, index):
+            return None
+        return self._epoch + timedelta(microseconds=self.s[column][index])
+
+    def _rating(self, index: int):
+        text = self._string('rating', index)
+        if text is None:
+            return None
+        return Decimal(text) if self._decimal_rating else float(text)
+
+    def _group(self, name: str, slot: int) -> memoryview:
+        offsets = self.s[f"{name}.off"]
+        return self.s[name][offsets[slot]:offsets[slot + 1]]
+
+    def _sort_key(self, index: int) -> Tuple:
+        """与 catalog._sort_key 同序: featured, rating, view_count, created_at(微秒), id"""
+        return (
+            self.s['featured'][index] == 1,
+            self.s['rating_sort'][index],
+            self._number('view_count', index) or 0,
+            self.s['created_at'][index],
+            self._ids[index],
+        )
+
+    # ---- 查找 ----
+
+    def index_of(self, tool_id: int) -> Optional[int]:
+        """工具ID -> 文件内下标 (二分 id.sorted)"""
+        ordered = self.s['id.sorted']
+        lo, hi = 0, len(ordered)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._ids[ordered[mid]] < tool_id:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(ordered) and self._ids[ordered[lo]] == tool_id:
+            return ordered[lo]
+        return None
+
+    def _index_of_slug(self, slug: str) -> Optional[int]:
+        target = slug.encode('utf-8')
+        ordered = self.s['slug.sorted']
+        data, offsets = self.s['slug'], self.s['slug.off']
+        lo, hi = 0, len(ordered)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            index = ordered[mid]
+            if data[offsets[index]:offsets[index + 1]].tobytes() < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(ordered):
+            index = ordered[lo]
+            if data[offsets[index]:offsets[index + 1]].tobytes() == target:
+                return index
+        return None
+
+    def resolve_index(self, tool_identifier: str) -> Optional[int]:
+        """slug 或 id 文本 -> 下标; 文件只含活跃工具"""
+        index = self._index_of_slug(tool_identifier)
+        if index is None and tool_identifier.isdigit() and str(int(tool_identifier)) == tool_identifier:
+            index = self.index_of(int(tool_identifier))
+        return index
+
+    # ---- 行组装, 与 CatalogEngine._tool_row 结构一致 ----
+
+    def tool_row(self, index: int, language: str) -> Dict:
+        row = {
+            'id': self._ids[index],
+            'slug': self._string('slug', index),
+            'url': self._string('url', index),
+            'page_screenshot': self._string('page_screenshot', index),
+            'pricing_type': self._string('pricing_type', index),
+            'rating': self._rating(index),
+            'view_count': self._number('view_count', index),
+            'featured': self._bool('featured', index),
+            'trial_available': self._bool('trial_available', index),
+            'created_at': self._timestamp('created_at', index),
+            'updated_at': self._timestamp('updated_at', index),
+            'category_id': self._number('category_id', index),
+            'status': 'active',
+        }
+        for column in TRANSLATION_COLUMNS:
+            row[column] = self._string(f"tr.{language}.{column}", index)
+        category = self.categories.get(row['category_id'])
+        category_translation = {}
+        if category:
+            category_translation = self.category_translations.get(language, {}).get(row['category_id'], {})
+        row['category_key'] = category['key'] if category else None
+        row['category_name'] = category_translation.get('category_name')
+        row['category_description'] = category_translation.get('category_description')
+        return row
+
+    def _tag_pairs(self, index: int) -> List[Tuple[int, str]]:
+        offsets = self.s['tags.off']
+        start, end = offsets[index], offsets[index + 1]
+        tag_types = self.header['tag_types']
+        return [(self.s['tags'][i], tag_types[self.s['tags.type'][i]]) for i in range(start, end)]
+
+    def sort_row(self, tool_id: int) -> Dict:
+        index = self.index_of(tool_id)
+        return {
+            'featured': self._bool('featured', index),
+            'rating': self._rating(index),
+            'view_count': self._number('view_count', index),
+            'created_at': self._timestamp('created_at', index),
+            'id': tool_id,
+        }
+
+    def tool_rows(self, tool_ids: List[int], language: str) -> List[Dict]:
+        rows = []
+        for tool_id in tool_ids:
+            index = self.index_of(tool_id)
+            row = self.tool_row(index, language)
+            row['tags'] = [self.tags[tag_id] for tag_id, _ in self._tag_pairs(index) if tag_id in self.tags]
+            rows.append(row)
+        return rows
+
+    def get_tool_detail(self, tool_identifier: str, language: str) -> Optional[Dict]:
+        index = self.resolve_index(tool_identifier)
+        if index is None:
+            return None
+        row = self.tool_row(index, language)
+        tag_names = self.tag_translations.get(language, {})
+        tool_tags = [
+            (tag_names[tag_id], tag_type)
+            for tag_id, tag_type in self._tag_pairs(index)
+            if tag_id in tag_names
+        ]
+        row['tags'] = [name for name, tag_type in tool_tags if tag_type == 'general']
+        row['industry_tags'] = [name for name, tag_type in tool_tags if tag_type == 'industry']
+        features = []
+        offsets = self.s.get(f"feat.{language}.tool")
+        if offsets is not None:
+            features = [self._string(f"feat.{language}", i) for i in range(offsets[index], offsets[index + 1])]
+        row['key_features'] = features
+        return row
+
+    # ---- 筛选 ----
+
+    def _search(self, language: str, needle: str) -> List[int]:
+        """在小写拼接文本上查找子串, 返回命中的下标 (升序)"""
+        name = f"search.{language}"
+        if name not in self.s or _SEARCH_SEPARATOR in needle:
+            return []
+        target = needle.encode('utf-8')
+        offsets = self.s[f"{name}.off"]
+        base = self._offsets[name]
+        end = base + offsets[self.count]
+        matched = []
+        position = self.mm.find(target, base, end)
+        while position != -1:
+            index = bisect_right(offsets, position - base) - 1
+            matched.append(index)
+            position = self.mm.find(target, base + offsets[index + 1], end)
+        return matched
+
+    def filter_indices(
+        self,
+        language: str,
+        category: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        featured: bool = False,
+        search: Optional[str] = None,
+        scores: Optional[Dict[int, float]] = None,
+    ) -> Sequence[int]:
+        """按筛选条件返回排好序的下标 (默认排序即下标升序)"""
+        candidates: List[Sequence[int]] = []
+        if category:
+            slot = self._category_slots.get(category)
+            if slot is None:
+                return []
+            candidates.append(self._group('bycat', slot))
+        if tags:
+            union = set()
+            for tag_key in set(tags):
+                slot = self._tag_slots.get(tag_key)
+                if slot is not None:
+                    union.update(self._group('bytag', slot))
+            candidates.append(sorted(union))
+        if featured:
+            candidates.append(self.s['featured.idx'])
+        if scores is None and search:
+            candidates.append(self._search(language, search.lower()))
+        if not candidates:
+            indices: Sequence[int] = range(self.count)
+        else:
+            # 从最短的列表出发, 逐个取交集, 保持升序
+            candidates.sort(key=len)
+            indices = list(candidates[0])
+            for other in candidates[1:]:
+                wanted = set(other)
+                indices = [index for index in indices if index in wanted]
+        if scores is not None:
+            indices = [index for index in indices if self._ids[index] in scores]
+        return indices
+
+    def filter_tool_ids(self, language: str, category: Optional[str] = None, tags: Optional[List[str]] = None,
+                        featured: bool = False, search: Optional[str] = None,
+                        scores: Optional[Dict[int, float]] = None) -> List[int]:
+        ids = self._ids
+        return [ids[index] for index in self.filter_indices(language, category, tags, featured, search, scores)]
+
+    def _seek(self, indices: Sequence[int], after: Tuple) -> int:
+        """二分查找游标之后的第一个位置"""
+        values = dict(zip(SORT_COLUMNS, after))
+        created = _micros(values.get('created_at'))
+        after_key = (
+            bool(values.get('featured')),
+            float(values.get('rating') or 0),
+            values.get('view_count') or 0,
+            _MIN_MICROS if created is None else created,
+            values.get('id') or 0,
+        )
+        lo, hi = 0, len(indices)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._sort_key(indices[mid]) >= after_key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def list_tool_ids(
+        self,
+        language: str,
+        category: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        featured: bool = False,
+        search: Optional[str] = None,
+        page: int = 1,
+        limit: int = 12,
+        all: bool = False,
+        after: Optional[Tuple] = None,
+        keyset: bool = False,
+        scores: Optional[Dict[int, float]] = None,
+        by_relevance: bool = False,
+    ) -> Tuple[List[int], int]:
+        """返回 (当前页工具ID, 总数); 游标模式下多返回一个用于判断是否有下一页"""
+        indices = self.filter_indices(language, category, tags, featured, search, scores)
+        if scores is not None and by_relevance:
+            indices = sorted(indices, key=lambda index: -scores[self._ids[index]])
+        total = len(indices)
+        if keyset:
+            start = self._seek(indices, after) if after is not None else 0
+            indices = indices[start:start + limit + 1]
+        elif not all:
+            offset = (page - 1) * limit
+            indices = indices[offset:offset + limit]
+        return [self._ids[index] for index in indices], total
+
+    def top_tool_ids(self, order_by: str, limit: int) -> List[int]:
+        ranked = self.s[f"order.{order_by}"]
+        return [self._ids[index] for index in ranked[:limit]]
+
+
+class SharedCatalog:
+    """共享快照的引擎外观: 接口与 CatalogEngine 一致, 持锁的进程同时负责刷新和写文件"""
+
+    def __init__(self, path: str = DEFAULT_SNAPSHOT_PATH, poll_interval: float = 1.0, wait_timeout: float = 30.0,
+                 database_url: Optional[str] = None):
+        self.path = path
+        self.lock_path = f"{path}.lock"
+        self.poll_interval = poll_interval
+        self.wait_timeout = wait_timeout
+        self.database_url = database_url
+        self.snapshot: Optional[MappedCatalog] = None
+        self.engine: Optional[CatalogEngine] = None   # 仅刷新进程持有
+        self._pool = None
+        self._lock_file = None
+        self._writer: Optional[asyncio.Task] = None
+        self._pending = False
+        self._pending_ids: Optional[Set[int]] = None
+        self._write_failed = False
+        self._tasks: List[asyncio.Task] = []
+        self._listeners: List = []
+        self.swaps = 0
+        self.writes = 0
+
+    @classmethod
+    def from_env(cls) -> 'SharedCatalog':
+        return cls(
+            path=os.getenv('CATALOG_SNAPSHOT_PATH', DEFAULT_SNAPSHOT_PATH),
+            poll_interval=float(os.getenv('CATALOG_SNAPSHOT_POLL', '1')),
+            wait_timeout=float(os.getenv('CATALOG_SNAPSHOT_WAIT', '30')),
+        )
+
+    @property
+    def ready(self) -> bool:
+        return self.snapshot is not None
+
+    @property
+    def version(self) -> int:
+        return self.snapshot.generation if self.snapshot else 0
+
+    @property
+    def leader(self) -> bool:
+        return self.engine is not None
+
+    def add_listener(self, callback):
+        """注册快照换代回调 callback(tool_ids), tool_ids 为 None 表示全量"""
+        self._listeners.append(callback)
+
+    # ---- 映射与换代 ----
+
+    def _map_latest(self) -> bool:
+        """文件换代时映射新文件并替换引用, 返回是否换代"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        current = self.snapshot
+        if current is not None and current.identity == (stat.st_ino, stat.st_mtime_ns, stat.st_size):
+            return False
+        try:
+            snap = MappedCatalog(self.path)
+        except (OSError, ValueError) as e:
+            print(f"✗ 目录快照文件映射失败: {e}")
+            return False
+
+        tool_ids = None
+        if current is not None and snap.header['base_generation'] == current.generation:
+            tool_ids = snap.header['changed_tool_ids']
+        self.snapshot = snap
+        self.swaps += 1
+        for callback in self._listeners:
+            try:
+                callback(tool_ids)
+            except Exception as e:
+                print(f"✗ 目录更新回调失败: {e}")
+        return True
+
+    # ---- 刷新进程 ----
+
+    def _try_lead(self) -> bool:
+        """非阻塞地获取文件锁, 成功者成为刷新进程"""
+        if self._lock_file is not None:
+            return True
+        os.makedirs(os.path.dirname(self.lock_path) or '.', exist_ok=True)
+        lock_file = open(self.lock_path, 'a')
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    def _on_engine_update(self, tool_ids):
+        """目录引擎发布新快照: 合并到待写任务, 同一时间最多一个写入在排队, 且总是写最新快照"""
+        if not self._pending:
+            self._pending = True
+            self._pending_ids = set()
+        if tool_ids is None or self._pending_ids is None:
+            self._pending_ids = None   # 期间有过全量加载
+        else:
+            self._pending_ids.update(tool_ids)
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.ensure_future(self._write_pending())
+
+    async def _write_pending(self):
+        """写出新一代文件, 直到没有待写的更新"""
+        while self._pending:
+            snap = self.engine.snapshot
+            tool_ids = None if self._pending_ids is None else sorted(self._pending_ids)
+            self._pending = False
+            self._pending_ids = None
+            await self._write(snap, tool_ids)
+
+    async def _write(self, snap: CatalogSnapshot, tool_ids: Optional[List[int]]):
+        base = self.snapshot.generation if self.snapshot else 0
+        # 上一次写入失败时, 增量信息不再对应磁盘上的上一代
+        changed = None if self._write_failed else tool_ids
+        try:
+            loop = asyncio.get_running_loop()
+            content = await loop.run_in_executor(None, build_catalog_file, snap, base + 1, base, changed)
+            await loop.run_in_executor(None, write_catalog_file, self.path, content)
+        except Exception as e:
+            self._write_failed = True
+            print(f"✗ 目录快照文件写入失败: {e}")
+            return
+        self._write_failed = False
+        self.writes += 1
+        self._map_latest()
+
+    async def _lead(self, wait: bool):
+        """运行目录引擎; wait 为真时等待首个快照文件写完"""
+        self.engine = CatalogEngine(database_url=self.database_url)
+        self.engine.add_listener(self._on_engine_update)
+        if wait:
+            await self.engine.start(self._pool)
+            if self._writer is not None:
+                await self._writer
+        else:
+            self._tasks.append(asyncio.create_task(self._start_engine()))
+
+    async def _start_engine(self):
+        try:
+            await self.engine.start(self._pool)
+        except Exception as e:
+            print(f"✗ 目录引擎加载失败: {e}")
+
+    # ---- 生命周期 ----
+
+    async def start(self, pool):
+        """映射现有快照文件 (存在时立即可用), 竞选刷新进程, 并启动换代轮询"""
+        self._pool = pool
+        self._map_latest()
+        if self._try_lead():
+            # 已有可用文件时在后台刷新, 不阻塞启动
+            await self._lead(wait=not self.ready)
+            role = "刷新进程"
+        else:
+            deadline = time.monotonic() + self.wait_timeout
+            while not self.ready and time.monotonic() < deadline:
+                await asyncio.sleep(min(0.1, self.poll_interval))
+                self._map_latest()
+            role = "只读"
+        self._tasks.append(asyncio.create_task(self._poll_loop()))
+        if self.ready:
+            print(f"✓ 共享目录快照已映射 ({role}, 第 {self.snapshot.generation} 代, "
+                  f"{self.snapshot.count} 个活跃工具, {self.snapshot.size / 1024 / 1024:.1f} MB)")
+        else:
+            print(f"✗ 共享目录快照尚不可用 ({role}), 暂时回退到数据库查询")
+
+    async def _poll_loop(self):
+        while True:
+            await asyncio.sleep(max(0.1, self.poll_interval))
+            try:
+                self._map_latest()
+                # 原刷新进程退出后接管
+                if self.engine is None and self._try_lead():
+                    print("✓ 接管共享目录快照刷新")
+                    await self._lead(wait=False)
+            except Exception as e:
+                print(f"✗ 共享目录快照轮询失败: {e}")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._tasks = []
+        if self.engine is not None:
+            await self.engine.stop()
+            self.engine = None
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    # ---- 查询接口, 每次调用读取一次当前快照引用 ----
+
+    def filter_tool_ids(self, *args, snap: Optional[MappedCatalog] = None, **kwargs) -> List[int]:
+        return (snap or self.snapshot).filter_tool_ids(*args, **kwargs)
+
+    def list_tool_ids(self, *args, **kwargs) -> Tuple[List[int], int]:
+        return self.snapshot.list_tool_ids(*args, **kwargs)
+
+    def top_tool_ids(self, order_by: str, limit: int) -> List[int]:
+        return self.snapshot.top_tool_ids(order_by, limit)
+
+    def tool_rows(self, tool_ids: List[int], language: str, snap: Optional[MappedCatalog] = None) -> List[Dict]:
+        """可指定快照; 持有旧映射的引用期间其内存保持有效"""
+        return (snap or self.snapshot).tool_rows(tool_ids, language)
+
+    def sort_row(self, tool_id: int) -> Dict:
+        return self.snapshot.sort_row(tool_id)
+
+    def data_version(self) -> Tuple[str, datetime]:
+        """当前映射文件的版本标识: 各 worker 读同一文件, 标识一致"""
+        snap = self.snapshot
+        return (
+            f"s{snap.generation}-{int(snap.header['created_at'] * 1000)}",
+            datetime.fromtimestamp(snap.loaded_at, timezone.utc),
+        )
+
+    def resolve(self, tool_identifier: str) -> Optional[int]:
+        snap = self.snapshot
+        index = snap.resolve_index(tool_identifier)
+        return None if index is None else snap._ids[index]
+
+    def get_tool_detail(self, tool_identifier: str, language: str) -> Optional[Dict]:
+        return self.snapshot.get_tool_detail(tool_identifier, language)
+
+    def list_categories(self, language: str) -> List[Dict]:
+        return category_rows(self.snapshot, language)
+
+    def list_tags(self, language: str, type: Optional[str] = None, search: Optional[str] = None,
+                  limit: int = 100, popular: bool = False) -> List[Dict]:
+        return tag_rows(self.snapshot, language, type, search, limit, popular)
+
+    def stats(self) -> Dict[str, Any]:
+        snap = self.snapshot
+        if not snap:
+            return {"ready": False, "mode": "shared", "leader": self.leader}
+        stats = {
+            "ready": True,
+            "mode": "shared",
+            "leader": self.leader,
+            "generation": snap.generation,
+            "active_tools": snap.count,
+            "file_bytes": snap.size,
+            "loaded_at": snap.loaded_at,
+            "swaps": self.swaps,
+        }
+        if self.engine is not None:
+            stats["writes"] = self.writes
+            stats["engine"] = self.engine.stats()
+        return stats
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+流式输出工具列表
+按批次从数据源取出已格式化的工具记录, 边生成边写出:
+- ndjson:      每行一个工具 JSON
+- json-stream: 与普通响应结构相同的 {"data": [...], "pagination": {...}}, 分块写出
+内存占用只与批大小有关, 与目录规模无关
+"""
+
+import os
+import json
+from typing import AsyncIterator, List, Dict
+
+FORMAT_NDJSON = 'ndjson'
+FORMAT_JSON_STREAM = 'json-stream'
+
+STREAM_FORMATS = {
+    FORMAT_NDJSON: 'application/x-ndjson',
+    FORMAT_JSON_STREAM: 'application/json',
+}
+
+# 每批行数: 服务端游标每次 FETCH 的行数, 也是标签批量查询的粒度
+STREAM_BATCH_SIZE = int(os.getenv('STREAM_BATCH_SIZE', '500'))
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, ensure_ascii=False, default=str, separators=(',', ':'))
+
+
+async def encode_ndjson(batches: AsyncIterator[List[Dict]]) -> AsyncIterator[bytes]:
+    async for batch in batches:
+        if batch:
+            yield ''.join(_dumps(item) + '\n' for item in batch).encode('utf-8')
+
+
+async def encode_json_stream(batches: AsyncIterator[List[Dict]]) -> AsyncIterator[bytes]:
+    """分页信息在数据写完、总数确定后追加在末尾"""
+    total = 0
+    yield b'{"data":['
+    async for batch in batches:
+        if not batch:
+            continue
+        chunk = ','.join(_dumps(item) for item in batch)
+        yield (',' + chunk if total else chunk).encode('utf-8')
+        total += len(batch)
+    pagination = {
+        "page": 1, "limit": total, "total": total, "totalPages": 1,
+        "next_cursor": None, "total_source": "stream",
+    }
+    yield f'],"pagination":{_dumps(pagination)}}}'.encode('utf-8')
+
+
+def encode_stream(format: str, batches: AsyncIterator[List[Dict]]) -> AsyncIterator[bytes]:
+    if format == FORMAT_NDJSON:
+        return encode_ndjson(batches)
+    return encode_json_stream(batches)
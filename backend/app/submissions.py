@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+工具提交写入
+- slug: 有唯一索引 (sql/006_tool_submissions.sql) 时用 INSERT ... ON CONFLICT (slug) DO NOTHING 原子占用,
+  冲突时追加随机后缀重试; 未执行迁移时退回按 slug 加事务级咨询锁后先查后插
+- 标签: 提交的 tags / industry_tags 只匹配已有标签 (tag_key 或任一语言的标签名, 不区分大小写),
+  匹配不到的不自动创建, 原样返回给调用方
+- 价格说明: tool_translations.pricing_details 列存在时按语言保存
+- 联系人信息和完整提交内容: tool_submissions 表存在时保存, 供审核使用
+"""
+
+import json
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# 为 slug 加锁/写入时最多尝试的次数 (第一次用原始 slug, 之后带随机后缀)
+SLUG_ATTEMPTS = 5
+
+_TOOL_INSERT_COLUMNS = """
+    INSERT INTO tools (slug, url, page_screenshot, category_id, pricing_type, trial_available, status)
+    VALUES ($1, $2, $3, $4, $5, $6, 'pending')
+"""
+
+@dataclass
+class SubmissionSchema:
+    """启动时检测的可选迁移状态"""
+    slug_unique: bool = False
+    pricing_details: bool = False
+    submissions: bool = False
+
+async def detect_submission_schema(conn) -> SubmissionSchema:
+    """检查 tools.slug 唯一索引、tool_translations.pricing_details 列和 tool_submissions 表是否存在"""
+    row = await conn.fetchrow("""
+        SELECT
+            EXISTS (
+                SELECT 1 FROM pg_index i
+                JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = i.indkey[0]
+                WHERE i.indrelid = to_regclass('tools') AND i.indisunique
+                  AND i.indnatts = 1 AND i.indpred IS NULL AND a.attname = 'slug'
+            ) AS slug_unique,
+            EXISTS (
+                SELECT 1 FROM pg_attribute
+                WHERE attrelid = to_regclass('tool_translations')
+                  AND attname = 'pricing_details' AND NOT attisdropped
+            ) AS pricing_details,
+            to_regclass('tool_submissions') IS NOT NULL AS submissions
+    """)
+    return SubmissionSchema(
+        slug_unique=row['slug_unique'], pricing_details=row['pricing_details'], submissions=row['submissions'],
+    )
+
+def _suffixed(slug: str) -> str:
+    return f"{slug}-{str(uuid.uuid4())[:8]}"
+
+async def insert_tool(conn, schema: SubmissionSchema, slug: str, *values) -> Tuple[int, str]:
+    """在当前事务中插入 pending 工具行, 返回 (id, 实际使用的 slug)"""
+    for attempt in range(SLUG_ATTEMPTS):
+        candidate = slug if attempt == 0 else _suffixed(slug)
+        if schema.slug_unique:
+            tool_id = await conn.fetchval(
+                _TOOL_INSERT_COLUMNS + " ON CONFLICT (slug) DO NOTHING RETURNING id", candidate, *values
+            )
+        else:
+            # 锁持续到事务结束, 同一 slug 的并发提交在此串行
+            await conn.execute("SELECT pg_advisory_xact_lock(hashtext($1))", candidate)
+            if await conn.fetchval("SELECT 1 FROM tools WHERE slug = $1", candidate):
+                continue
+            tool_id = await conn.fetchval(_TOOL_INSERT_COLUMNS + " RETURNING id", candidate, *values)
+        if tool_id is not None:
+            return tool_id, candidate
+    raise RuntimeError(f"无法为 {slug} 分配唯一的 slug")
+
+async def record_submission(conn, tool_id: int, payload: Dict[str, Any]):
+    """保存联系人信息和完整提交内容 (需要 tool_submissions 表)"""
+    await conn.execute("""
+        INSERT INTO tool_submissions (tool_id, contact_email, contact_name, company_name, payload)
+        VALUES ($1, $2, $3, $4, $5::jsonb)
+    """, tool_id, payload.get('contact_email') or None, payload.get('contact_name') or None,
+        payload.get('company_name') or None, json.dumps(payload, ensure_ascii=False))
+
+def _tag_names(tag: Dict[str, str]) -> List[str]:
+    return [name.strip().lower() for name in tag.values() if name and name.strip()]
+
+def _tag_label(tag: Dict[str, str]) -> str:
+    return (tag.get('en') or next((name for name in tag.values() if name), '')).strip()
+
+async def match_tags(conn, tags: Iterable[Tuple[str, Dict[str, str]]]) -> Tuple[List[Tuple[int, str]], List[Dict[str, str]]]:
+    """把 (tag_type, {语言: 名称}) 匹配到已有标签, 返回 ([(tag_id, tag_type)], 未匹配的标签)"""
+    tags = [(tag_type, tag) for tag_type, tag in tags if _tag_names(tag)]
+    if not tags:
+        return [], []
+    names = sorted({name for _, tag in tags for name in _tag_names(tag)})
+    rows = await conn.fetch("""
+        SELECT lower(tag_key) AS name, id AS tag_id FROM tags WHERE lower(tag_key) = ANY($1::text[])
+        UNION
+        SELECT lower(tag_name), tag_id FROM tag_translations WHERE lower(tag_name) = ANY($1::text[])
+    """, names)
+    ids: Dict[str, int] = {}
+    for row in sorted(rows, key=lambda r: r['tag_id']):
+        ids.setdefault(row['name'], row['tag_id'])
+
+    matched: List[Tuple[int, str]] = []
+    unmatched: List[Dict[str, str]] = []
+    for tag_type, tag in tags:
+        tag_id: Optional[int] = next((ids[name] for name in _tag_names(tag) if name in ids), None)
+        if tag_id is None:
+            unmatched.append({"type": tag_type, "name": _tag_label(tag)})
+        elif (tag_id, tag_type) not in matched:
+            matched.append((tag_id, tag_type))
+    return matched, unmatched
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+输入联想 (typeahead) 前缀索引
+按语言分别为工具名称/标题和标签名称建立索引:
+- 文本先转小写并合并空白, 每个拉丁词的词首和每个汉字位置各产生一个后缀
+  (中文在任意字符位置都能匹配, 英文按词首前缀匹配)
+- 后缀不单独存字符串, 只存 (文本序号, 起始偏移) 并按后缀排序, 查询时用 bisect 二分出前缀区间
+- 条目按热度 (工具 view_count / 标签 usage_count) 降序编号, 编号越小越靠前;
+  区间较小时直接取区间内最小的编号, 区间很大的前缀 (如单个字母) 在构建时预先算好前 N 个
+索引构建后只读, 目录更新或定时刷新时整体替换
+"""
+
+import os
+import re
+import heapq
+import asyncio
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Optional, List, Dict, Tuple, Iterable
+
+from textsearch import CJK_RANGES
+
+# 每次最多返回的条数, 也是大区间预先保存的条数
+SUGGEST_MAX_LIMIT = 20
+
+# 区间内后缀数超过该值时使用预先算好的结果
+SCAN_LIMIT = 2048
+
+# 工具数据: id, slug, 热度, 各语言名称和标题
+SUGGEST_TOOLS_QUERY = """
+    SELECT t.id, t.slug, t.view_count, tt.language_code, tt.name, tt.title
+    FROM tools t
+    JOIN tool_translations tt ON t.id = tt.tool_id
+    WHERE t.status = 'active'
+"""
+
+# 标签数据: 各语言名称和总使用次数 (包括未使用的标签)
+SUGGEST_TAGS_QUERY = """
+    SELECT t.id, t.tag_key, ttr.language_code, ttr.tag_name, COALESCE(u.usage_count, 0) as usage_count
+    FROM tags t
+    JOIN tag_translations ttr ON t.id = ttr.tag_id
+    LEFT JOIN (
+        SELECT tag_id, COUNT(*) as usage_count FROM tool_tags GROUP BY tag_id
+    ) u ON t.id = u.tag_id
+"""
+
+
+# 后缀起点: 任意汉字, 或前一个字符不是拉丁字母/数字的字母/数字
+_START_RE = re.compile(f'[{CJK_RANGES}]|(?<![^\\W_{CJK_RANGES}])[^\\W_]')
+
+
+def normalize(text: str) -> str:
+    """转小写并把连续空白合并为一个空格"""
+    return ' '.join((text or '').lower().split())
+
+
+def suffix_starts(text: str) -> List[int]:
+    """需要建立后缀的位置: 每个汉字, 以及每个拉丁词/数字串的开头"""
+    return [match.start() for match in _START_RE.finditer(text)]
+
+
+class PrefixIndex:
+    """一类条目 (工具或标签) 在单一语言下的前缀索引, 构建后只读"""
+
+    def __init__(self, scan_limit: int = SCAN_LIMIT, top_size: int = SUGGEST_MAX_LIMIT):
+        self.scan_limit = scan_limit
+        self.top_size = top_size
+        self.payloads: List[Dict] = []       # 编号 -> 返回给前端的字典
+        self.texts: List[str] = []           # 标准化后的文本
+        self.text_ids = array('I')           # 后缀 -> 文本序号 (按后缀排序)
+        self.offsets = array('I')            # 后缀 -> 起始偏移
+        self.ranks = array('I')              # 后缀 -> 条目编号
+        self.tops: Dict[str, array] = {}     # 大区间前缀 -> 前 top_size 个编号
+
+    def __len__(self):
+        return len(self.payloads)
+
+    def _suffix(self, i: int) -> str:
+        return self.texts[self.text_ids[i]][self.offsets[i]:]
+
+    def build(self, entries: Iterable[Tuple[List[str], int, Dict]]):
+        """entries: (待匹配的文本列表, 热度, 返回内容); 热度相同按第一个文本排序"""
+        ordered = sorted(
+            ((texts, weight or 0, payload) for texts, weight, payload in entries),
+            key=lambda entry: (-entry[1], normalize(entry[0][0] if entry[0] else '')),
+        )
+        suffixes = []
+        text_ranks = []
+        for rank, (texts, _, payload) in enumerate(ordered):
+            self.payloads.append(payload)
+            for text in dict.fromkeys(normalize(text) for text in texts if text):
+                text_id = len(self.texts)
+                self.texts.append(text)
+                text_ranks.append(rank)
+                suffixes.extend((text_id, start) for start in suffix_starts(text))
+
+        suffixes.sort(key=lambda item: self.texts[item[0]][item[1]:])
+        self.text_ids = array('I', (text_id for text_id, _ in suffixes))
+        self.offsets = array('I', (start for _, start in suffixes))
+        self.ranks = array('I', (text_ranks[text_id] for text_id, _ in suffixes))
+        self.tops = {}
+        if len(self.ranks) > self.scan_limit:
+            self._collect_tops('', 0, len(self.ranks))
+        return self
+
+    def _best(self, ranks: Iterable[int]) -> List[int]:
+        return heapq.nsmallest(self.top_size, set(ranks))
+
+    def _range(self, prefix: str, lo: int = 0, hi: Optional[int] = None) -> Tuple[int, int]:
+        """以 prefix 开头的后缀区间; 截断后的后缀仍然有序, 可以直接二分"""
+        if hi is None:
+            hi = len(self.ranks)
+        size = len(prefix)
+        key = lambda i: self._suffix(i)[:size]  # noqa: E731
+        return bisect_left(range(len(self.ranks)), prefix, lo, hi, key=key), \
+            bisect_right(range(len(self.ranks)), prefix, lo, hi, key=key)
+
+    def _collect_tops(self, prefix: str, lo: int, hi: int) -> List[int]:
+        """自底向上计算区间 [lo, hi) 的前 N 个编号, 只为超过 scan_limit 的前缀保存结果"""
+        depth = len(prefix)
+        indices = range(len(self.ranks))
+        # 与前缀完全相同的后缀排在区间最前面
+        i = bisect_right(indices, prefix, lo, hi, key=lambda j: self._suffix(j)[:depth + 1])
+        candidates = list(self.ranks[lo:i])
+        while i < hi:
+            child = self._suffix(i)[:depth + 1]
+            j = bisect_right(indices, child, i, hi, key=lambda k: self._suffix(k)[:depth + 1])
+            if j - i > self.scan_limit:
+                candidates.extend(self._collect_tops(child, i, j))
+            else:
+                candidates.extend(self._best(self.ranks[i:j]))
+            i = j
+        best = self._best(candidates)
+        self.tops[prefix] = array('I', best)
+        return best
+
+    def lookup(self, query: str, limit: int) -> List[Dict]:
+        """按热度返回前 limit 个匹配条目"""
+        prefix = normalize(query)
+        if not prefix or not self.ranks:
+            return []
+        lo, hi = self._range(prefix)
+        top = self.tops.get(prefix) if hi - lo > self.scan_limit else None
+        if top is not None:
+            best = top[:limit]
+        else:
+            best = heapq.nsmallest(limit, set(self.ranks[lo:hi]))
+        return [self.payloads[rank] for rank in best]
+
+    def stats(self) -> Dict:
+        return {"entries": len(self.payloads), "suffixes": len(self.ranks), "precomputed": len(self.tops)}
+
+
+def tool_entry(tool_id: int, slug: Optional[str], view_count: Optional[int],
+               name: Optional[str], title: Optional[str]) -> Tuple[List[str], int, Dict]:
+    payload = {'id': tool_id, 'slug': slug, 'name': name, 'view_count': view_count or 0}
+    return [text for text in (name, title) if text], view_count or 0, payload
+
+
+def tag_entry(tag_key: str, tag_name: Optional[str], usage_count: int) -> Tuple[List[str], int, Dict]:
+    payload = {'tag_key': tag_key, 'tag_name': tag_name, 'usage_count': usage_count}
+    return [tag_name] if tag_name else [], usage_count, payload
+
+
+def build_indexes(tool_entries: Dict[str, List], tag_entries: Dict[str, List],
+                  scan_limit: int = SCAN_LIMIT) -> Dict[str, Dict[str, PrefixIndex]]:
+    """{语言: {'tools': 索引, 'tags': 索引}}"""
+    indexes = {}
+    for language in set(tool_entries) | set(tag_entries):
+        indexes[language] = {
+            'tools': PrefixIndex(scan_limit).build(tool_entries.get(language, [])),
+            'tags': PrefixIndex(scan_limit).build(tag_entries.get(language, [])),
+        }
+    return indexes
+
+
+def entries_from_snapshot(snapshot) -> Tuple[Dict[str, List], Dict[str, List]]:
+    tool_entries: Dict[str, List] = {}
+    for language, translations in snapshot.translations.items():
+        entries = tool_entries.setdefault(language, [])
+        for tool_id in snapshot.order:
+            translation = translations.get(tool_id)
+            if translation is None:
+                continue
+            tool = snapshot.tools[tool_id]
+            entries.append(tool_entry(tool_id, tool.get('slug'), tool.get('view_count'),
+                                      translation.get('name'), translation.get('title')))
+
+    usage: Dict[int, int] = {}
+    for (tag_id, _), count in snapshot.tag_usage.items():
+        usage[tag_id] = usage.get(tag_id, 0) + count
+    tag_entries: Dict[str, List] = {}
+    for language, names in snapshot.tag_translations.items():
+        tag_entries[language] = [
+            tag_entry(snapshot.tags[tag_id], tag_name, usage.get(tag_id, 0))
+            for tag_id, tag_name in names.items() if tag_id in snapshot.tags
+        ]
+    return tool_entries, tag_entries
+
+
+def entries_from_rows(tool_rows, tag_rows) -> Tuple[Dict[str, List], Dict[str, List]]:
+    tool_entries: Dict[str, List] = {}
+    for row in tool_rows:
+        tool_entries.setdefault(row['language_code'], []).append(
+            tool_entry(row['id'], row['slug'], row['view_count'], row['name'], row['title']))
+    tag_entries: Dict[str, List] = {}
+    for row in tag_rows:
+        tag_entries.setdefault(row['language_code'], []).append(
+            tag_entry(row['tag_key'], row['tag_name'], row['usage_count']))
+    return tool_entries, tag_entries
+
+
+class SuggestEngine:
+    """持有各语言的联想索引; 有内存目录时跟随快照重建, 否则定时从数据库加载"""
+
+    def __init__(self):
+        self.scan_limit = int(os.getenv('SUGGEST_SCAN_LIMIT', str(SCAN_LIMIT)))
+        self.refresh_interval = float(os.getenv('SUGGEST_REFRESH_INTERVAL', '300'))
+        self.indexes: Dict[str, Dict[str, PrefixIndex]] = {}
+        self.version = 0
+        self._catalog = None
+        self._pool = None
+        self._refresher: Optional[asyncio.Task] = None
+        self._rebuilding: Optional[asyncio.Task] = None
+        self._dirty = False
+
+    @property
+    def ready(self) -> bool:
+        return self.version > 0
+
+    def suggest(self, query: str, language: str, limit: int, kinds=('tools', 'tags')) -> Optional[Dict[str, List[Dict]]]:
+        """{'tools': [...], 'tags': [...]}; 该语言没有索引时返回 None"""
+        indexes = self.indexes.get(language)
+        if indexes is None:
+            return None
+        return {kind: indexes[kind].lookup(query, limit) for kind in kinds}
+
+    async def attach(self, catalog_engine):
+        """基于目录引擎当前快照建索引, 并在后续快照更新时自动重建"""
+        self._catalog = catalog_engine
+        await self.rebuild()
+        catalog_engine.add_listener(self._on_catalog_update)
+        self._report()
+
+    async def start(self, pool):
+        """没有内存目录时从数据库加载, 并按 SUGGEST_REFRESH_INTERVAL 定时刷新"""
+        self._pool = pool
+        await self.rebuild()
+        self._refresher = asyncio.create_task(self._refresh_loop())
+        self._report()
+
+    async def stop(self):
+        if self._refresher is not None:
+            self._refresher.cancel()
+
+    def _report(self):
+        sizes = ', '.join(
+            f"{lang}={len(indexes['tools'])}/{len(indexes['tags'])}" for lang, indexes in self.indexes.items()
+        )
+        print(f"✓ 联想索引已构建 (工具/标签: {sizes})")
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(max(1.0, self.refresh_interval))
+            try:
+                await self.rebuild()
+            except Exception as e:
+                print(f"✗ 联想索引刷新失败: {e}")
+
+    def _on_catalog_update(self, tool_ids):
+        if self._rebuilding is not None and not self._rebuilding.done():
+            self._dirty = True
+            return
+        self._rebuilding = asyncio.ensure_future(self._rebuild_until_clean())
+
+    async def _rebuild_until_clean(self):
+        while True:
+            self._dirty = False
+            try:
+                await self.rebuild()
+            except Exception as e:
+                print(f"✗ 联想索引重建失败: {e}")
+            if not self._dirty:
+                return
+
+    def _build_from_snapshot(self, snapshot):
+        return build_indexes(*entries_from_snapshot(snapshot), scan_limit=self.scan_limit)
+
+    def _build_from_rows(self, tool_rows, tag_rows):
+        return build_indexes(*entries_from_rows(tool_rows, tag_rows), scan_limit=self.scan_limit)
+
+    async def rebuild(self):
+        loop = asyncio.get_running_loop()
+        # 构建是纯CPU工作, 放到线程池避免阻塞事件循环
+        if self._catalog is not None:
+            self.indexes = await loop.run_in_executor(None, self._build_from_snapshot, self._catalog.snapshot)
+        else:
+            async with self._pool.acquire() as conn:
+                tool_rows = await conn.fetch(SUGGEST_TOOLS_QUERY)
+                tag_rows = await conn.fetch(SUGGEST_TAGS_QUERY)
+            self.indexes = await loop.run_in_executor(None, self._build_from_rows, tool_rows, tag_rows)
+        self.version += 1
+
+    def stats(self) -> Dict:
+        return {
+            "ready": self.ready,
+            "version": self.version,
+            "source": "catalog" if self._catalog is not None else "database",
+            "indexes": {
+                lang: {kind: index.stats() for kind, index in indexes.items()}
+                for lang, indexes in self.indexes.items()
+            },
+        }
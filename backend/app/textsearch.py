@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+多语言全文检索辅助
+- 英文: Postgres english 分词 + 词干, 最后一个词做前缀匹配
+- 中文(cn): 连续汉字切成重叠的二元组, 与 sql/003_tool_search.sql 中的 cjk_bigrams() 保持一致
+- 名称模糊匹配: pg_trgm 三元组相似度
+"""
+
+import re
+from typing import Optional, List, Tuple
+
+# 检索后端
+SEARCH_ILIKE = 'ilike'
+SEARCH_FTS = 'fts'
+SEARCH_MEMORY = 'memory'
+
+# 汉字范围, 与 SQL 函数 cjk_bigrams 的正则一致
+CJK_RANGES = '㐀-䶿一-鿿豈-﫿'
+_RUN_RE = re.compile(f'[{CJK_RANGES}]+|[^{CJK_RANGES}]+')
+_CJK_RE = re.compile(f'[{CJK_RANGES}]')
+_WORD_RE = re.compile(r'[^\W_]+')
+
+
+def is_cjk(text: str) -> bool:
+    return bool(_CJK_RE.match(text))
+
+
+def cjk_bigrams(text: str) -> List[str]:
+    """汉字连续片段切成重叠二元组, 单个汉字保留为一元, 其余部分按词切分并转小写"""
+    tokens = []
+    for run in _RUN_RE.findall(text or ''):
+        if is_cjk(run):
+            if len(run) == 1:
+                tokens.append(run)
+            else:
+                tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.extend(word.lower() for word in _WORD_RE.findall(run))
+    return tokens
+
+
+def build_tsquery(term: str, language: str) -> Optional[Tuple[str, str]]:
+    """把用户输入转换为 (regconfig, to_tsquery 文本); 无法用全文索引表达时返回 None"""
+    if language == 'cn':
+        # 单个汉字无法命中二元组索引, 交给模糊匹配
+        if any(is_cjk(run) and len(run) == 1 for run in _RUN_RE.findall(term)):
+            return None
+        tokens = cjk_bigrams(term)
+        config = 'simple'
+    else:
+        tokens = [word.lower() for word in _WORD_RE.findall(term)]
+        config = 'english'
+
+    if not tokens:
+        return None
+
+    parts = list(tokens)
+    # 最后一个拉丁词按前缀匹配, 便于输入过程中检索
+    if not is_cjk(parts[-1]):
+        parts[-1] = f"{parts[-1]}:*"
+    return config, ' & '.join(parts)
+
+
+async def detect_fts(conn) -> bool:
+    """检查 tool_translations.search_vector 是否已由迁移创建 (按 search_path 解析到的表)"""
+    return bool(await conn.fetchval("""
+        SELECT EXISTS (
+            SELECT 1 FROM pg_attribute
+            WHERE attrelid = to_regclass('tool_translations')
+              AND attname = 'search_vector' AND NOT attisdropped
+        )
+    """))
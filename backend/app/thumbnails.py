@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+截图缩略图与 WebP 变体
+/api/images/{filename}?w=400&format=webp 按允许的宽度生成缩小后的图片:
+- 缩放在进程池中执行, 不阻塞事件循环; 同一变体的并发请求只生成一次
+- 变体按内容寻址存放在磁盘缓存: <缓存目录>/<原图sha256前两位>/<sha256>-<宽度>.<格式>,
+  同一张截图换了文件名也共用变体, 原图内容变化后自然生成新变体
+- 缓存总字节数超过 IMAGE_CACHE_MAX_BYTES 时按最近访问时间 (LRU) 淘汰; 访问时间更新和淘汰删除在线程池中执行,
+  get 返回的变体在调用方 release 之前不会被淘汰
+- Pillow 为可选依赖, 未安装时返回原图
+
+预生成整个截图目录的变体:
+    python backend/app/thumbnails.py pregenerate --widths 200 400 --formats webp
+"""
+
+import os
+import sys
+import time
+import asyncio
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Optional, List, Dict, Tuple
+
+try:
+    from PIL import Image
+except ImportError:  # 可选依赖
+    Image = None
+
+from disk_lru import DiskLRU, remove_files
+
+THUMBNAILS_AVAILABLE = Image is not None
+
+# 输出格式 -> (Pillow 格式名, 文件扩展名, media_type)
+IMAGE_FORMATS = {
+    'webp': ('WEBP', 'webp', 'image/webp'),
+    'jpeg': ('JPEG', 'jpg', 'image/jpeg'),
+}
+FORMAT_ALIASES = {'jpg': 'jpeg'}
+
+DEFAULT_WIDTHS = '200,400,800'
+
+# 变体生成后在返回前被淘汰时最多重新生成的次数
+RENDER_ATTEMPTS = 3
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'lookaitools', 'images')
+
+
+def render_variant(source_path: str, target_path: str, width: int, fmt: str, quality: int) -> int:
+    """在工作进程中执行: 缩放到指定宽度 (不放大) 并写入目标文件, 返回文件字节数"""
+    pil_format = IMAGE_FORMATS[fmt][0]
+    with Image.open(source_path) as image:
+        if image.width > width:
+            height = max(1, round(image.height * width / image.width))
+            image.draft('RGB', (width, height))  # JPEG 解码时直接按 1/2、1/4、1/8 缩小, 减少解码开销
+            image = image.resize((width, height), Image.LANCZOS)
+        if pil_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        elif image.mode not in ('RGB', 'RGBA', 'L'):
+            image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        temp_path = f"{target_path}.{os.getpid()}.tmp"
+        options = {'quality': quality}
+        if pil_format == 'WEBP':
+            options['method'] = 4
+        else:
+            options['optimize'] = True
+            options['progressive'] = True
+        image.save(temp_path, pil_format, **options)
+    # 先写临时文件再改名, 读者不会看到写了一半的变体
+    os.replace(temp_path, target_path)
+    return os.path.getsize(target_path)
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ThumbnailCache:
+    """变体的生成、磁盘缓存和 LRU 淘汰"""
+
+    def __init__(
+        self,
+        cache_dir: str = DEFAULT_CACHE_DIR,
+        max_bytes: int = 512 * 1024 * 1024,
+        widths: Optional[List[int]] = None,
+        quality: int = 80,
+        workers: Optional[int] = None,
+    ):
+        self.cache_dir = cache_dir
+        self.widths = sorted(widths or [int(w) for w in DEFAULT_WIDTHS.split(',')])
+        self.quality = quality
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.lru = DiskLRU(cache_dir, max_bytes)
+        self._digests: Dict[Tuple[str, int, int], str] = {}    # (原图路径, 大小, mtime) -> sha256
+        self._pending: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls) -> 'ThumbnailCache':
+        widths = [int(w) for w in os.getenv('IMAGE_WIDTHS', DEFAULT_WIDTHS).split(',') if w.strip()]
+        workers = os.getenv('IMAGE_WORKERS')
+        return cls(
+            cache_dir=os.getenv('IMAGE_CACHE_DIR', DEFAULT_CACHE_DIR),
+            max_bytes=int(os.getenv('IMAGE_CACHE_MAX_BYTES', str(512 * 1024 * 1024))),
+            widths=widths,
+            quality=int(os.getenv('IMAGE_QUALITY', '80')),
+            workers=int(workers) if workers else None,
+        )
+
+    def parse(self, width: Optional[int], fmt: Optional[str]) -> Tuple[int, str]:
+        """校验请求参数, 返回 (宽度, 格式); 不合法时抛 ValueError"""
+        fmt = FORMAT_ALIASES.get((fmt or 'jpeg').lower(), (fmt or 'jpeg').lower())
+        if fmt not in IMAGE_FORMATS:
+            raise ValueError(f"不支持的图片格式: {fmt}")
+        if width is None:
+            # 只指定格式时使用最大的允许宽度
+            width = self.widths[-1]
+        if width not in self.widths:
+            raise ValueError(f"不支持的宽度: {width}, 可选 {self.widths}")
+        return width, fmt
+
+    # ---- 磁盘缓存 ----
+
+    def load(self):
+        """扫描缓存目录恢复 LRU 索引 (启动时在线程池中调用)"""
+        self.lru.load()
+
+    def variant_path(self, digest: str, width: int, fmt: str) -> str:
+        return os.path.join(self.cache_dir, digest[:2], f"{digest}-{width}.{IMAGE_FORMATS[fmt][1]}")
+
+    # ---- 生成 ----
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: 工作进程不继承事件循环和连接池
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=get_context('spawn'))
+        return self._executor
+
+    async def _digest(self, source_path: str) -> str:
+        stat = os.stat(source_path)
+        key = (source_path, stat.st_size, stat.st_mtime_ns)
+        digest = self._digests.get(key)
+        if digest is None:
+            loop = asyncio.get_running_loop()
+            digest = await loop.run_in_executor(None, file_digest, source_path)
+            self._digests[key] = digest
+        return digest
+
+    async def get(self, source_path: str, width: int, fmt: str, digest: Optional[str] = None) -> Tuple[str, str]:
+        """返回 (变体文件路径, media_type), 需要时在进程池中生成; 已知原图哈希时可直接传入
+        返回的变体已被固定, 发送完成后需调用 release(路径)
+        """
+        if not self.lru.loaded:
+            self.lru.load()
+        if digest is None:
+            digest = await self._digest(source_path)
+        target = self.variant_path(digest, width, fmt)
+        media_type = IMAGE_FORMATS[fmt][2]
+
+        for _ in range(RENDER_ATTEMPTS):
+            # 先固定再更新访问时间, 返回后到发送完成前不会被淘汰
+            if self.lru.pin(target):
+                if await self.lru.touch_async(target):
+                    self.hits += 1
+                    return target, media_type
+                # 文件已被其他进程删除, 当作未命中重新生成
+                self.lru.unpin(target)
+
+            pending = self._pending.get(target)
+            if pending is None:
+                self.misses += 1
+                pending = self._start_render(source_path, target, width, fmt)
+            # shield: 某个请求断开时不取消共享的生成, 也不影响登记 LRU
+            await asyncio.shield(pending)
+            # 生成完成时已登记; 等待期间被其他变体挤出时重来
+            if self.lru.pin(target):
+                return target, media_type
+        raise RuntimeError(f"缩略图生成后立即被淘汰, 请调大 IMAGE_CACHE_MAX_BYTES: {target}")
+
+    def release(self, path: str):
+        """发送完 get 返回的变体后调用"""
+        self.lru.unpin(path)
+
+    def _start_render(self, source_path: str, target: str, width: int, fmt: str) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        pending = loop.run_in_executor(self._pool(), render_variant, source_path, target, width, fmt, self.quality)
+        self._pending[target] = pending
+        pending.add_done_callback(lambda _: self._rendered(target, pending))
+        return pending
+
+    def _rendered(self, target: str, pending: asyncio.Future):
+        """生成结束 (无论是否还有请求在等) 时登记到 LRU, 保证磁盘占用被计入并能被淘汰"""
+        if self._pending.get(target) is pending:
+            del self._pending[target]
+        # 取出异常, 等待者都已断开时也不会出现 "exception was never retrieved"
+        if pending.cancelled() or pending.exception() is not None:
+            return
+        # 在事件循环中登记 (变体没有伴随文件), 被淘汰的文件在线程池中删除
+        victims = self.lru.record(target, pending.result())
+        if victims:
+            asyncio.get_running_loop().run_in_executor(None, remove_files, victims)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> Dict:
+        return {
+            "available": THUMBNAILS_AVAILABLE,
+            "widths": self.widths,
+            **self.lru.stats(),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+def pregenerate(cache: ThumbnailCache, source_dir: str, widths: List[int], formats: List[str]) -> Dict:
+    """为目录下所有图片生成变体, 已存在的跳过"""
+    cache.load()
+    jobs = []
+    seen = set()
+    skipped = 0
+    for name in sorted(os.listdir(source_dir)):
+        path = os.path.join(source_dir, name)
+        if not os.path.isfile(path) or name.startswith('.'):
+            continue
+        digest = file_digest(path)
+        for width in widths:
+            for fmt in formats:
+                target = cache.variant_path(digest, width, fmt)
+                if target in cache.lru or target in seen:
+                    skipped += 1
+                    continue
+                seen.add(target)
+                jobs.append((path, target, width, fmt))
+
+    generated, failed = 0, 0
+    with ProcessPoolExecutor(max_workers=cache.workers) as executor:
+        futures = [(job, executor.submit(render_variant, *job, cache.quality)) for job in jobs]
+        for (path, target, _, _), future in futures:
+            try:
+                cache.lru.add(target, future.result())
+                generated += 1
+            except Exception as e:
+                failed += 1
+                print(f"✗ {os.path.basename(path)}: {e}", file=sys.stderr)
+    return {"generated": generated, "failed": failed, "skipped": skipped, "bytes": cache.lru.total_bytes}
+
+
+def main():
+    from dotenv import load_dotenv
+    from settings import Settings
+
+    load_dotenv()
+    cache = ThumbnailCache.from_env()
+    parser = argparse.ArgumentParser(description="截图缩略图/WebP 变体")
+    sub = parser.add_subparsers(dest='command', required=True)
+    pre = sub.add_parser('pregenerate', help="预生成整个截图目录的变体")
+    pre.add_argument('--source', help="截图目录, 默认 FRONTEND_IMAGE_BASE_URL/toolify")
+    pre.add_argument('--widths', type=int, nargs='+', default=cache.widths)
+    pre.add_argument('--formats', nargs='+', default=['webp'], choices=sorted(IMAGE_FORMATS))
+    args = parser.parse_args()
+
+    if not THUMBNAILS_AVAILABLE:
+        raise SystemExit("✗ 未安装 Pillow, 无法生成缩略图")
+    source_dir = args.source or os.path.join(Settings.from_env().image_base_url, 'toolify')
+    if not os.path.isdir(source_dir):
+        raise SystemExit(f"✗ 截图目录不存在: {source_dir}")
+    invalid = [w for w in args.widths if w not in cache.widths]
+    if invalid:
+        raise SystemExit(f"✗ 宽度 {invalid} 不在 IMAGE_WIDTHS {cache.widths} 中")
+
+    started = time.perf_counter()
+    result = pregenerate(cache, source_dir, args.widths, args.formats)
+    print(f"✓ 生成 {result['generated']} 个变体, 跳过 {result['skipped']}, 失败 {result['failed']}, "
+          f"缓存共 {result['bytes'] / 1024 / 1024:.1f} MB, 耗时 {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
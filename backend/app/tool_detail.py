@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+工具详情查询
+- single:     一条语句取回工具行、通用/行业标签和功能特性 (聚合子查询), 一次网络往返
+- pipelined:  三条原有查询按标识符并发发出 (各占一个连接池连接), 耗时约为一次往返
+- sequential: 原有的三次顺序查询
+由 DETAIL_QUERY_MODE 选择, 默认 single; 三种模式返回结构相同的字典, 交给 format_tool_detail 格式化
+批量详情按 = ANY($1) 查询, 查询条数与请求的工具数无关
+"""
+
+import os
+import asyncio
+from typing import Optional, Dict, List
+
+DETAIL_SINGLE = 'single'
+DETAIL_PIPELINED = 'pipelined'
+DETAIL_SEQUENTIAL = 'sequential'
+DETAIL_QUERY_MODES = (DETAIL_SINGLE, DETAIL_PIPELINED, DETAIL_SEQUENTIAL)
+
+# 工具行: $1 语言, $2 slug 或 id 文本
+_TOOL_COLUMNS = """
+    t.*,
+    c.category_key,
+    ct.category_name, ct.category_description,
+    tt.name, tt.title, tt.description, tt.long_description,
+    tt.use_cases, tt.target_audience, tt.subcategory
+"""
+
+_TOOL_JOINS = """
+    FROM tools t
+    LEFT JOIN categories c ON t.category_id = c.id
+    LEFT JOIN tool_translations tt ON t.id = tt.tool_id AND tt.language_code = $1
+    LEFT JOIN category_translations ct ON c.id = ct.category_id AND ct.language_code = $1
+"""
+
+_TOOL_FROM = f"""
+    {_TOOL_JOINS}
+    WHERE t.status = 'active' AND (t.slug = $2 OR t.id::text = $2)
+"""
+
+# 批量: $2 为标识符数组
+_BATCH_FROM = f"""
+    {_TOOL_JOINS}
+    WHERE t.status = 'active' AND (t.slug = ANY($2::text[]) OR t.id::text = ANY($2::text[]))
+"""
+
+TOOL_QUERY = f"SELECT {_TOOL_COLUMNS} {_TOOL_FROM}"
+
+BATCH_TOOLS_QUERY = f"SELECT {_TOOL_COLUMNS} {_BATCH_FROM}"
+
+_AGGREGATED_COLUMNS = """
+        ARRAY(
+            SELECT ttr.tag_name
+            FROM tool_tags tg
+            JOIN tag_translations ttr ON tg.tag_id = ttr.tag_id AND ttr.language_code = $1
+            WHERE tg.tool_id = t.id AND tg.tag_type = 'general'
+        ) AS tags,
+        ARRAY(
+            SELECT ttr.tag_name
+            FROM tool_tags tg
+            JOIN tag_translations ttr ON tg.tag_id = ttr.tag_id AND ttr.language_code = $1
+            WHERE tg.tool_id = t.id AND tg.tag_type = 'industry'
+        ) AS industry_tags,
+        ARRAY(
+            SELECT f.feature_text
+            FROM tool_features f
+            WHERE f.tool_id = t.id AND f.language_code = $1
+            ORDER BY f.sort_order
+        ) AS key_features
+"""
+
+SINGLE_QUERY = f"SELECT {_TOOL_COLUMNS}, {_AGGREGATED_COLUMNS} {_TOOL_FROM}"
+
+BATCH_SINGLE_QUERY = f"SELECT {_TOOL_COLUMNS}, {_AGGREGATED_COLUMNS} {_BATCH_FROM}"
+
+TAGS_QUERY = """
+    SELECT ttr.tag_name, tt.tag_type
+    FROM tool_tags tt
+    JOIN tag_translations ttr ON tt.tag_id = ttr.tag_id
+    WHERE tt.tool_id = $1 AND ttr.language_code = $2
+"""
+
+FEATURES_QUERY = """
+    SELECT feature_text
+    FROM tool_features
+    WHERE tool_id = $1 AND language_code = $2
+    ORDER BY sort_order
+"""
+
+BATCH_TAGS_QUERY = """
+    SELECT tt.tool_id, ttr.tag_name, tt.tag_type
+    FROM tool_tags tt
+    JOIN tag_translations ttr ON tt.tag_id = ttr.tag_id
+    WHERE tt.tool_id = ANY($1) AND ttr.language_code = $2
+"""
+
+BATCH_FEATURES_QUERY = """
+    SELECT tool_id, feature_text
+    FROM tool_features
+    WHERE tool_id = ANY($1) AND language_code = $2
+    ORDER BY tool_id, sort_order
+"""
+
+# 并发模式下标签/功能查询不能等工具行返回, 直接按标识符解析工具ID
+_TOOL_ID_SUBQUERY = """(
+    SELECT t.id FROM tools t
+    WHERE t.status = 'active' AND (t.slug = $1 OR t.id::text = $1)
+    LIMIT 1
+)"""
+
+PIPELINED_TAGS_QUERY = f"""
+    SELECT ttr.tag_name, tt.tag_type
+    FROM tool_tags tt
+    JOIN tag_translations ttr ON tt.tag_id = ttr.tag_id
+    WHERE tt.tool_id = {_TOOL_ID_SUBQUERY} AND ttr.language_code = $2
+"""
+
+PIPELINED_FEATURES_QUERY = f"""
+    SELECT feature_text
+    FROM tool_features
+    WHERE tool_id = {_TOOL_ID_SUBQUERY} AND language_code = $2
+    ORDER BY sort_order
+"""
+
+
+def _assemble(row, tags, features) -> Dict:
+    tool_data = dict(row)
+    tool_data['tags'] = [tag['tag_name'] for tag in tags if tag['tag_type'] == 'general']
+    tool_data['industry_tags'] = [tag['tag_name'] for tag in tags if tag['tag_type'] == 'industry']
+    tool_data['key_features'] = [f['feature_text'] for f in features]
+    return tool_data
+
+
+def _aggregated(row) -> Dict:
+    tool_data = dict(row)
+    for column in ('tags', 'industry_tags', 'key_features'):
+        tool_data[column] = list(tool_data[column] or [])
+    return tool_data
+
+
+def _match_identifiers(tools: List[Dict], identifiers: List[str]) -> List[Optional[Dict]]:
+    """按请求顺序对应结果, slug 优先于 id 文本; 未找到的位置为 None"""
+    by_identifier = {}
+    for tool in tools:
+        by_identifier.setdefault(str(tool['id']), tool)
+    for tool in tools:
+        if tool.get('slug'):
+            by_identifier[tool['slug']] = tool
+    return [by_identifier.get(identifier) for identifier in identifiers]
+
+
+async def fetch_single(conn, tool_identifier: str, language: str) -> Optional[Dict]:
+    row = await conn.fetchrow(SINGLE_QUERY, language, tool_identifier)
+    if not row:
+        return None
+    return _aggregated(row)
+
+
+async def fetch_sequential(conn, tool_identifier: str, language: str) -> Optional[Dict]:
+    row = await conn.fetchrow(TOOL_QUERY, language, tool_identifier)
+    if not row:
+        return None
+    tags = await conn.fetch(TAGS_QUERY, row['id'], language)
+    features = await conn.fetch(FEATURES_QUERY, row['id'], language)
+    return _assemble(row, tags, features)
+
+
+async def fetch_pipelined(pool, tool_identifier: str, language: str) -> Optional[Dict]:
+    async def run(method, query, *args):
+        async with pool.acquire() as conn:
+            return await getattr(conn, method)(query, *args)
+
+    row, tags, features = await asyncio.gather(
+        run('fetchrow', TOOL_QUERY, language, tool_identifier),
+        run('fetch', PIPELINED_TAGS_QUERY, tool_identifier, language),
+        run('fetch', PIPELINED_FEATURES_QUERY, tool_identifier, language),
+    )
+    if not row:
+        return None
+    return _assemble(row, tags, features)
+
+
+async def fetch_many_single(conn, identifiers: List[str], language: str) -> List[Optional[Dict]]:
+    rows = await conn.fetch(BATCH_SINGLE_QUERY, language, list(set(identifiers)))
+    return _match_identifiers([_aggregated(row) for row in rows], identifiers)
+
+
+async def fetch_many(conn, identifiers: List[str], language: str) -> List[Optional[Dict]]:
+    """工具行、标签、功能各一条 = ANY 查询"""
+    rows = await conn.fetch(BATCH_TOOLS_QUERY, language, list(set(identifiers)))
+    tool_ids = [row['id'] for row in rows]
+    tags: Dict[int, List] = {}
+    features: Dict[int, List] = {}
+    if tool_ids:
+        for tag in await conn.fetch(BATCH_TAGS_QUERY, tool_ids, language):
+            tags.setdefault(tag['tool_id'], []).append(tag)
+        for feature in await conn.fetch(BATCH_FEATURES_QUERY, tool_ids, language):
+            features.setdefault(feature['tool_id'], []).append(feature)
+    tools = [_assemble(row, tags.get(row['id'], []), features.get(row['id'], [])) for row in rows]
+    return _match_identifiers(tools, identifiers)
+
+
+class ToolDetailFetcher:
+    """按配置的模式查询工具详情"""
+
+    def __init__(self, mode: Optional[str] = None):
+        mode = (mode or os.getenv('DETAIL_QUERY_MODE', DETAIL_SINGLE)).lower()
+        if mode not in DETAIL_QUERY_MODES:
+            print(f"✗ 未知的 DETAIL_QUERY_MODE={mode}, 使用 {DETAIL_SINGLE}")
+            mode = DETAIL_SINGLE
+        self.mode = mode
+
+    def statements(self) -> List[str]:
+        """当前模式下单个和批量详情使用的语句, 供连接预热"""
+        if self.mode == DETAIL_SINGLE:
+            return [SINGLE_QUERY, BATCH_SINGLE_QUERY]
+        if self.mode == DETAIL_PIPELINED:
+            details = [TOOL_QUERY, PIPELINED_TAGS_QUERY, PIPELINED_FEATURES_QUERY]
+        else:
+            details = [TOOL_QUERY, TAGS_QUERY, FEATURES_QUERY]
+        return details + [BATCH_TOOLS_QUERY, BATCH_TAGS_QUERY, BATCH_FEATURES_QUERY]
+
+    async def fetch(self, pool, tool_identifier: str, language: str) -> Optional[Dict]:
+        if self.mode == DETAIL_PIPELINED:
+            return await fetch_pipelined(pool, tool_identifier, language)
+        async with pool.acquire() as conn:
+            if self.mode == DETAIL_SEQUENTIAL:
+                return await fetch_sequential(conn, tool_identifier, language)
+            return await fetch_single(conn, tool_identifier, language)
+
+    async def fetch_many(self, pool, identifiers: List[str], language: str) -> List[Optional[Dict]]:
+        """批量详情, 结果与 identifiers 一一对应; single 模式一条语句, 其余模式三条"""
+        async with pool.acquire() as conn:
+            if self.mode == DETAIL_SINGLE:
+                return await fetch_many_single(conn, identifiers, language)
+            return await fetch_many(conn, identifiers, language)
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+预先格式化的工具列表记录
+按 (tool_id, language) 保存 format_tool_response 的结果, 列表接口直接按ID取用:
+- 局部更新只丢弃变更工具的记录, 下次访问时重新生成
+- 全量刷新与旧快照逐个比较, 分类/标签等共享数据未变时同样只丢弃有变化的工具;
+  共享数据变化时才整体清空 (访问时按需生成), 同时在线程池中为所有活跃工具预生成
+- 只为快照中存在翻译的语言保存记录, 其他语言参数按需生成不缓存, 内存不随请求参数增长
+记录被多个响应共享, 调用方需要附加字段 (如 relevance) 时应先复制
+"""
+
+import asyncio
+from typing import Callable, Dict, List, Optional, Set
+
+# 记录中除工具本身外还依赖的快照数据, 任一变化时全部记录失效
+SHARED_ATTRIBUTES = ('categories', 'category_translations', 'tags', 'tag_translations')
+
+
+class ToolRecordStore:
+    """跟随目录引擎快照维护的格式化记录"""
+
+    def __init__(self, formatter: Callable[[Dict, str], Dict]):
+        self.formatter = formatter
+        self.records: Dict[str, Dict[int, Dict]] = {}  # lang -> tool_id -> 格式化记录
+        self.builds = 0
+        self.warmups = 0
+        self._catalog = None
+        self._snapshot = None  # 当前记录对应的快照
+        self._warming: Optional[asyncio.Task] = None
+        self._dirty = False
+
+    @property
+    def ready(self) -> bool:
+        return self._catalog is not None and self._catalog.ready
+
+    async def attach(self, catalog_engine):
+        """基于目录引擎当前快照预生成记录, 并跟随后续更新"""
+        self._catalog = catalog_engine
+        self._snapshot = catalog_engine.snapshot
+        catalog_engine.add_listener(self._on_catalog_update)
+        await self.warm()
+        sizes = ', '.join(f"{lang}={len(records)}" for lang, records in self.records.items())
+        print(f"✓ 工具记录已预生成 ({sizes})")
+
+    def get_many(self, tool_ids: List[int], language: str) -> List[Dict]:
+        """按ID顺序取记录, 缺失的从当前快照生成并保存"""
+        if language not in self._catalog.snapshot.translations:
+            return [self.formatter(row, language) for row in self._catalog.tool_rows(tool_ids, language)]
+        records = self.records.setdefault(language, {})
+        missing = [tool_id for tool_id in tool_ids if tool_id not in records]
+        if missing:
+            for row in self._catalog.tool_rows(missing, language):
+                records[row['id']] = self.formatter(row, language)
+            self.builds += len(missing)
+        return [records[tool_id] for tool_id in tool_ids]
+
+    def _on_catalog_update(self, tool_ids):
+        old, self._snapshot = self._snapshot, self._catalog.snapshot
+        if tool_ids is None and old is not None:
+            tool_ids = changed_tools(old, self._snapshot)
+        if tool_ids is not None:
+            for records in self.records.values():
+                for tool_id in tool_ids:
+                    records.pop(tool_id, None)
+            if self._warming is not None and not self._warming.done():
+                # 正在预生成的结果基于旧快照, 完成后会被丢弃, 需要重来
+                self._dirty = True
+            return
+        self.reset()
+
+    def reset(self):
+        """丢弃全部记录并在后台重新预生成 (目录全量刷新, 或格式化依赖的外部数据变化)"""
+        # 先清空保证不返回旧数据, 再在后台预生成
+        self.records = {}
+        if self._warming is not None and not self._warming.done():
+            self._dirty = True
+            return
+        self._warming = asyncio.ensure_future(self._warm_until_clean())
+
+    async def _warm_until_clean(self):
+        while True:
+            self._dirty = False
+            try:
+                await self.warm()
+            except Exception as e:
+                print(f"✗ 工具记录预生成失败: {e}")
+            if not self._dirty:
+                return
+
+    def _build_all(self, snap) -> Dict[str, Dict[int, Dict]]:
+        built = {}
+        for language in snap.translations:
+            rows = self._catalog.tool_rows(snap.order, language, snap)
+            built[language] = {row['id']: self.formatter(row, language) for row in rows}
+        return built
+
+    async def warm(self):
+        """为快照中的所有活跃工具生成记录; 生成期间快照已变化则丢弃结果"""
+        snap = self._catalog.snapshot
+        loop = asyncio.get_running_loop()
+        # 格式化是纯CPU工作, 放到线程池避免阻塞事件循环
+        built = await loop.run_in_executor(None, self._build_all, snap)
+        if self._catalog.snapshot is not snap:
+            return
+        for language, records in built.items():
+            # 生成期间按需写入的记录基于同一快照, 与预生成结果一致
+            records.update(self.records.get(language, {}))
+            self.records[language] = records
+        self.warmups += 1
+
+    def stats(self) -> Dict:
+        return {
+            "ready": self.ready,
+            "records": {lang: len(records) for lang, records in self.records.items()},
+            "builds": self.builds,
+            "warmups": self.warmups,
+        }
+
+
+def changed_tools(old, new) -> Optional[Set[int]]:
+    """比较两个全量快照, 返回行、翻译、标签或功能有变化的工具; 共享数据变化时返回 None"""
+    if any(getattr(old, name) != getattr(new, name) for name in SHARED_ATTRIBUTES):
+        return None
+    if set(old.translations) != set(new.translations):
+        return None
+    changed = {
+        tool_id for tool_id in old.tools.keys() | new.tools.keys()
+        if old.tools.get(tool_id) != new.tools.get(tool_id)
+        or old.tool_tags.get(tool_id) != new.tool_tags.get(tool_id)
+    }
+    for language, translations in new.translations.items():
+        previous = old.translations[language]
+        changed.update(
+            tool_id for tool_id in previous.keys() | translations.keys()
+            if previous.get(tool_id) != translations.get(tool_id)
+        )
+    changed.update(
+        key[0] for key in old.features.keys() | new.features.keys()
+        if old.features.get(key) != new.features.get(key)
+    )
+    return changed
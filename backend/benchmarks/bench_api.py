@@ -0,0 +1,805 @@
+#!/usr/bin/env python3
+"""
+API 负载基准: 合成双语目录 + 真实 uvicorn 进程 + 可配置的并发请求组合
+
+用法:
+    # 建表并灌入 1k/10k/100k 个工具 (每种规模一个 schema: bench_1000 ...; 已是同一种子的数据时跳过)
+    python benchmarks/bench_api.py seed --dsn "postgresql://postgres@/postgres?host=/tmp/pgdata" --sizes 1000 10000 100000
+
+    # 启动 API, 预热后按请求组合压测, 结果 JSON 写入文件
+    python benchmarks/bench_api.py run --dsn ... --size 10000 --concurrency 16 --duration 20 \\
+        --mix list=20,search=10,deep_page=5,all=2,detail=15,related=8,images=8 \\
+        --env CATALOG_ENGINE=memory --output head.json
+
+    # 对比两次结果 (如两个提交各跑一次), 超出容差时退出码为 1
+    python benchmarks/bench_api.py compare base.json head.json --tolerance 10
+
+数据:
+- 基础表 (tools / categories / tool_translations / category_translations / tags / tag_translations /
+  tool_tags / tool_features) 由本脚本创建, 随后按顺序执行 backend/sql 下的迁移并 ANALYZE
+- 数据来自 synthetic.py, 同一种子完全相同; 标签使用近似 Zipf 分布, 少数标签覆盖大部分工具
+- API 通过 DSN 参数 search_path=bench_<规模>,public 使用对应 schema, 不影响 public 下的数据
+
+压测:
+- API 在子进程中运行 (--app-dir 可指向另一个提交的 backend/app, 用同一份数据对比), --env 追加环境变量
+- 每个请求类型分别统计吞吐、p50/p95/p99 和状态码; submit 会写入 pending 工具, 默认不在组合中, 结束后清理
+- 每请求的数据库语句数: 预热后按类型顺序发送少量请求, 读取慢查询日志 (SLOW_QUERY_LOG) 的语句计数;
+  多 worker 时在单独的单 worker 进程上测量; 目标代码没有慢查询日志时为 null
+- 请求由 httpx 发出 (需安装), 图片请求使用 Pillow 生成的截图 (未安装时跳过 images)
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import signal
+import asyncio
+import argparse
+import secrets
+import tempfile
+import statistics
+import subprocess
+from datetime import timezone
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from typing import Optional, List, Dict, Any
+
+import asyncpg
+
+try:
+    import httpx
+except ImportError:  # 可选依赖
+    httpx = None
+
+try:
+    from PIL import Image
+except ImportError:  # 可选依赖
+    Image = None
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+from synthetic import (  # noqa: E402
+    EN_WORDS, CN_WORDS, generate_categories, generate_tags, generate_tools, search_terms,
+)
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_APP_DIR = os.path.join(BENCH_DIR, '..', 'app')
+SQL_DIR = os.path.join(BENCH_DIR, '..', 'sql')
+
+# 数据格式变化时加一, 已灌入的 schema 会重建
+GENERATOR_VERSION = 1
+
+BASE_SCHEMA = """
+CREATE TABLE categories (
+    id serial PRIMARY KEY,
+    category_key text UNIQUE NOT NULL,
+    sort_order int
+);
+CREATE TABLE category_translations (
+    category_id int REFERENCES categories(id) ON DELETE CASCADE,
+    language_code text,
+    category_name text,
+    category_description text,
+    PRIMARY KEY (category_id, language_code)
+);
+CREATE TABLE tools (
+    id serial PRIMARY KEY,
+    slug text UNIQUE,
+    url text,
+    page_screenshot text,
+    category_id int REFERENCES categories(id),
+    pricing_type text,
+    rating numeric(3, 2) DEFAULT 0,
+    view_count int DEFAULT 0,
+    featured boolean DEFAULT false,
+    trial_available boolean DEFAULT false,
+    status text DEFAULT 'active',
+    created_at timestamptz DEFAULT now(),
+    updated_at timestamptz DEFAULT now()
+);
+CREATE TABLE tool_translations (
+    tool_id int REFERENCES tools(id) ON DELETE CASCADE,
+    language_code text,
+    name text,
+    title text,
+    description text,
+    long_description text,
+    use_cases text,
+    target_audience text,
+    subcategory text,
+    PRIMARY KEY (tool_id, language_code)
+);
+CREATE TABLE tags (
+    id serial PRIMARY KEY,
+    tag_key text UNIQUE NOT NULL
+);
+CREATE TABLE tag_translations (
+    tag_id int REFERENCES tags(id) ON DELETE CASCADE,
+    language_code text,
+    tag_name text,
+    PRIMARY KEY (tag_id, language_code)
+);
+CREATE TABLE tool_tags (
+    tool_id int REFERENCES tools(id) ON DELETE CASCADE,
+    tag_id int REFERENCES tags(id) ON DELETE CASCADE,
+    tag_type text,
+    PRIMARY KEY (tool_id, tag_id, tag_type)
+);
+CREATE TABLE tool_features (
+    tool_id int REFERENCES tools(id) ON DELETE CASCADE,
+    language_code text,
+    feature_text text,
+    sort_order int
+);
+CREATE INDEX idx_tools_category ON tools (category_id);
+CREATE INDEX idx_tool_tags_tag ON tool_tags (tag_id);
+CREATE INDEX idx_tool_features_tool ON tool_features (tool_id, language_code);
+CREATE TABLE bench_meta (
+    tools int NOT NULL,
+    seed int NOT NULL,
+    generator_version int NOT NULL,
+    seeded_at timestamptz NOT NULL DEFAULT now()
+);
+"""
+
+# 默认请求组合 (权重); submit 写库, 需显式加入
+DEFAULT_MIX = {
+    'list': 20, 'filter': 10, 'search': 12, 'deep_page': 5, 'cursor': 4, 'all': 2,
+    'detail': 15, 'batch': 3, 'related': 8, 'categories': 4, 'tags': 4, 'homepage': 5,
+    'suggest': 6, 'images': 6, 'submit': 0,
+}
+
+# 每种请求类型测量语句数时发送的次数
+CALIBRATION_REQUESTS = 20
+
+# 生成的截图数量上限 (图片请求只访问这些工具)
+IMAGE_COUNT = 200
+
+SUBMIT_SLUG_PREFIX = 'bench-submit'
+
+
+def schema_name(size: int) -> str:
+    return f"bench_{size}"
+
+
+def with_search_path(dsn: str, schema: str) -> str:
+    """在 DSN 上附加 search_path; asyncpg 把未知的 DSN 参数作为会话设置"""
+    parts = urlsplit(dsn)
+    query = [(k, v) for k, v in parse_qsl(parts.query) if k != 'search_path']
+    query.append(('search_path', f"{schema},public"))
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def percentile(ordered: List[float], pct: float) -> float:
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+# ---- 灌数据 ----
+
+async def seed_schema(dsn: str, size: int, seed: int, force: bool = False) -> Dict[str, Any]:
+    schema = schema_name(size)
+    conn = await asyncpg.connect(dsn, server_settings={'search_path': f"{schema},public"})
+    try:
+        if not force:
+            exists = await conn.fetchval("SELECT to_regclass($1) IS NOT NULL", f"{schema}.bench_meta")
+            if exists:
+                meta = await conn.fetchrow(f"SELECT tools, seed, generator_version FROM {schema}.bench_meta")
+                if meta and tuple(meta) == (size, seed, GENERATOR_VERSION):
+                    print(f"✓ {schema} 已是种子 {seed} 的数据, 跳过", file=sys.stderr)
+                    return {"schema": schema, "tools": size, "seeded": False}
+
+        started = time.perf_counter()
+        await conn.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE; CREATE SCHEMA {schema}")
+        await conn.execute(BASE_SCHEMA)
+
+        categories = generate_categories()
+        await conn.copy_records_to_table(
+            'categories', columns=['id', 'category_key', 'sort_order'],
+            records=[(index + 1, c['key'], c['sort_order']) for index, c in enumerate(categories)],
+        )
+        await conn.copy_records_to_table(
+            'category_translations',
+            columns=['category_id', 'language_code', 'category_name', 'category_description'],
+            records=[
+                (index + 1, language, t['name'], t['description'])
+                for index, c in enumerate(categories) for language, t in c['translations'].items()
+            ],
+        )
+        tags = generate_tags(seed)
+        await conn.copy_records_to_table(
+            'tags', columns=['id', 'tag_key'], records=[(index + 1, t['key']) for index, t in enumerate(tags)],
+        )
+        await conn.copy_records_to_table(
+            'tag_translations', columns=['tag_id', 'language_code', 'tag_name'],
+            records=[
+                (index + 1, language, name)
+                for index, t in enumerate(tags) for language, name in t['translations'].items()
+            ],
+        )
+
+        # 分批写入, 100k 规模时不在内存中保留全部记录
+        batch_size = 5000
+        tools, translations, tool_tags, features = [], [], [], []
+
+        async def flush():
+            await conn.copy_records_to_table('tools', columns=[
+                'id', 'slug', 'url', 'page_screenshot', 'category_id', 'pricing_type', 'rating', 'view_count',
+                'featured', 'trial_available', 'status', 'created_at', 'updated_at',
+            ], records=tools)
+            await conn.copy_records_to_table('tool_translations', columns=[
+                'tool_id', 'language_code', 'name', 'title', 'description', 'long_description',
+                'use_cases', 'target_audience', 'subcategory',
+            ], records=translations)
+            await conn.copy_records_to_table('tool_tags', columns=['tool_id', 'tag_id', 'tag_type'], records=tool_tags)
+            await conn.copy_records_to_table(
+                'tool_features', columns=['tool_id', 'language_code', 'feature_text', 'sort_order'], records=features,
+            )
+            for rows in (tools, translations, tool_tags, features):
+                rows.clear()
+
+        for tool in generate_tools(size, seed=seed):
+            created_at = tool['created_at'].replace(tzinfo=timezone.utc)
+            category = categories[tool['category_index']]
+            tools.append((
+                tool['id'], tool['slug'], tool['url'], tool['page_screenshot'], tool['category_index'] + 1,
+                tool['pricing_type'], tool['rating'], tool['view_count'], tool['featured'],
+                tool['trial_available'], tool['status'], created_at, created_at,
+            ))
+            for language, t in tool['translations'].items():
+                translations.append((
+                    tool['id'], language, t['name'], t['title'], t['description'], t['long_description'],
+                    None, None, category['translations'][language]['name'],
+                ))
+            tool_tags.extend((tool['id'], tag + 1, tag_type) for tag, tag_type in tool['tags'])
+            for language, items in tool['features'].items():
+                features.extend((tool['id'], language, text, order) for order, text in enumerate(items, 1))
+            if len(tools) >= batch_size:
+                await flush()
+        if tools:
+            await flush()
+
+        for table in ('categories', 'tags', 'tools'):
+            await conn.execute(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT max(id) FROM {table}))")
+        await conn.execute(
+            "INSERT INTO bench_meta (tools, seed, generator_version) VALUES ($1, $2, $3)",
+            size, seed, GENERATOR_VERSION,
+        )
+        loaded = time.perf_counter() - started
+
+        # 扩展装在 public, 避免随 bench schema 一起删除
+        try:
+            await conn.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm SCHEMA public")
+        except asyncpg.PostgresError as e:
+            print(f"✗ 创建 pg_trgm 扩展失败: {e}", file=sys.stderr)
+        migrations = {}
+        for filename in sorted(f for f in os.listdir(SQL_DIR) if f.endswith('.sql')):
+            with open(os.path.join(SQL_DIR, filename), encoding='utf-8') as f:
+                sql = f.read()
+            try:
+                await conn.execute(sql)
+                migrations[filename] = "applied"
+            except asyncpg.PostgresError as e:
+                migrations[filename] = f"failed: {str(e).splitlines()[0]}"
+                print(f"✗ 迁移 {filename} 执行失败: {e}", file=sys.stderr)
+        await conn.execute("ANALYZE")
+        print(f"✓ {schema}: {size} 个工具, 灌数据 {loaded:.1f}s, 总计 {time.perf_counter() - started:.1f}s",
+              file=sys.stderr)
+        return {"schema": schema, "tools": size, "seeded": True, "load_seconds": round(loaded, 2),
+                "migrations": migrations}
+    finally:
+        await conn.close()
+
+
+# ---- 截图 ----
+
+def prepare_images(directory: str, tool_ids: List[int]) -> List[str]:
+    """为前 IMAGE_COUNT 个工具生成截图 (toolify/<slug>.jpg), 返回文件名列表"""
+    if Image is None:
+        return []
+    target = os.path.join(directory, 'toolify')
+    os.makedirs(target, exist_ok=True)
+    names = []
+    for tool_id in tool_ids[:IMAGE_COUNT]:
+        name = f"tool-{tool_id}.jpg"
+        path = os.path.join(target, name)
+        if not os.path.exists(path):
+            rnd = random.Random(tool_id)
+            image = Image.new('RGB', (1280, 800), tuple(rnd.randrange(256) for _ in range(3)))
+            # 加一些块状噪声, 让文件大小接近真实截图
+            for _ in range(60):
+                x, y = rnd.randrange(1280), rnd.randrange(800)
+                block = Image.effect_noise((rnd.randrange(40, 240), rnd.randrange(20, 120)), 64).convert('RGB')
+                image.paste(block, (x, y))
+            image.save(path, 'JPEG', quality=85)
+        names.append(name)
+    return names
+
+
+# ---- API 进程 ----
+
+class ApiServer:
+    """在子进程中运行 uvicorn, 等待健康检查通过"""
+
+    def __init__(self, app_dir: str, port: int, workers: int, env: Dict[str, str], log_path: str):
+        self.app_dir = os.path.abspath(app_dir)
+        self.port = port
+        self.workers = workers
+        self.env = env
+        self.log_path = log_path
+        self.process: Optional[subprocess.Popen] = None
+        self.base_url = f"http://127.0.0.1:{port}"
+
+    async def __aenter__(self) -> 'ApiServer':
+        self.log = open(self.log_path, 'a')
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', 'main:app', '--host', '127.0.0.1', '--port', str(self.port),
+             '--workers', str(self.workers), '--log-level', 'warning'],
+            cwd=self.app_dir, env={**os.environ, **self.env}, stdout=self.log, stderr=subprocess.STDOUT,
+            start_new_session=True,
+        )
+        started = time.perf_counter()
+        async with httpx.AsyncClient(timeout=5) as client:
+            while time.perf_counter() - started < 120:
+                if self.process.poll() is not None:
+                    raise SystemExit(f"✗ API 进程退出 (退出码 {self.process.returncode}), 日志: {self.log_path}")
+                try:
+                    response = await client.get(f"{self.base_url}/health")
+                    if response.status_code == 200 and response.json().get('status') == 'healthy':
+                        self.startup_seconds = time.perf_counter() - started
+                        return self
+                except httpx.HTTPError:
+                    pass
+                await asyncio.sleep(0.25)
+        await self.__aexit__(None, None, None)
+        raise SystemExit(f"✗ API 启动超时, 日志: {self.log_path}")
+
+    async def __aexit__(self, *exc):
+        if self.process is not None and self.process.poll() is None:
+            os.killpg(self.process.pid, signal.SIGTERM)
+            try:
+                self.process.wait(timeout=20)
+            except subprocess.TimeoutExpired:
+                os.killpg(self.process.pid, signal.SIGKILL)
+                self.process.wait()
+        self.log.close()
+
+
+# ---- 请求类型 ----
+
+class Workload:
+    """请求目标数据 (来自数据库, 与灌入的数据一致) 和各请求类型"""
+
+    def __init__(self, tool_ids: List[int], tag_keys: List[str], category_keys: List[str], page_size: int = 12):
+        self.tool_ids = tool_ids
+        self.tag_keys = tag_keys          # 按使用次数降序, 抽样时偏向热门标签
+        self.category_keys = category_keys
+        self.images: List[str] = []
+        self.page_size = page_size
+        self.terms = search_terms(count=500)
+
+    @classmethod
+    async def load(cls, dsn: str) -> 'Workload':
+        conn = await asyncpg.connect(dsn)
+        try:
+            tool_ids = [r['id'] for r in await conn.fetch("SELECT id FROM tools WHERE status = 'active' ORDER BY id")]
+            tag_keys = [r['tag_key'] for r in await conn.fetch("""
+                SELECT t.tag_key FROM tags t JOIN tool_tags tt ON tt.tag_id = t.id
+                GROUP BY t.tag_key ORDER BY COUNT(*) DESC, t.tag_key
+            """)]
+            category_keys = [r['category_key'] for r in await conn.fetch(
+                "SELECT category_key FROM categories ORDER BY sort_order"
+            )]
+        finally:
+            await conn.close()
+        return cls(tool_ids, tag_keys, category_keys)
+
+    def _tool(self, rnd: random.Random) -> int:
+        return rnd.choice(self.tool_ids)
+
+    def _tag(self, rnd: random.Random) -> str:
+        # 热门标签更常被筛选
+        return self.tag_keys[min(int(rnd.paretovariate(1.0)) - 1, len(self.tag_keys) - 1)]
+
+    def _language(self, rnd: random.Random) -> str:
+        return 'cn' if rnd.random() < 0.3 else 'en'
+
+    async def run(self, kind: str, client, rnd: random.Random, record):
+        """执行一次该类型的操作; record(kind, response, seconds) 记录每个 HTTP 请求"""
+        if kind == 'cursor':
+            # 游标翻页: 连续取三页
+            cursor = ''
+            for _ in range(3):
+                response = await timed_get(client, kind, '/api/tools', {'cursor': cursor}, record)
+                cursor = (response.json().get('pagination') or {}).get('next_cursor') if response.status_code == 200 else None
+                if not cursor:
+                    break
+            return
+        if kind == 'submit':
+            await timed_post(client, kind, '/api/tools/submit', submission(rnd), record)
+            return
+        path, params = self.request(kind, rnd)
+        await timed_get(client, kind, path, params, record)
+
+    def request(self, kind: str, rnd: random.Random):
+        language = self._language(rnd)
+        if kind == 'list':
+            return '/api/tools', {'page': rnd.randint(1, 5), 'language': language}
+        if kind == 'filter':
+            choice = rnd.random()
+            if choice < 0.4:
+                params = {'category': rnd.choice(self.category_keys)}
+            elif choice < 0.8:
+                params = {'tags': ','.join({self._tag(rnd) for _ in range(rnd.randint(1, 2))})}
+            else:
+                params = {'featured': 'true'}
+            return '/api/tools', {**params, 'page': rnd.randint(1, 3), 'language': language}
+        if kind == 'search':
+            term_language, term = rnd.choice(self.terms)
+            params = {'search': term, 'language': term_language}
+            if rnd.random() < 0.3:
+                params['sort'] = 'relevance'
+            return '/api/tools', params
+        if kind == 'deep_page':
+            last_page = max(1, len(self.tool_ids) // self.page_size)
+            return '/api/tools', {'page': rnd.randint(max(1, last_page // 2), last_page), 'language': language}
+        if kind == 'all':
+            return '/api/tools', {'all': 'true', 'category': rnd.choice(self.category_keys), 'language': language}
+        if kind == 'detail':
+            tool_id = self._tool(rnd)
+            identifier = f"tool-{tool_id}" if rnd.random() < 0.8 else str(tool_id)
+            return f"/api/tools/{identifier}", {'language': language}
+        if kind == 'batch':
+            ids = ','.join(f"tool-{self._tool(rnd)}" for _ in range(rnd.randint(2, 10)))
+            return '/api/tools/batch', {'ids': ids, 'language': language}
+        if kind == 'related':
+            return f"/api/tools/tool-{self._tool(rnd)}/related", {'language': language}
+        if kind == 'categories':
+            return '/api/categories', {'language': language}
+        if kind == 'tags':
+            params = {'language': language, 'popular': str(rnd.random() < 0.5).lower()}
+            if rnd.random() < 0.3:
+                params['type'] = rnd.choice(('general', 'industry'))
+            return '/api/tags', params
+        if kind == 'homepage':
+            return '/api/homepage-data', {'language': language}
+        if kind == 'suggest':
+            word = rnd.choice(CN_WORDS if language == 'cn' else EN_WORDS)
+            return '/api/suggest', {'q': word[:rnd.randint(1, len(word))], 'language': language}
+        if kind == 'images':
+            params = {'w': 400, 'format': 'webp'} if rnd.random() < 0.5 else {}
+            return f"/api/images/{rnd.choice(self.images)}", params
+        raise ValueError(f"未知的请求类型: {kind}")
+
+
+def submission(rnd: random.Random) -> Dict[str, Any]:
+    name = f"{SUBMIT_SLUG_PREFIX} {rnd.randrange(10 ** 9)}"
+    text = {'en': ' '.join(rnd.choice(EN_WORDS) for _ in range(8)), 'cn': ''.join(rnd.choice(CN_WORDS) for _ in range(6))}
+    return {
+        'name': {'en': name, 'cn': name}, 'title': text, 'description': text, 'long_description': text,
+        'url': f"https://{rnd.randrange(10 ** 9)}.example.com", 'category': 'productivity',
+        'subcategory': text, 'use_cases': text, 'target_audience': text,
+        'key_features': [{'en': rnd.choice(EN_WORDS), 'cn': rnd.choice(CN_WORDS)} for _ in range(3)],
+        'pricing_type': {'en': 'free'}, 'pricing_details': {'en': 'free'}, 'trial_available': {'en': 'yes'},
+        'contact_email': 'bench@example.com', 'contact_name': 'bench',
+    }
+
+
+async def timed_get(client, kind: str, path: str, params: Dict, record):
+    started = time.perf_counter()
+    response = await client.get(path, params=params)
+    record(kind, response, time.perf_counter() - started)
+    return response
+
+
+async def timed_post(client, kind: str, path: str, body: Dict, record):
+    started = time.perf_counter()
+    response = await client.post(path, json=body)
+    record(kind, response, time.perf_counter() - started)
+    return response
+
+
+# ---- 压测 ----
+
+class Recorder:
+    """按请求类型收集耗时、状态码和响应大小"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+        self.statuses: Dict[str, Dict[str, int]] = {}
+        self.bytes: Dict[str, int] = {}
+        self.enabled = True
+
+    def __call__(self, kind: str, response, seconds: float):
+        if not self.enabled:
+            return
+        self.samples.setdefault(kind, []).append(seconds)
+        statuses = self.statuses.setdefault(kind, {})
+        statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+        self.bytes[kind] = self.bytes.get(kind, 0) + len(response.content)
+
+    def summary(self, kind: str, elapsed: float) -> Dict[str, Any]:
+        samples = sorted(self.samples.get(kind, []))
+        statuses = self.statuses.get(kind, {})
+        errors = sum(count for status, count in statuses.items() if not status.startswith(('2', '3')))
+        return {
+            "requests": len(samples),
+            "errors": errors,
+            "statuses": statuses,
+            "throughput_rps": round(len(samples) / elapsed, 2) if elapsed else 0.0,
+            "mean_ms": round(statistics.mean(samples) * 1000, 3) if samples else 0.0,
+            "p50_ms": round(percentile(samples, 50) * 1000, 3),
+            "p95_ms": round(percentile(samples, 95) * 1000, 3),
+            "p99_ms": round(percentile(samples, 99) * 1000, 3),
+            "max_ms": round(samples[-1] * 1000, 3) if samples else 0.0,
+            "avg_bytes": round(self.bytes.get(kind, 0) / len(samples)) if samples else 0,
+        }
+
+
+async def drive(base_url: str, workload: Workload, mix: Dict[str, int], concurrency: int, duration: float,
+                seed: int, recorder: Recorder) -> float:
+    """concurrency 个并发循环按权重选择请求类型, 持续 duration 秒, 返回实际耗时"""
+    kinds = [kind for kind, weight in mix.items() if weight > 0]
+    weights = [mix[kind] for kind in kinds]
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        async def loop(index: int):
+            rnd = random.Random(seed * 1000 + index)
+            while time.perf_counter() < deadline:
+                kind = rnd.choices(kinds, weights)[0]
+                try:
+                    await workload.run(kind, client, rnd, recorder)
+                except httpx.HTTPError as e:
+                    recorder.statuses.setdefault(kind, {})
+                    recorder.statuses[kind][type(e).__name__] = recorder.statuses[kind].get(type(e).__name__, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(loop(index) for index in range(concurrency)))
+        return time.perf_counter() - started
+
+
+async def measure_query_counts(base_url: str, token: str, workload: Workload, mix: Dict[str, int],
+                               seed: int) -> Optional[Dict[str, Optional[float]]]:
+    """每种请求类型顺序发送 CALIBRATION_REQUESTS 次, 按慢查询日志的语句计数求每请求语句数"""
+    headers = {'X-Admin-Token': token}
+    counts = {}
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, headers=headers) as client:
+        probe = await client.post('/api/db/slow-queries/reset')
+        if probe.status_code != 200:
+            print("✗ 目标代码没有慢查询日志, 不统计每请求语句数", file=sys.stderr)
+            return None
+        for kind, weight in mix.items():
+            if weight <= 0:
+                continue
+            recorder = Recorder()
+            rnd = random.Random(seed)
+            await client.post('/api/db/slow-queries/reset')
+            for _ in range(CALIBRATION_REQUESTS):
+                await workload.run(kind, client, rnd, recorder)
+            report = (await client.get('/api/db/slow-queries', params={'limit': 1000})).json()['data']
+            statements = sum(query['calls'] for query in report['queries'])
+            requests = len(recorder.samples.get(kind, []))
+            counts[kind] = round(statements / requests, 2) if requests else None
+    return counts
+
+
+def git_revision(path: str) -> Dict[str, Any]:
+    def git(*args):
+        return subprocess.run(['git', *args], cwd=path, capture_output=True, text=True).stdout.strip()
+    try:
+        return {"commit": git('rev-parse', 'HEAD') or None, "dirty": bool(git('status', '--porcelain', '--', '.'))}
+    except OSError:
+        return {"commit": None, "dirty": None}
+
+
+async def cleanup_submissions(dsn: str) -> int:
+    conn = await asyncpg.connect(dsn)
+    try:
+        ids = [r['id'] for r in await conn.fetch("SELECT id FROM tools WHERE slug LIKE $1", f"{SUBMIT_SLUG_PREFIX}-%")]
+        if ids:
+            await conn.execute("DELETE FROM tools WHERE id = ANY($1)", ids)
+        return len(ids)
+    finally:
+        await conn.close()
+
+
+async def run_benchmark(args) -> Dict[str, Any]:
+    schema = schema_name(args.size)
+    dsn = with_search_path(args.dsn, schema)
+    workdir = os.path.abspath(args.workdir)
+    os.makedirs(workdir, exist_ok=True)
+
+    conn = await asyncpg.connect(dsn)
+    try:
+        seeded = await conn.fetchval("SELECT to_regclass('bench_meta') IS NOT NULL")
+    finally:
+        await conn.close()
+    if not seeded:
+        raise SystemExit(f"✗ {schema} 尚未灌入数据, 先执行 seed --sizes {args.size}")
+
+    mix = parse_mix(args.mix)
+    workload = await Workload.load(dsn)
+    if mix.get('images'):
+        workload.images = prepare_images(os.path.join(workdir, 'images'), workload.tool_ids)
+        if not workload.images:
+            print("✗ 未安装 Pillow, 跳过 images 请求", file=sys.stderr)
+            mix['images'] = 0
+
+    token = secrets.token_hex(16)
+    env = {
+        'DATABASE_URL': dsn,
+        'API_BASE_URL': f"http://127.0.0.1:{args.port}",
+        'FRONTEND_IMAGE_BASE_URL': os.path.join(workdir, 'images'),
+        'IMAGE_MANIFEST_PATH': os.path.join(workdir, 'image-manifest.json'),
+        'IMAGE_CACHE_DIR': os.path.join(workdir, 'image-cache'),
+        'CATALOG_SNAPSHOT_PATH': os.path.join(workdir, f"catalog-{args.size}.bin"),
+    }
+    env.update(dict(item.split('=', 1) for item in args.env))
+    # 语句计数依赖慢查询日志; 阈值设为不可达, 不抓取执行计划
+    env.update({
+        'ADMIN_TOKEN': token, 'SLOW_QUERY_LOG': 'true', 'SLOW_QUERY_EXPLAIN': 'false', 'SLOW_QUERY_MS': '1e9',
+    })
+    log_path = os.path.join(workdir, 'api.log')
+
+    query_counts = None
+    if args.workers > 1 and not args.skip_query_counts:
+        async with ApiServer(args.app_dir, args.port, 1, env, log_path) as server:
+            await drive(server.base_url, workload, mix, min(args.concurrency, 4), args.warmup, args.seed, Recorder())
+            query_counts = await measure_query_counts(server.base_url, token, workload, mix, args.seed)
+
+    async with ApiServer(args.app_dir, args.port, args.workers, env, log_path) as server:
+        print(f"✓ API 已启动 ({args.workers} 个 worker, {server.startup_seconds:.1f}s), 预热 {args.warmup:g}s",
+              file=sys.stderr)
+        warm = Recorder()
+        await drive(server.base_url, workload, mix, args.concurrency, args.warmup, args.seed, warm)
+        if args.workers == 1 and not args.skip_query_counts:
+            query_counts = await measure_query_counts(server.base_url, token, workload, mix, args.seed)
+
+        print(f"✓ 压测 {args.duration:g}s, 并发 {args.concurrency}", file=sys.stderr)
+        recorder = Recorder()
+        elapsed = await drive(server.base_url, workload, mix, args.concurrency, args.duration, args.seed + 1, recorder)
+
+    removed = await cleanup_submissions(dsn) if mix.get('submit') else 0
+
+    results = {}
+    for kind in mix:
+        if mix[kind] <= 0:
+            continue
+        results[kind] = recorder.summary(kind, elapsed)
+        results[kind]["db_queries_per_request"] = query_counts.get(kind) if query_counts else None
+    all_samples = sorted(s for samples in recorder.samples.values() for s in samples)
+    overall = {
+        "requests": len(all_samples),
+        "errors": sum(r["errors"] for r in results.values()),
+        "throughput_rps": round(len(all_samples) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(all_samples, 50) * 1000, 3),
+        "p99_ms": round(percentile(all_samples, 99) * 1000, 3),
+    }
+    return {
+        "revision": git_revision(os.path.abspath(args.app_dir)),
+        "created_at": time.time(),
+        "config": {
+            "tools": args.size, "seed": args.seed, "concurrency": args.concurrency, "duration": args.duration,
+            "warmup": args.warmup, "workers": args.workers, "mix": mix, "env": dict(item.split('=', 1) for item in args.env),
+        },
+        "startup_seconds": round(server.startup_seconds, 2),
+        "elapsed_seconds": round(elapsed, 2),
+        "overall": overall,
+        "results": results,
+        "submissions_removed": removed,
+    }
+
+
+def parse_mix(value: Optional[str]) -> Dict[str, int]:
+    """list=20,search=10 形式; 未列出的类型权重为 0; 不传时使用 DEFAULT_MIX"""
+    if not value:
+        return dict(DEFAULT_MIX)
+    mix = {kind: 0 for kind in DEFAULT_MIX}
+    for item in value.split(','):
+        kind, _, weight = item.partition('=')
+        kind = kind.strip()
+        if kind not in DEFAULT_MIX:
+            raise SystemExit(f"✗ 未知的请求类型 {kind}, 可选: {', '.join(DEFAULT_MIX)}")
+        mix[kind] = int(weight or 1)
+    return mix
+
+
+# ---- 对比 ----
+
+def compare_reports(base: Dict, head: Dict, tolerance: float) -> List[str]:
+    """逐类型对比 p50/p99/吞吐/语句数, 返回回退项"""
+    regressions = []
+    print(f"{'类型':<12} {'p50ms':>20} {'p99ms':>20} {'rps':>20} {'语句/请求':>14}")
+    for kind, new in head['results'].items():
+        old = base['results'].get(kind)
+        if old is None:
+            continue
+
+        def cell(key, worse_if_higher=True):
+            before, after = old.get(key), new.get(key)
+            if before is None or after is None:
+                return f"{before}->{after}"
+            change = (after - before) / before * 100 if before else 0.0
+            worse = change > tolerance if worse_if_higher else change < -tolerance
+            if worse:
+                regressions.append(f"{kind}.{key} {before} -> {after} ({change:+.1f}%)")
+            return f"{before:g}->{after:g} ({change:+.0f}%)"
+
+        queries = (old.get('db_queries_per_request'), new.get('db_queries_per_request'))
+        if None not in queries and queries[1] > queries[0]:
+            regressions.append(f"{kind}.db_queries_per_request {queries[0]} -> {queries[1]}")
+        print(f"{kind:<12} {cell('p50_ms'):>20} {cell('p99_ms'):>20} {cell('throughput_rps', False):>20} "
+              f"{f'{queries[0]}->{queries[1]}':>14}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API 负载基准")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    seed = sub.add_parser('seed', help="建表并灌入合成目录")
+    seed.add_argument('--dsn', default=os.getenv('BENCH_DATABASE_URL'), required=not os.getenv('BENCH_DATABASE_URL'))
+    seed.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    seed.add_argument('--seed', type=int, default=42)
+    seed.add_argument('--force', action='store_true', help="已有同样的数据时也重建")
+
+    run = sub.add_parser('run', help="启动 API 并压测")
+    run.add_argument('--dsn', default=os.getenv('BENCH_DATABASE_URL'), required=not os.getenv('BENCH_DATABASE_URL'))
+    run.add_argument('--size', type=int, default=10000)
+    run.add_argument('--seed', type=int, default=42, help="请求序列的随机种子")
+    run.add_argument('--concurrency', type=int, default=16)
+    run.add_argument('--duration', type=float, default=20)
+    run.add_argument('--warmup', type=float, default=3)
+    run.add_argument('--workers', type=int, default=1)
+    run.add_argument('--mix', help=f"请求组合, 如 list=20,search=10; 类型: {', '.join(DEFAULT_MIX)}")
+    run.add_argument('--env', action='append', default=[], help="传给 API 的环境变量 KEY=VALUE, 可重复")
+    run.add_argument('--app-dir', default=DEFAULT_APP_DIR, help="backend/app 目录 (可指向另一个提交的检出)")
+    run.add_argument('--port', type=int, default=8899)
+    run.add_argument('--workdir', default=os.path.join(tempfile.gettempdir(), 'lookaitools-bench'),
+                     help="截图、缓存和 API 日志目录")
+    run.add_argument('--skip-query-counts', action='store_true')
+    run.add_argument('--output', help="结果 JSON 文件, 默认输出到标准输出")
+
+    cmp = sub.add_parser('compare', help="对比两次 run 的结果")
+    cmp.add_argument('base')
+    cmp.add_argument('head')
+    cmp.add_argument('--tolerance', type=float, default=10, help="允许的变化百分比")
+    args = parser.parse_args()
+
+    if args.command == 'seed':
+        async def seed_all():
+            return [await seed_schema(args.dsn, size, args.seed, args.force) for size in args.sizes]
+        print(json.dumps({"seed": args.seed, "schemas": asyncio.run(seed_all())}, ensure_ascii=False, indent=2))
+    elif args.command == 'run':
+        if httpx is None:
+            raise SystemExit("✗ 未安装 httpx, 无法压测")
+        report = asyncio.run(run_benchmark(args))
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                f.write(output + '\n')
+            print(f"✓ 结果已写入 {args.output}: {report['overall']}", file=sys.stderr)
+        else:
+            print(output)
+    else:
+        with open(args.base, encoding='utf-8') as f:
+            base = json.load(f)
+        with open(args.head, encoding='utf-8') as f:
+            head = json.load(f)
+        for key in ('tools', 'concurrency', 'workers', 'mix'):
+            if base['config'].get(key) != head['config'].get(key):
+                print(f"✗ 配置 {key} 不同, 结果不可直接比较: {base['config'].get(key)} vs {head['config'].get(key)}",
+                      file=sys.stderr)
+        regressions = compare_reports(base, head, args.tolerance)
+        for line in regressions:
+            print(f"✗ {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
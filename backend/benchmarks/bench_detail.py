@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+工具详情查询基准: single / pipelined / sequential 在高延迟链路上的耗时
+
+用法:
+    python benchmarks/bench_detail.py --dsn postgresql://localhost/lookaitools --rtt 0 20 50
+    python benchmarks/bench_detail.py --dsn "postgresql://postgres@/postgres?host=/tmp/pgdata" \\
+        --upstream /tmp/pgdata/.s.PGSQL.5432 --rtt 40
+
+本地起一个TCP代理, 每个方向延迟 rtt/2 毫秒转发, 模拟远端托管数据库的网络往返;
+--upstream 为真实数据库地址 (host:port 或 unix socket 路径), 默认取 --dsn 中的主机和端口。
+数据库需已有目录数据 (tools / tool_translations / tool_tags / tool_features)。
+结果以 JSON 输出到标准输出。
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import statistics
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+import asyncpg
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+from tool_detail import DETAIL_QUERY_MODES, ToolDetailFetcher  # noqa: E402
+
+
+class DelayProxy:
+    """按固定单向延迟转发字节流的TCP代理, 保持每个方向上的数据顺序"""
+
+    def __init__(self, upstream: str, one_way_delay: float):
+        self.upstream = upstream
+        self.delay = one_way_delay
+        self.server = None
+
+    async def _open_upstream(self):
+        if self.upstream.startswith('/'):
+            return await asyncio.open_unix_connection(self.upstream)
+        host, _, port = self.upstream.rpartition(':')
+        return await asyncio.open_connection(host or 'localhost', int(port))
+
+    async def _pump(self, reader, writer):
+        queue: asyncio.Queue = asyncio.Queue()
+
+        async def deliver():
+            while True:
+                due, chunk = await queue.get()
+                if chunk is None:
+                    break
+                wait = due - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                writer.write(chunk)
+                await writer.drain()
+            writer.close()
+
+        sender = asyncio.create_task(deliver())
+        try:
+            while True:
+                chunk = await reader.read(65536)
+                if not chunk:
+                    break
+                queue.put_nowait((time.monotonic() + self.delay, chunk))
+        except ConnectionError:
+            pass
+        finally:
+            queue.put_nowait((0, None))
+            await sender
+
+    async def _handle(self, client_reader, client_writer):
+        try:
+            upstream_reader, upstream_writer = await self._open_upstream()
+        except OSError:
+            client_writer.close()
+            return
+        await asyncio.gather(
+            self._pump(client_reader, upstream_writer),
+            self._pump(upstream_reader, client_writer),
+            return_exceptions=True,
+        )
+
+    async def start(self) -> int:
+        self.server = await asyncio.start_server(self._handle, '127.0.0.1', 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+
+def default_upstream(dsn: str) -> str:
+    parts = urlsplit(dsn)
+    query = dict(parse_qsl(parts.query))
+    if 'host' in query and query['host'].startswith('/'):
+        return os.path.join(query['host'], f".s.PGSQL.{query.get('port', parts.port or 5432)}")
+    return f"{parts.hostname or 'localhost'}:{parts.port or 5432}"
+
+
+def proxied_dsn(dsn: str, port: int) -> str:
+    """把DSN的主机替换为本地代理"""
+    parts = urlsplit(dsn)
+    query = {k: v for k, v in parse_qsl(parts.query) if k not in ('host', 'port')}
+    userinfo = parts.netloc.rpartition('@')[0]
+    netloc = f"{userinfo}@127.0.0.1:{port}" if userinfo else f"127.0.0.1:{port}"
+    return urlunsplit((parts.scheme, netloc, parts.path, urlencode(query), ''))
+
+
+def summarize(samples_ms):
+    ordered = sorted(samples_ms)
+    return {
+        "requests": len(ordered),
+        "p50_ms": round(statistics.median(ordered), 3),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))], 3),
+        "mean_ms": round(statistics.mean(ordered), 3),
+    }
+
+
+async def bench_rtt(dsn, upstream, rtt_ms, identifiers, requests):
+    proxy = DelayProxy(upstream, rtt_ms / 2000)
+    port = await proxy.start()
+    # 连接数足够并发模式使用, 预先建立好避免把建连时间计入
+    pool = await asyncpg.create_pool(proxied_dsn(dsn, port), min_size=3, max_size=3)
+    results = {}
+    try:
+        for mode in DETAIL_QUERY_MODES:
+            fetcher = ToolDetailFetcher(mode)
+            for identifier, language in identifiers[:3]:
+                await fetcher.fetch(pool, identifier, language)  # 预热语句缓存
+            samples = []
+            for i in range(requests):
+                identifier, language = identifiers[i % len(identifiers)]
+                started = time.perf_counter()
+                await fetcher.fetch(pool, identifier, language)
+                samples.append((time.perf_counter() - started) * 1000)
+            results[mode] = summarize(samples)
+    finally:
+        await pool.close()
+        await proxy.stop()
+    return results
+
+
+async def run(args):
+    conn = await asyncpg.connect(args.dsn)
+    try:
+        rows = await conn.fetch("SELECT id, slug FROM tools WHERE status = 'active'")
+    finally:
+        await conn.close()
+    if not rows:
+        raise SystemExit("数据库中没有活跃工具")
+
+    rnd = random.Random(args.seed)
+    identifiers = [
+        (row['slug'] if rnd.random() < 0.5 and row['slug'] else str(row['id']), rnd.choice(('en', 'cn')))
+        for row in rnd.sample(list(rows), min(len(rows), 200))
+    ]
+    upstream = args.upstream or default_upstream(args.dsn)
+
+    report = {"requests": args.requests, "results": []}
+    for rtt in args.rtt:
+        report["results"].append({"rtt_ms": rtt, "modes": await bench_rtt(args.dsn, upstream, rtt, identifiers, args.requests)})
+        print(f"✓ rtt={rtt}ms 完成", file=sys.stderr)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="工具详情查询基准")
+    parser.add_argument('--dsn', default=os.getenv('BENCH_DATABASE_URL') or os.getenv('DATABASE_URL'), required=False)
+    parser.add_argument('--upstream', help="真实数据库地址 host:port 或 unix socket 路径")
+    parser.add_argument('--rtt', type=float, nargs='+', default=[0, 20, 50], help="模拟的往返延迟(毫秒)")
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    if not args.dsn:
+        parser.error("需要 --dsn 或 BENCH_DATABASE_URL")
+
+    print(json.dumps(asyncio.run(run(args)), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
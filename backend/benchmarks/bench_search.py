@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+搜索基准: 进程内倒排索引 vs Postgres ILIKE
+
+用法:
+    python benchmarks/bench_search.py --sizes 10000 100000
+    python benchmarks/bench_search.py --sizes 10000 --dsn postgresql://localhost/bench
+
+提供 --dsn 时会在临时表中灌入同样的数据, 测量当前 /api/tools 使用的 ILIKE 条件。
+结果以 JSON 输出到标准输出。
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+from search_index import SearchIndex  # noqa: E402
+from synthetic import generate_tools, search_terms  # noqa: E402
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples_ms):
+    return {
+        "queries": len(samples_ms),
+        "p50_ms": round(percentile(samples_ms, 50), 3),
+        "p95_ms": round(percentile(samples_ms, 95), 3),
+        "p99_ms": round(percentile(samples_ms, 99), 3),
+        "mean_ms": round(statistics.mean(samples_ms), 3),
+    }
+
+
+def bench_index(tools, terms):
+    started = time.perf_counter()
+    indexes = {}
+    for language in ('en', 'cn'):
+        docs = (
+            (tool['id'], tool['translations'][language], tool['rating'], tool['view_count'])
+            for tool in tools
+        )
+        indexes[language] = SearchIndex(language).build(docs)
+    build_seconds = time.perf_counter() - started
+
+    samples, hits = [], 0
+    for language, term in terms:
+        started = time.perf_counter()
+        results = indexes[language].search(term)
+        samples.append((time.perf_counter() - started) * 1000)
+        hits += len(results)
+
+    result = summarize(samples)
+    result.update({
+        "build_seconds": round(build_seconds, 3),
+        "terms": {language: len(index.postings) for language, index in indexes.items()},
+        "avg_hits": round(hits / len(terms), 1),
+    })
+    return result
+
+
+async def bench_ilike(dsn, tools, terms):
+    import asyncpg
+
+    conn = await asyncpg.connect(dsn)
+    try:
+        await conn.execute("""
+            CREATE TEMP TABLE bench_tool_translations (
+                tool_id int, language_code text, name text, title text, description text
+            )
+        """)
+        records = [
+            (tool['id'], language, fields['name'], fields['title'], fields['description'])
+            for tool in tools
+            for language, fields in tool['translations'].items()
+        ]
+        await conn.copy_records_to_table('bench_tool_translations', records=records)
+        await conn.execute("ANALYZE bench_tool_translations")
+
+        query = """
+            SELECT tool_id FROM bench_tool_translations tt
+            WHERE tt.language_code = $1
+              AND (tt.name ILIKE $2 OR tt.title ILIKE $2 OR tt.description ILIKE $2)
+        """
+        samples, hits = [], 0
+        for language, term in terms:
+            started = time.perf_counter()
+            rows = await conn.fetch(query, language, f"%{term}%")
+            samples.append((time.perf_counter() - started) * 1000)
+            hits += len(rows)
+
+        result = summarize(samples)
+        result["avg_hits"] = round(hits / len(terms), 1)
+        return result
+    finally:
+        await conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="搜索基准: 倒排索引 vs ILIKE")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--dsn', default=os.getenv('BENCH_DATABASE_URL'))
+    args = parser.parse_args()
+
+    terms = search_terms(count=args.queries)
+    report = {"queries": args.queries, "seed": args.seed, "results": []}
+    for size in args.sizes:
+        tools = list(generate_tools(size, seed=args.seed))
+        entry = {"tools": size, "index": bench_index(tools, terms)}
+        if args.dsn:
+            entry["ilike"] = asyncio.run(bench_ilike(args.dsn, tools, terms))
+        report["results"].append(entry)
+        print(f"✓ {size} 个工具完成", file=sys.stderr)
+
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
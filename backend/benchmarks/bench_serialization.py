@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+序列化基准: pydantic APIResponse + JSONResponse vs fast_json 直接编码
+
+用法:
+    python benchmarks/bench_serialization.py
+    python benchmarks/bench_serialization.py --sizes 12 100 --full 10000
+
+默认的 12 / 100 条对应前端首页和常用分页大小, --full 对应 all=true 的整表响应。
+两条路径都从 format_tool_response 产出的字典开始计时, 结果以 JSON 输出到标准输出。
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+import fast_json  # noqa: E402
+from main import APIResponse, PaginationResponse, format_tool_response  # noqa: E402
+from synthetic import generate_tools, CATEGORY_KEYS  # noqa: E402
+
+
+def tool_rows(count, seed, language='en'):
+    """把合成数据转换成与列表查询结果相同结构的行"""
+    rows = []
+    for tool in generate_tools(count, seed=seed):
+        row = dict(tool)
+        row.update(tool['translations'][language])
+        row['category_key'] = CATEGORY_KEYS[tool['category_index']]
+        row['category_name'] = row['category_key'].title()
+        row['tags'] = [tag for tag, _ in tool['tags']]
+        rows.append(format_tool_response(row, language))
+    return rows
+
+
+def pagination(count):
+    return {"page": 1, "limit": count, "total": count, "totalPages": 1,
+            "next_cursor": None, "total_source": "window"}
+
+
+def render_pydantic(tools):
+    # 与 FastAPI 处理 response_model 的路径一致: 模型 -> jsonable_encoder -> JSONResponse
+    result = APIResponse(data=tools, pagination=PaginationResponse(**pagination(len(tools))))
+    return JSONResponse(jsonable_encoder(result)).body
+
+
+def render_fast(tools):
+    return fast_json.FastJSONResponse(fast_json.envelope(tools, pagination(len(tools)))).body
+
+
+def measure(render, tools, rounds):
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        render(tools)
+        samples.append((time.perf_counter() - started) * 1000)
+    return {
+        "rounds": rounds,
+        "p50_ms": round(statistics.median(samples), 4),
+        "mean_ms": round(statistics.mean(samples), 4),
+        "min_ms": round(min(samples), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="序列化基准: pydantic vs fast_json")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[12, 100])
+    parser.add_argument('--full', type=int, default=5000, help="整表响应的工具数")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--budget', type=float, default=2.0, help="每组测量的大致秒数")
+    args = parser.parse_args()
+
+    report = {"encoder": "orjson" if fast_json.orjson is not None else "json", "results": []}
+    for size in args.sizes + [args.full]:
+        tools = tool_rows(size, args.seed)
+        # 两条路径输出内容必须一致
+        assert json.loads(render_pydantic(tools)) == json.loads(render_fast(tools))
+
+        started = time.perf_counter()
+        render_pydantic(tools)
+        once = max(time.perf_counter() - started, 1e-6)
+        rounds = max(5, min(5000, int(args.budget / once)))
+
+        pydantic_stats = measure(render_pydantic, tools, rounds)
+        fast_stats = measure(render_fast, tools, rounds)
+        report["results"].append({
+            "tools": size,
+            "bytes": len(render_fast(tools)),
+            "pydantic": pydantic_stats,
+            "fast_json": fast_stats,
+            "speedup": round(pydantic_stats["p50_ms"] / fast_stats["p50_ms"], 2) if fast_stats["p50_ms"] else None,
+        })
+        print(f"✓ {size} 个工具完成", file=sys.stderr)
+
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+输入联想基准: 前缀索引 vs Postgres ILIKE
+
+用法:
+    python benchmarks/bench_suggest.py --sizes 10000 100000
+    python benchmarks/bench_suggest.py --sizes 10000 --dsn postgresql://localhost/bench
+
+查询模拟逐字输入: 取工具名称/标题中的词, 依次输入前 1~4 个字符 (中文为任意位置起的 1~3 个字)。
+提供 --dsn 时会在临时表中灌入同样的数据, 测量按键时 /api/tools?search= 使用的 ILIKE 条件。
+结果以 JSON 输出到标准输出。
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+from suggest import PrefixIndex, tool_entry  # noqa: E402
+from synthetic import generate_tools, EN_WORDS, CN_WORDS  # noqa: E402
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples_ms):
+    return {
+        "queries": len(samples_ms),
+        "p50_ms": round(percentile(samples_ms, 50), 4),
+        "p95_ms": round(percentile(samples_ms, 95), 4),
+        "p99_ms": round(percentile(samples_ms, 99), 4),
+        "max_ms": round(max(samples_ms), 4),
+        "mean_ms": round(statistics.mean(samples_ms), 4),
+    }
+
+
+def keystrokes(seed: int, count: int):
+    """(语言, 输入内容) 列表, 每个词按输入过程拆成多个前缀"""
+    rnd = random.Random(seed)
+    queries = []
+    while len(queries) < count:
+        if rnd.random() < 0.6:
+            word = rnd.choice(EN_WORDS)
+            if rnd.random() < 0.3:
+                word = f"{word} {rnd.choice(EN_WORDS)}"
+            queries.extend(('en', word[:n]) for n in range(1, min(len(word), 4) + 1))
+        else:
+            word = rnd.choice(CN_WORDS)
+            start = rnd.randrange(len(word))
+            queries.extend(('cn', word[start:start + n]) for n in range(1, min(len(word) - start, 3) + 1))
+    return queries[:count]
+
+
+def bench_index(tools, queries, limit, scan_limit):
+    started = time.perf_counter()
+    indexes = {}
+    for language in ('en', 'cn'):
+        entries = (
+            tool_entry(tool['id'], tool['slug'], tool['view_count'],
+                       tool['translations'][language]['name'], tool['translations'][language]['title'])
+            for tool in tools
+        )
+        indexes[language] = PrefixIndex(scan_limit).build(entries)
+    build_seconds = time.perf_counter() - started
+
+    for language, query in queries[:50]:
+        indexes[language].lookup(query, limit)  # 预热
+
+    samples, hits = [], 0
+    for language, query in queries:
+        started = time.perf_counter()
+        results = indexes[language].lookup(query, limit)
+        samples.append((time.perf_counter() - started) * 1000)
+        hits += len(results)
+
+    result = summarize(samples)
+    result.update({
+        "build_seconds": round(build_seconds, 3),
+        "index": {language: index.stats() for language, index in indexes.items()},
+        "avg_hits": round(hits / len(queries), 1),
+    })
+    return result
+
+
+async def bench_ilike(dsn, tools, queries, limit):
+    import asyncpg
+
+    conn = await asyncpg.connect(dsn)
+    try:
+        await conn.execute("""
+            CREATE TEMP TABLE bench_suggest_tools (
+                tool_id int, language_code text, name text, title text, view_count int
+            )
+        """)
+        records = [
+            (tool['id'], language, fields['name'], fields['title'], tool['view_count'])
+            for tool in tools
+            for language, fields in tool['translations'].items()
+        ]
+        await conn.copy_records_to_table('bench_suggest_tools', records=records)
+        await conn.execute("ANALYZE bench_suggest_tools")
+
+        query = f"""
+            SELECT tool_id FROM bench_suggest_tools
+            WHERE language_code = $1 AND (name ILIKE $2 OR title ILIKE $2)
+            ORDER BY view_count DESC LIMIT {int(limit)}
+        """
+        samples, hits = [], 0
+        for language, term in queries:
+            started = time.perf_counter()
+            rows = await conn.fetch(query, language, f"%{term}%")
+            samples.append((time.perf_counter() - started) * 1000)
+            hits += len(rows)
+
+        result = summarize(samples)
+        result["avg_hits"] = round(hits / len(queries), 1)
+        return result
+    finally:
+        await conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="输入联想基准: 前缀索引 vs ILIKE")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--limit', type=int, default=8)
+    parser.add_argument('--scan-limit', type=int, default=2048)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--dsn', default=os.getenv('BENCH_DATABASE_URL'))
+    args = parser.parse_args()
+
+    queries = keystrokes(args.seed, args.queries)
+    report = {"queries": args.queries, "limit": args.limit, "seed": args.seed, "results": []}
+    for size in args.sizes:
+        tools = list(generate_tools(size, seed=args.seed))
+        entry = {"tools": size, "prefix_index": bench_index(tools, queries, args.limit, args.scan_limit)}
+        if args.dsn:
+            entry["ilike"] = asyncio.run(bench_ilike(args.dsn, tools, queries, args.limit))
+        report["results"].append(entry)
+        print(f"✓ {size} 个工具完成", file=sys.stderr)
+
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
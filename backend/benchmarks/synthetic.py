@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+确定性的合成双语工具目录生成器
+同一个种子总是生成完全相同的数据, 便于不同提交之间对比基准结果
+"""
+
+import random
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List
+
+EN_WORDS = [
+    'ai', 'writer', 'image', 'video', 'code', 'assistant', 'chat', 'voice', 'design', 'generator',
+    'analytics', 'marketing', 'seo', 'translate', 'summarize', 'music', 'avatar', 'resume', 'email',
+    'presentation', 'logo', 'photo', 'editor', 'automation', 'workflow', 'research', 'notes', 'meeting',
+    'transcribe', 'sales', 'support', 'learning', 'tutor', 'legal', 'finance', 'health', 'story',
+    'content', 'social', 'ads', 'product', 'data', 'sql', 'spreadsheet', 'agent', 'search', 'detector',
+]
+
+CN_WORDS = [
+    '人工智能', '写作', '图像', '视频', '编程', '助手', '聊天', '语音', '设计', '生成器',
+    '数据分析', '营销', '翻译', '摘要', '音乐', '头像', '简历', '邮件', '演示文稿', '标志',
+    '照片', '编辑器', '自动化', '工作流', '研究', '笔记', '会议', '转录', '销售', '客服',
+    '学习', '辅导', '法律', '金融', '健康', '故事', '内容', '社交', '广告', '产品',
+]
+
+CATEGORY_KEYS = [
+    'productivity', 'chatbot', 'image', 'code&it', 'video', 'business',
+    'marketing', 'text&writing', '3d', 'voice', 'education', 'ai detector',
+]
+
+CATEGORY_NAMES_CN = [
+    '效率工具', '聊天机器人', '图像', '编程开发', '视频', '商业',
+    '营销', '文本写作', '三维', '语音', '教育', 'AI检测',
+]
+
+TAG_COUNT = 400
+TAG_TYPES = ('general', 'industry')
+
+BASE_TIME = datetime(2024, 1, 1)
+
+
+def _phrase(rnd: random.Random, words: List[str], n: int, sep: str) -> str:
+    return sep.join(rnd.choice(words) for _ in range(n))
+
+
+def _skewed(rnd: random.Random, n: int, alpha: float = 1.2) -> int:
+    """近似 Zipf 分布的下标, 少数标签被大量使用"""
+    return min(int(rnd.paretovariate(alpha)) - 1, n - 1)
+
+
+def generate_tools(count: int, seed: int = 42) -> Iterator[Dict]:
+    """生成工具记录: 基础字段 + en/cn 翻译 + 标签 + 功能"""
+    rnd = random.Random(seed)
+    for i in range(1, count + 1):
+        views = int(rnd.paretovariate(1.1) * 50)
+        tags = set()
+        for _ in range(rnd.randint(2, 6)):
+            tags.add(_skewed(rnd, TAG_COUNT))
+        yield {
+            'id': i,
+            'slug': f"tool-{i}",
+            'url': f"https://tool-{i}.example.com",
+            'page_screenshot': f"tool-{i}.jpg",
+            'category_index': _skewed(rnd, len(CATEGORY_KEYS), alpha=0.8),
+            'pricing_type': rnd.choice(('free', 'freemium', 'paid')),
+            'rating': round(rnd.uniform(2.5, 5.0), 2),
+            'view_count': views,
+            'featured': rnd.random() < 0.05,
+            'trial_available': rnd.random() < 0.4,
+            'status': 'active' if rnd.random() < 0.97 else 'inactive',
+            'created_at': BASE_TIME + timedelta(minutes=rnd.randint(0, 60 * 24 * 700)),
+            'translations': {
+                'en': {
+                    'name': f"{_phrase(rnd, EN_WORDS, 2, ' ').title()} {i}",
+                    'title': _phrase(rnd, EN_WORDS, 5, ' ').capitalize(),
+                    'description': _phrase(rnd, EN_WORDS, 24, ' ').capitalize() + '.',
+                    'long_description': _phrase(rnd, EN_WORDS, 60, ' ').capitalize() + '.',
+                },
+                'cn': {
+                    'name': f"{_phrase(rnd, CN_WORDS, 2, '')}{i}",
+                    'title': _phrase(rnd, CN_WORDS, 4, ''),
+                    'description': _phrase(rnd, CN_WORDS, 16, '') + '。',
+                    'long_description': _phrase(rnd, CN_WORDS, 40, '') + '。',
+                },
+            },
+            'tags': [(tag, rnd.choice(TAG_TYPES)) for tag in sorted(tags)],
+            'features': {
+                'en': [_phrase(rnd, EN_WORDS, 4, ' ') for _ in range(3)],
+                'cn': [_phrase(rnd, CN_WORDS, 3, '') for _ in range(3)],
+            },
+        }
+
+
+def generate_categories() -> List[Dict]:
+    """分类及 en/cn 翻译, 顺序即 generate_tools 中的 category_index"""
+    return [
+        {
+            'key': key,
+            'sort_order': index,
+            'translations': {
+                'en': {'name': key.replace('&', ' & ').title(), 'description': f"AI tools for {key}"},
+                'cn': {'name': CATEGORY_NAMES_CN[index], 'description': f"{CATEGORY_NAMES_CN[index]}类人工智能工具"},
+            },
+        }
+        for index, key in enumerate(CATEGORY_KEYS)
+    ]
+
+
+def generate_tags(seed: int = 42) -> List[Dict]:
+    """标签及 en/cn 翻译, 下标即 generate_tools 中的标签下标; 名称带序号保证唯一"""
+    rnd = random.Random(seed)
+    return [
+        {
+            'key': f"tag-{index}",
+            'translations': {
+                'en': f"{_phrase(rnd, EN_WORDS, 2, ' ').title()} {index}",
+                'cn': f"{_phrase(rnd, CN_WORDS, 2, '')}{index}",
+            },
+        }
+        for index in range(TAG_COUNT)
+    ]
+
+
+def search_terms(seed: int = 7, count: int = 200) -> List[tuple]:
+    """生成 (语言, 搜索词) 列表, 覆盖单词、双词、前缀和中文词"""
+    rnd = random.Random(seed)
+    terms = []
+    for _ in range(count):
+        kind = rnd.random()
+        if kind < 0.35:
+            terms.append(('en', rnd.choice(EN_WORDS)))
+        elif kind < 0.55:
+            terms.append(('en', f"{rnd.choice(EN_WORDS)} {rnd.choice(EN_WORDS)}"))
+        elif kind < 0.7:
+            terms.append(('en', rnd.choice(EN_WORDS)[:3]))
+        else:
+            terms.append(('cn', rnd.choice(CN_WORDS)))
+    return terms
@@ -0,0 +1,57 @@
+-- 目录变更通知触发器 (可重复执行)
+-- 任何目录相关表发生写入时向 catalog_changes 通道发送 NOTIFY,
+-- 负载为 {"table": 表名, "op": 操作, "id": 工具ID或行ID}, 供内存目录引擎增量更新
+
+CREATE OR REPLACE FUNCTION notify_catalog_change() RETURNS trigger AS $$
+DECLARE
+    row_data jsonb;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        row_data := to_jsonb(OLD);
+    ELSE
+        row_data := to_jsonb(NEW);
+    END IF;
+
+    PERFORM pg_notify(
+        'catalog_changes',
+        json_build_object(
+            'table', TG_TABLE_NAME,
+            'op', TG_OP,
+            'id', row_data ->> TG_ARGV[0]
+        )::text
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS catalog_notify ON tools;
+CREATE TRIGGER catalog_notify AFTER INSERT OR UPDATE OR DELETE ON tools
+    FOR EACH ROW EXECUTE FUNCTION notify_catalog_change('id');
+
+DROP TRIGGER IF EXISTS catalog_notify ON tool_translations;
+CREATE TRIGGER catalog_notify AFTER INSERT OR UPDATE OR DELETE ON tool_translations
+    FOR EACH ROW EXECUTE FUNCTION notify_catalog_change('tool_id');
+
+DROP TRIGGER IF EXISTS catalog_notify ON tool_tags;
+CREATE TRIGGER catalog_notify AFTER INSERT OR UPDATE OR DELETE ON tool_tags
+    FOR EACH ROW EXECUTE FUNCTION notify_catalog_change('tool_id');
+
+DROP TRIGGER IF EXISTS catalog_notify ON tool_features;
+CREATE TRIGGER catalog_notify AFTER INSERT OR UPDATE OR DELETE ON tool_features
+    FOR EACH ROW EXECUTE FUNCTION notify_catalog_change('tool_id');
+
+DROP TRIGGER IF EXISTS catalog_notify ON categories;
+CREATE TRIGGER catalog_notify AFTER INSERT OR UPDATE OR DELETE ON categories
+    FOR EACH ROW EXECUTE FUNCTION notify_catalog_change('id');
+
+DROP TRIGGER IF EXISTS catalog_notify ON category_translations;
+CREATE TRIGGER catalog_notify AFTER INSERT OR UPDATE OR DELETE ON category_translations
+    FOR EACH ROW EXECUTE FUNCTION notify_catalog_change('category_id');
+
+DROP TRIGGER IF EXISTS catalog_notify ON tags;
+CREATE TRIGGER catalog_notify AFTER INSERT OR UPDATE OR DELETE ON tags
+    FOR EACH ROW EXECUTE FUNCTION notify_catalog_change('id');
+
+DROP TRIGGER IF EXISTS catalog_notify ON tag_translations;
+CREATE TRIGGER catalog_notify AFTER INSERT OR UPDATE OR DELETE ON tag_translations
+    FOR EACH ROW EXECUTE FUNCTION notify_catalog_change('tag_id');
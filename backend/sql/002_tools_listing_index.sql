@@ -0,0 +1,12 @@
+-- 工具列表排序索引 (可重复执行)
+-- 与 backend/app/pagination.py 的 ORDER_BY_CLAUSE / SEEK_COLUMNS 完全对应:
+-- 空值按 false/0/0/-infinity 参与排序和游标行值比较, 不再被行值比较跳过
+CREATE INDEX IF NOT EXISTS idx_tools_listing_order
+    ON tools (
+        COALESCE(featured, false) DESC,
+        COALESCE(rating, 0) DESC,
+        COALESCE(view_count, 0) DESC,
+        COALESCE(created_at, '-infinity') DESC,
+        id DESC
+    )
+    WHERE status = 'active';
@@ -0,0 +1,58 @@
+-- 工具全文检索 (可重复执行)
+-- tool_translations 按 language_code 维护 tsvector 生成列 + GIN 索引,
+-- 中文按汉字二元组切分, 名称另建三元组索引用于模糊匹配
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- 汉字连续片段拆成重叠二元组, 单个汉字保留, 其余文本原样保留交给 simple 分词
+-- 与 backend/app/textsearch.py 的 cjk_bigrams() 保持一致
+CREATE OR REPLACE FUNCTION cjk_bigrams(input text) RETURNS text AS $$
+DECLARE
+    run text;
+    tokens text[] := '{}';
+    i int;
+BEGIN
+    IF input IS NULL THEN
+        RETURN '';
+    END IF;
+    FOR run IN
+        SELECT m[1] FROM regexp_matches(
+            input,
+            '([㐀-䶿一-鿿豈-﫿]+|[^㐀-䶿一-鿿豈-﫿]+)',
+            'g'
+        ) AS m
+    LOOP
+        IF run ~ '^[㐀-䶿一-鿿豈-﫿]' THEN
+            IF length(run) = 1 THEN
+                tokens := tokens || run;
+            ELSE
+                FOR i IN 1 .. length(run) - 1 LOOP
+                    tokens := tokens || substr(run, i, 2);
+                END LOOP;
+            END IF;
+        ELSE
+            tokens := tokens || run;
+        END IF;
+    END LOOP;
+    RETURN array_to_string(tokens, ' ');
+END;
+$$ LANGUAGE plpgsql IMMUTABLE STRICT PARALLEL SAFE;
+
+ALTER TABLE tool_translations ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        CASE WHEN language_code = 'cn' THEN
+            setweight(to_tsvector('simple', cjk_bigrams(coalesce(name, ''))), 'A') ||
+            setweight(to_tsvector('simple', cjk_bigrams(coalesce(title, ''))), 'B') ||
+            setweight(to_tsvector('simple', cjk_bigrams(coalesce(description, ''))), 'C')
+        ELSE
+            setweight(to_tsvector('english', coalesce(name, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(title, '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(description, '')), 'C')
+        END
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_tool_translations_search
+    ON tool_translations USING gin (search_vector);
+
+CREATE INDEX IF NOT EXISTS idx_tool_translations_name_trgm
+    ON tool_translations USING gin (name gin_trgm_ops);
@@ -0,0 +1,36 @@
+-- 目录版本计数器 (可重复执行)
+-- 任何目录相关表的写语句都会把 catalog_version.version 加一并记录时间,
+-- 供 API 生成跨进程一致的 ETag / Last-Modified
+
+CREATE TABLE IF NOT EXISTS catalog_version (
+    id boolean PRIMARY KEY DEFAULT true CHECK (id),
+    version bigint NOT NULL DEFAULT 1,
+    updated_at timestamptz NOT NULL DEFAULT now()
+);
+
+INSERT INTO catalog_version (id) VALUES (true) ON CONFLICT (id) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION bump_catalog_version() RETURNS trigger AS $$
+BEGIN
+    UPDATE catalog_version SET version = version + 1, updated_at = now() WHERE id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    table_name text;
+BEGIN
+    FOREACH table_name IN ARRAY ARRAY[
+        'tools', 'tool_translations', 'tool_tags', 'tool_features',
+        'categories', 'category_translations', 'tags', 'tag_translations'
+    ] LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS catalog_version_bump ON %I', table_name);
+        EXECUTE format(
+            'CREATE TRIGGER catalog_version_bump AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON %I '
+            'FOR EACH STATEMENT EXECUTE FUNCTION bump_catalog_version()',
+            table_name
+        );
+    END LOOP;
+END;
+$$;
@@ -0,0 +1,111 @@
+-- 分类/标签使用统计汇总表 (可重复执行)
+-- category_stats: 每个分类的活跃工具数
+-- tag_stats:      每个 (标签, 标签类型) 在 tool_tags 中的使用次数, 计数为0的行会被删除
+-- 由行级触发器增量维护; TRUNCATE 或批量导入后执行 SELECT rebuild_catalog_stats();
+-- 或 python backend/app/catalog_stats.py rebuild 全量重建
+
+CREATE TABLE IF NOT EXISTS category_stats (
+    category_id integer PRIMARY KEY,
+    active_tool_count integer NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS tag_stats (
+    tag_id integer NOT NULL,
+    tag_type text NOT NULL,
+    usage_count integer NOT NULL DEFAULT 0,
+    PRIMARY KEY (tag_id, tag_type)
+);
+
+-- 热门标签按使用次数取前N个
+CREATE INDEX IF NOT EXISTS idx_tag_stats_usage ON tag_stats (usage_count DESC);
+CREATE INDEX IF NOT EXISTS idx_tag_stats_type_usage ON tag_stats (tag_type, usage_count DESC);
+-- 字母序标签列表按名称取前N个
+CREATE INDEX IF NOT EXISTS idx_tag_translations_language_name ON tag_translations (language_code, tag_name);
+
+CREATE OR REPLACE FUNCTION adjust_category_stats(p_category_id integer, p_delta integer) RETURNS void AS $$
+BEGIN
+    IF p_category_id IS NULL OR p_delta = 0 THEN
+        RETURN;
+    END IF;
+    INSERT INTO category_stats (category_id, active_tool_count)
+    VALUES (p_category_id, p_delta)
+    ON CONFLICT (category_id) DO UPDATE
+        SET active_tool_count = category_stats.active_tool_count + EXCLUDED.active_tool_count;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION adjust_tag_stats(p_tag_id integer, p_tag_type text, p_delta integer) RETURNS void AS $$
+BEGIN
+    IF p_tag_id IS NULL OR p_tag_type IS NULL OR p_delta = 0 THEN
+        RETURN;
+    END IF;
+    INSERT INTO tag_stats (tag_id, tag_type, usage_count)
+    VALUES (p_tag_id, p_tag_type, p_delta)
+    ON CONFLICT (tag_id, tag_type) DO UPDATE
+        SET usage_count = tag_stats.usage_count + EXCLUDED.usage_count;
+    -- 与按 tool_tags 分组的结果一致: 没有使用记录的 (标签, 类型) 不出现
+    DELETE FROM tag_stats WHERE tag_id = p_tag_id AND tag_type = p_tag_type AND usage_count <= 0;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION tools_category_stats_trigger() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.status = 'active' THEN
+        PERFORM adjust_category_stats(OLD.category_id, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.status = 'active' THEN
+        PERFORM adjust_category_stats(NEW.category_id, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION tool_tags_stats_trigger() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM adjust_tag_stats(OLD.tag_id, OLD.tag_type, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM adjust_tag_stats(NEW.tag_id, NEW.tag_type, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS category_stats_insert_delete ON tools;
+CREATE TRIGGER category_stats_insert_delete AFTER INSERT OR DELETE ON tools
+    FOR EACH ROW EXECUTE FUNCTION tools_category_stats_trigger();
+
+-- 浏览量等频繁更新不涉及统计, 只在状态或分类变化时触发
+DROP TRIGGER IF EXISTS category_stats_update ON tools;
+CREATE TRIGGER category_stats_update AFTER UPDATE OF status, category_id ON tools
+    FOR EACH ROW
+    WHEN (OLD.status IS DISTINCT FROM NEW.status OR OLD.category_id IS DISTINCT FROM NEW.category_id)
+    EXECUTE FUNCTION tools_category_stats_trigger();
+
+DROP TRIGGER IF EXISTS tag_stats_change ON tool_tags;
+CREATE TRIGGER tag_stats_change AFTER INSERT OR UPDATE OR DELETE ON tool_tags
+    FOR EACH ROW EXECUTE FUNCTION tool_tags_stats_trigger();
+
+-- 全量重建; 重建期间锁住汇总表, 并发写入的触发器会等待重建完成
+CREATE OR REPLACE FUNCTION rebuild_catalog_stats() RETURNS void AS $$
+BEGIN
+    LOCK TABLE category_stats, tag_stats IN EXCLUSIVE MODE;
+
+    DELETE FROM category_stats;
+    INSERT INTO category_stats (category_id, active_tool_count)
+    SELECT category_id, COUNT(*)
+    FROM tools
+    WHERE status = 'active' AND category_id IS NOT NULL
+    GROUP BY category_id;
+
+    DELETE FROM tag_stats;
+    INSERT INTO tag_stats (tag_id, tag_type, usage_count)
+    SELECT tag_id, tag_type, COUNT(*)
+    FROM tool_tags
+    WHERE tag_id IS NOT NULL AND tag_type IS NOT NULL
+    GROUP BY tag_id, tag_type;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT rebuild_catalog_stats();
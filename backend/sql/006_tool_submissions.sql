@@ -0,0 +1,40 @@
+-- 工具提交所需的约束、列和表 (可重复执行)
+-- tools.slug 唯一索引: /api/tools/submit 用 INSERT ... ON CONFLICT (slug) 原子地占用 slug,
+--   未执行时接口退回按 slug 加咨询锁后先查后插
+-- tool_translations.pricing_details: 按语言保存提交的价格说明; 未执行时该字段不落库并在响应中标记为 ignored
+-- tool_submissions: 每次提交的联系人信息和完整原始内容, 供审核使用; 未执行时联系人信息不落库并标记为 ignored
+--
+-- 已有重复 slug 时建唯一索引会失败, 下面先给重复行改名: 每组保留活跃 (其次 id 最小) 的一行,
+-- 其余改为 <slug>-<id>, 这些工具的详情页 URL 会随之变化。执行前可先检查会被改名的行:
+--     SELECT slug, array_agg(id ORDER BY (status = 'active') DESC, id) AS ids
+--     FROM tools WHERE slug IS NOT NULL GROUP BY slug HAVING COUNT(*) > 1;
+-- 改名后的 slug 恰好与已有 slug 相同时建索引仍会失败, 整个事务回滚, 按上面的查询手工处理后重新执行
+
+BEGIN;
+
+-- 阻止改名和建索引期间插入新的重复 slug
+LOCK TABLE tools IN SHARE ROW EXCLUSIVE MODE;
+
+UPDATE tools t
+SET slug = t.slug || '-' || t.id
+FROM (
+    SELECT id, row_number() OVER (PARTITION BY slug ORDER BY (status = 'active') DESC, id) AS rn
+    FROM tools
+    WHERE slug IS NOT NULL
+) ranked
+WHERE ranked.id = t.id AND ranked.rn > 1;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_tools_slug_unique ON tools (slug);
+
+COMMIT;
+
+ALTER TABLE tool_translations ADD COLUMN IF NOT EXISTS pricing_details text;
+
+CREATE TABLE IF NOT EXISTS tool_submissions (
+    tool_id integer PRIMARY KEY REFERENCES tools (id) ON DELETE CASCADE,
+    contact_email text,
+    contact_name text,
+    company_name text,
+    payload jsonb NOT NULL,
+    submitted_at timestamptz NOT NULL DEFAULT now()
+);